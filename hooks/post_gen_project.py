@@ -19,9 +19,12 @@ A copy of the license is available in the repository's
 LICENSE file.
 """
 import os
+import json
 from pathlib import Path
 import shutil
 import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 # see if arcpy available to accommodate non-windows environments
 if importlib.util.find_spec('arcpy') is not None:
@@ -31,30 +34,73 @@ else:
     has_arcpy = False
 
 
+def _setup_workspace(dir_pth: Path, data_name: str, version: str = None, previous: dict = None) -> dict:
+    """
+    create one data workspace, only creating the geodatabases not already there, and upgrading
+    those the manifest records as created by a different version of ArcGIS Pro
+    """
+    previous = previous or {}
+
+    # ensure the data subdirectory exists
+    if not dir_pth.exists():
+        dir_pth.mkdir(parents=True)
+
+    entry = {'directory': str(dir_pth), 'geodatabases': {}}
+
+    # if working in an arcpy environment
+    if has_arcpy:
+        # only create the file geodatabase and mobile geodatabase, a sqlite database, if missing
+        for gdb_name, create_tool in [(f'{data_name}.gdb', arcpy.management.CreateFileGDB),
+                                      (f'{data_name}.geodatabase', arcpy.management.CreateMobileGDB)]:
+            gdb_pth = dir_pth / gdb_name
+            prev = previous.get(gdb_name, {})
+
+            # check version compatibility before touching an existing geodatabase, only upgrading when
+            # the manifest records the version it was created with and that version differs
+            if not arcpy.Exists(str(gdb_pth)):
+                create_tool(str(dir_pth), gdb_name)
+                action = 'created'
+            elif prev.get('version') is not None and prev['version'] != version:
+                arcpy.management.UpgradeGDB(str(gdb_pth), 'NO_PREREQUISITE_CHECK', 'UPGRADE')
+                action = 'upgraded'
+            else:
+                action = 'unchanged'
+
+            unchanged = action == 'unchanged'
+            entry['geodatabases'][gdb_name] = {
+                'path': str(gdb_pth),
+                'version': prev.get('version') if unchanged else version,
+                'action': action,
+                'updated': prev.get('updated') if unchanged else datetime.now().isoformat(timespec='seconds'),
+            }
+
+    return entry
+
+
 def setup_data(data_pth: Path) -> Path:
-    """create all the data resources for the available environment from scratch to ensure version compatibility"""
-
-    # iterate the data subdirectories
-    for data_name in ['INTERIM', 'RAW', 'PRODUCTION', 'REF']:
-
-        # ensure the data subdirectory exists
-        dir_pth = data_pth / data_name
-        if not dir_pth.exists():
-            dir_pth.mkdir(parents=True)
-
-        # if working in an arcpy environment
-        if has_arcpy:
-            # remove the file geodatabase if it exists and recreate it to make sure compatible with version of Pro
-            fgdb_pth = dir_pth / f'{data_name}.gdb'
-            if fgdb_pth.exists():
-                shutil.rmtree(fgdb_pth)
-            arcpy.management.CreateFileGDB(str(dir_pth), f'{data_name}.gdb')
-
-            # do the same thing for a mobile geodatabase, a sqlite database
-            gdb_pth = dir_pth / f'{data_name}.geodatabase'
-            if gdb_pth.exists():
-                gdb_pth.unlink()
-            arcpy.management.CreateMobileGDB(str(dir_pth), f'{data_name}.geodatabase')
+    """create all the data resources for the available environment, leaving any existing resources in place"""
+    data_names = ['INTERIM', 'RAW', 'PRODUCTION', 'REF']
+
+    version = arcpy.GetInstallInfo()['Version'] if has_arcpy else None
+
+    # read what an earlier run recorded, so existing geodatabases are checked against their version
+    manifest_pth = data_pth / '.workspaces.json'
+    previous = {}
+    if manifest_pth.exists():
+        with open(manifest_pth) as f:
+            previous = json.load(f).get('workspaces', {})
+
+    # create the data subdirectories concurrently, but one at a time with arcpy, which is not thread safe
+    max_workers = 1 if has_arcpy else len(data_names)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        entries = executor.map(lambda nm: _setup_workspace(
+            data_pth / nm, nm, version, previous.get(nm, {}).get('geodatabases', {})), data_names)
+        workspaces = dict(zip(data_names, entries))
+
+    # record what was set up, matching the manifest written by the support library
+    manifest = {'backend': 'arcpy' if has_arcpy else None, 'version': version, 'workspaces': workspaces}
+    with open(manifest_pth, 'w') as f:
+        json.dump(manifest, f, indent=2)
 
     return data_pth
 
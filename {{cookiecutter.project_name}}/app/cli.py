@@ -1,4 +1,6 @@
 import os
+from functools import lru_cache
+from pathlib import Path
 from config import conf
 from {{cookiecutter.support_library}} import utilities
 import click
@@ -8,13 +10,61 @@ load_dotenv(find_dotenv())
 
 # data pathing setup
 DATA_PATH = os.getenv("DATA_PATH")  # the .env file will have this defined
-PATHS = utilities.Paths(data_dir=DATA_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_paths():
+    """project paths, built on first use rather than at import, so the cli starts quickly"""
+    return utilities.Paths(data_dir=DATA_PATH)
+
+
+def _start_profiler(profile_pth):
+    """
+    start profiling the command, with pyinstrument, a sampling profiler, for a speedscope file
+    (.json), and with cProfile for a pstats file (anything else)
+    """
+    if profile_pth.suffix == ".json":
+        try:
+            from pyinstrument import Profiler
+            from pyinstrument.renderers import SpeedscopeRenderer
+        except ImportError:
+            profile_pth = profile_pth.with_suffix(".pstats")
+            click.echo(f"pyinstrument is not installed, writing a cProfile pstats file to {profile_pth}", err=True)
+        else:
+            profiler = Profiler()
+            profiler.start()
+
+            def _stop():
+                profiler.stop()
+                profile_pth.write_text(profiler.output(renderer=SpeedscopeRenderer()))
+                click.echo(f"wrote speedscope profile to {profile_pth}", err=True)
+            return _stop
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def _stop():
+        profiler.disable()
+        profiler.dump_stats(profile_pth)
+        click.echo(f"wrote pstats profile to {profile_pth}, view it with: python -m pstats {profile_pth}", err=True)
+    return _stop
 
 
 @click.group()
-def main():
+@click.option('--profile', 'profile_pth', default=None, type=click.Path(dir_okay=False, path_type=Path),
+              help='profile the command, writing a speedscope file (.json) or a cProfile pstats file')
+@click.option('--timings', is_flag=True, default=False,
+              help='print the wall and CPU time and peak memory growth of instrumented utility calls when finished')
+@click.pass_context
+def main(ctx, profile_pth, timings):
     # commands with the @main.command() decorator will be added to the main group
-    pass
+    if timings:
+        from {{cookiecutter.support_library}}.utilities import timings as rp_timings
+        rp_timings.enable_timings()
+        ctx.call_on_close(rp_timings.print_timings)
+    if profile_pth is not None:
+        ctx.call_on_close(_start_profiler(profile_pth))
 
 @main.command()
 @click.option('--arg_a', default=None, help='func_1')
@@ -0,0 +1,190 @@
+"""
+Batch execution of a function over a grid of argument sets in a process pool.
+
+Scenario sweeps, such as every year for every scenario, are independent of each
+other, so each argument set runs in its own worker process. Large inputs shared
+by every run are written once to a temporary directory, as a memory-mapped NumPy
+file for arrays or an uncompressed Arrow file for DataFrames, and every worker
+maps the same file rather than receiving its own pickled copy with every task.
+
+Only arrays, and numeric DataFrame columns without missing values, are used
+straight from the mapped file without a copy. Converting the Arrow table to
+pandas still copies string and object columns, and numeric columns with missing
+values, into each worker, although once per worker rather than once per task.
+"""
+__all__ = ['arg_grid', 'run_batch', 'BatchResult', 'BatchReport']
+
+import itertools
+import os
+import pickle
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# %% ARGUMENT GRIDS
+def arg_grid(**axes: Iterable) -> List[Dict[str, Any]]:
+    """
+    Every combination of the values along each axis, as keyword argument dictionaries.
+
+    .. code-block:: python
+
+        grid = arg_grid(year=[2018, 2060], scenario=['base', 'trend', 'compact'])
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(list(axes[name]) for name in names))]
+
+
+# %% SHARED INPUTS
+_SHARED = {}
+
+
+def _write_shared(name: str, value, shared_dir: Path):
+    """Write a shared input once, returning how workers load it."""
+    if isinstance(value, np.ndarray):
+        pth = Path(shared_dir, f'{name}.npy')
+        np.save(pth, value)
+        return 'ndarray', str(pth)
+    if isinstance(value, pd.DataFrame) and not hasattr(value, 'geometry'):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        try:
+            table = pa.Table.from_pandas(value)
+        # object columns arrow cannot convert, such as mixed types, leave the frame to be pickled
+        except (pa.ArrowException, TypeError, ValueError):
+            table = None
+        if table is not None:
+            pth = Path(shared_dir, f'{name}.arrow')
+            feather.write_feather(table, pth, compression='uncompressed')
+            return 'frame', str(pth)
+    pth = Path(shared_dir, f'{name}.pkl')
+    with open(pth, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return 'pickle', str(pth)
+
+
+def _load_shared(kind: str, pth: str):
+    if kind == 'ndarray':
+        return np.load(pth, mmap_mode='r')
+    if kind == 'frame':
+        import pyarrow.feather as feather
+        return feather.read_table(pth, memory_map=True).to_pandas(split_blocks=True)
+    with open(pth, 'rb') as f:
+        return pickle.load(f)
+
+
+def _init_worker(specs: Dict[str, tuple]):
+    """Load the shared inputs once per worker process."""
+    _SHARED.clear()
+    for name, (kind, pth) in specs.items():
+        _SHARED[name] = _load_shared(kind, pth)
+
+
+# %% RESULTS
+class BatchResult(NamedTuple):
+    """Outcome of one argument set"""
+    args: Dict[str, Any]
+    status: str  # 'ok' or 'failed'
+    value: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+class BatchReport(object):
+    """Results of a batch, in the order of the argument grid"""
+
+    def __init__(self, results: List[BatchResult], elapsed: float):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def succeeded(self) -> List[BatchResult]:
+        return [res for res in self.results if res.status == 'ok']
+
+    @property
+    def failed(self) -> List[BatchResult]:
+        return [res for res in self.results if res.status == 'failed']
+
+    @property
+    def values(self) -> List[Any]:
+        """Returned values of the runs that succeeded."""
+        return [res.value for res in self.succeeded]
+
+    def summary(self) -> pd.DataFrame:
+        """One row per argument set with its status, time and error."""
+        return pd.DataFrame([{**res.args, 'status': res.status, 'seconds': res.seconds, 'error': res.error}
+                             for res in self.results])
+
+    def __repr__(self):
+        run_time = sum(res.seconds for res in self.results)
+        return (f"BatchReport({len(self.succeeded)} succeeded, {len(self.failed)} failed, "
+                f"{self.elapsed:.1f}s elapsed for {run_time:.1f}s of runs)")
+
+
+def _run_one(func: Callable, args: Dict[str, Any]) -> BatchResult:
+    start = time.perf_counter()
+    try:
+        value = func(**args, **_SHARED)
+        return BatchResult(args, 'ok', value, seconds=time.perf_counter() - start)
+    except Exception:
+        return BatchResult(args, 'failed', error=traceback.format_exc(), seconds=time.perf_counter() - start)
+
+
+# %% EXECUTION
+def run_batch(func: Callable, grid: Iterable[Dict[str, Any]], shared: Dict[str, Any] = None,
+              max_workers: int = None, verbose: bool = True) -> BatchReport:
+    """
+    Run a function for every argument set in a grid, in a pool of worker processes.
+
+    Args:
+        func: Function to run, called with the keyword arguments of each argument set and of
+            the shared inputs. It must be importable by the workers, so defined at module level.
+        grid: Argument sets, such as from ``arg_grid``.
+        shared: Optional dictionary of large inputs used by every run. Arrays and DataFrames are
+            memory mapped by every worker, anything else, including DataFrames Arrow cannot
+            convert, is unpickled once per worker.
+            Memory-mapped inputs are read only. String and object DataFrame columns are
+            copied into each worker when loaded, so only numeric columns are shared.
+            Converting strings to categoricals keeps the copy small.
+        max_workers: Number of worker processes. Defaults to the number of CPUs.
+        verbose: Print each failure and a summary when finished.
+
+    Returns:
+        BatchReport with a result for every argument set, failures included.
+
+    .. code-block:: python
+
+        from managers.batch import arg_grid, run_batch
+
+        report = run_batch(run_scenario, arg_grid(year=[2018, 2060], scenario=['base', 'trend']),
+                           shared={'parcels': parcel_df}, max_workers=4)
+        failed = report.failed
+    """
+    grid = list(grid)
+    max_workers = max_workers if max_workers is not None else os.cpu_count()
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix='rp_batch_') as shared_dir:
+        specs = {name: _write_shared(name, value, Path(shared_dir)) for name, value in (shared or {}).items()}
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(specs,)) as executor:
+            futures = [executor.submit(_run_one, func, args) for args in grid]
+            results = []
+            for args, future in zip(grid, futures):
+                # a worker dying outright is reported as a failure of its argument set
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(BatchResult(args, 'failed', error=repr(e)))
+
+    report = BatchReport(results, time.perf_counter() - start)
+    if verbose:
+        for res in report.failed:
+            print(f"--- --- failed for {res.args}:\n{res.error}")
+        print(f"...{report}")
+    return report
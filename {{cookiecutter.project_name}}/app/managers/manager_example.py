@@ -8,6 +8,8 @@ from pathlib import Path
 
 import pandas as pd
 
+from managers.batch import run_batch
+
 
 # %% MANAGERS
 class Args_Example(rputils.ArgManager):
@@ -26,6 +28,25 @@ class Args_Example(rputils.ArgManager):
             year = "2018"
         else:
             year = "2060"
+        return year
+
+    def _resolve(self, args):
+        """arguments of one grid point, resolved the same way as ``update``"""
+        args = dict(args)
+        if "year" in args:
+            args["year"] = self.update(args["year"])
+        return args
 
     def apply(self, return_=False):
         pass
+
+    def apply_batch(self, grid, shared=None, max_workers=None):
+        """
+        Run the managed function for every argument set in a grid, such as
+        ``arg_grid(year=[2018, 2060], scenario=['base', 'trend'])``, in a pool of
+        worker processes, returning a BatchReport with the results and failures.
+        Each argument set is resolved as ``update`` does before it is run
+        """
+        grid = [self._resolve(args) for args in grid]
+        self.returned = run_batch(self.func.function, grid, shared=shared, max_workers=max_workers)
+        return self.returned
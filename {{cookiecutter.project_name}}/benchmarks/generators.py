@@ -0,0 +1,181 @@
+"""
+Deterministic generators of synthetic data for the benchmarks.
+
+Every generator takes a seed, so the same size always produces the same bytes and
+timings are comparable between runs. Shapefiles are written directly with NumPy
+rather than through a GIS library, so generating millions of records takes
+seconds rather than dominating the benchmark run.
+"""
+import struct
+from pathlib import Path
+
+import numpy as np
+
+WGS84_PRJ = ('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+             'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]')
+
+# attribute table of the synthetic point shapefiles, name, dbf type, length and decimals
+POINT_FIELDS = [
+    ('PARCEL_ID', 'C', 12, 0),
+    ('LND_VAL', 'N', 12, 0),
+    ('BLD_SQFT', 'N', 10, 0),
+    ('LU_CODE', 'C', 4, 0),
+    ('FAR', 'N', 8, 3),
+]
+
+_SHP_POINT = 1
+
+
+def _shp_header(file_length_words, bbox):
+    """100 byte main file header shared by the .shp and .shx files."""
+    return (struct.pack('>7i', 9994, 0, 0, 0, 0, 0, file_length_words)
+            + struct.pack('<2i', 1000, _SHP_POINT)
+            + struct.pack('<8d', bbox[0], bbox[1], bbox[2], bbox[3], 0, 0, 0, 0))
+
+
+def _text(values, length):
+    return np.char.ljust(values.astype(f'S{length}'), length)
+
+
+def _numbers(values, length, decimals):
+    fmt = f'%{length}.{decimals}f' if decimals else f'%{length}d'
+    return np.char.mod(fmt, values).astype(f'S{length}')
+
+
+def make_point_shapefile(shp_path, n_rows, seed=0):
+    """
+    Write a point shapefile with ``n_rows`` parcels and a typed attribute table.
+
+    Returns:
+        Path to the .shp file.
+    """
+    shp_path = Path(shp_path)
+    shp_path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    x = rng.uniform(-82.0, -80.0, n_rows)
+    y = rng.uniform(25.0, 27.0, n_rows)
+    bbox = (x.min(), y.min(), x.max(), y.max()) if n_rows else (0, 0, 0, 0)
+
+    # geometry, each record is an 8 byte big endian header and 20 bytes of content
+    rec_dtype = np.dtype([('num', '>i4'), ('len', '>i4'), ('type', '<i4'), ('x', '<f8'), ('y', '<f8')])
+    recs = np.empty(n_rows, dtype=rec_dtype)
+    recs['num'] = np.arange(1, n_rows + 1)
+    recs['len'] = 10
+    recs['type'] = _SHP_POINT
+    recs['x'] = x
+    recs['y'] = y
+    with open(shp_path, 'wb') as f:
+        f.write(_shp_header((100 + recs.nbytes) // 2, bbox))
+        f.write(recs.tobytes())
+
+    idx_dtype = np.dtype([('offset', '>i4'), ('len', '>i4')])
+    idx = np.empty(n_rows, dtype=idx_dtype)
+    idx['offset'] = (100 + np.arange(n_rows) * rec_dtype.itemsize) // 2
+    idx['len'] = 10
+    with open(shp_path.with_suffix('.shx'), 'wb') as f:
+        f.write(_shp_header((100 + idx.nbytes) // 2, bbox))
+        f.write(idx.tobytes())
+
+    # attributes
+    columns = {
+        'PARCEL_ID': _text(np.char.mod('P%010d', np.arange(n_rows)), 12),
+        'LND_VAL': _numbers(rng.integers(0, 5_000_000, n_rows), 12, 0),
+        'BLD_SQFT': _numbers(rng.integers(0, 200_000, n_rows), 10, 0),
+        'LU_CODE': _text(rng.choice(np.array(['RES', 'COM', 'IND', 'AG', 'VAC']), n_rows), 4),
+        'FAR': _numbers(rng.uniform(0, 10, n_rows), 8, 3),
+    }
+    write_dbf(shp_path.with_suffix('.dbf'), POINT_FIELDS, columns, n_rows)
+
+    shp_path.with_suffix('.prj').write_text(WGS84_PRJ)
+    shp_path.with_suffix('.cpg').write_text('UTF-8')
+    return shp_path
+
+
+def write_dbf(dbf_path, fields, columns, n_rows):
+    """Write a dBase III table from fixed width byte string columns."""
+    record_length = 1 + sum(length for _, _, length, _ in fields)
+    header_length = 32 + 32 * len(fields) + 1
+
+    header = struct.pack('<BBBBIHH20x', 3, 120, 1, 1, n_rows, header_length, record_length)
+    for name, typ, length, decimals in fields:
+        header += struct.pack('<11sc4xBB14x', name.encode(), typ.encode(), length, decimals)
+    header += b'\r'
+
+    rec_dtype = np.dtype([('_deleted', 'S1')] + [(name, f'S{length}') for name, _, length, _ in fields])
+    recs = np.empty(n_rows, dtype=rec_dtype)
+    recs['_deleted'] = b' '
+    for name, _, _, _ in fields:
+        recs[name] = columns[name]
+
+    with open(dbf_path, 'wb') as f:
+        f.write(header)
+        f.write(recs.tobytes())
+        f.write(b'\x1a')
+    return Path(dbf_path)
+
+
+def make_registry(registry_path, n_rows, store_dir, n_files=10, file_size=1 << 20, seed=0):
+    """
+    Write a registry CSV with ``n_rows`` entries, the first ``n_files`` of which point at
+    files of ``file_size`` random bytes created in ``store_dir``.
+
+    Returns:
+        Tuple of the registry path and the list of source files created.
+    """
+    registry_path, store_dir = Path(registry_path), Path(store_dir)
+    registry_path.parent.mkdir(parents=True, exist_ok=True)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    sources = []
+    for i in range(min(n_files, n_rows)):
+        pth = Path(store_dir, f'source_{i:05d}.bin')
+        pth.write_bytes(rng.integers(0, 256, file_size, dtype=np.uint8).tobytes())
+        sources.append(pth)
+
+    with open(registry_path, 'w', newline='') as f:
+        f.write('tag,name,store\n')
+        for i in range(n_rows):
+            f.write(f'tag_{i:08d},source_{i:05d}.bin,{store_dir.as_posix()}\n')
+    return registry_path, sources
+
+
+def make_nested_config(n_keys, depth=4, seed=0):
+    """
+    Build a nested settings dictionary with about ``n_keys`` leaves spread over ``depth`` levels.
+
+    Returns:
+        Tuple of the dictionary and a list of dotted paths to its leaves.
+    """
+    rng = np.random.default_rng(seed)
+    breadth = 2
+    while breadth ** depth < n_keys:
+        breadth += 1
+    settings, leaves = {}, []
+    for i in range(n_keys):
+        digits = [(i // breadth ** lvl) % breadth for lvl in reversed(range(depth))]
+        keys = [f'level{lvl}_{d}' for lvl, d in enumerate(digits)]
+        node = settings
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = int(rng.integers(0, 1000))
+        leaves.append('.'.join(keys))
+    return settings, leaves
+
+
+def make_config_file(yml_path, n_keys, depth=4, seed=0):
+    """
+    Write a nested YAML settings file with about ``n_keys`` leaves.
+
+    Returns:
+        Tuple of the path and a list of dotted paths to the leaves.
+    """
+    import yaml
+
+    settings, leaves = make_nested_config(n_keys, depth, seed)
+    yml_path = Path(yml_path)
+    yml_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(yml_path, 'w') as f:
+        yaml.dump(settings, f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper))
+    return yml_path, leaves
@@ -0,0 +1,89 @@
+"""
+Track the cold start latency of the command line entry point, ``app/cli.py``.
+
+Each run starts a fresh interpreter, so nothing is already imported or cached in
+memory, and times ``python app/cli.py --help`` end to end. One additional run
+with ``-X importtime`` ranks the slowest imports, making it easy to see which
+dependency crept back into the import path.
+
+    python benchmarks/import_time.py --repeat 10 --output benchmarks/results/import_time.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+CLI_SCRIPT = Path(PROJECT_DIR, 'app', 'cli.py')
+
+
+def time_cold_start(command, repeat=5):
+    """Run a command in fresh interpreters and return the wall clock seconds of each run."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def slowest_imports(command, top=15):
+    """Run a command with ``-X importtime`` and return the top level imports with the largest cumulative time."""
+    proc = subprocess.run(command[:1] + ['-X', 'importtime'] + command[1:], cwd=PROJECT_DIR, check=True,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # top level imports are not indented beyond the single leading space
+        if name.startswith('  '):
+            continue
+        imports.append({'module': name.strip(), 'cumulative_ms': int(cumulative) / 1000})
+    return sorted(imports, key=lambda i: i['cumulative_ms'], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='number of cold starts to time')
+    parser.add_argument('--output', type=Path, default=None, help='optional json file to write results to')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='exit with an error if the median cold start exceeds this many seconds')
+    args = parser.parse_args()
+
+    command = [sys.executable, str(CLI_SCRIPT), '--help']
+    timings = time_cold_start(command, repeat=args.repeat)
+    result = {
+        'benchmark': 'cli_cold_start',
+        'command': ' '.join(command[1:]),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'max_s': max(timings),
+        'slowest_imports': slowest_imports(command),
+    }
+
+    print(f"cli cold start: median {result['median_s']:.3f}s, min {result['min_s']:.3f}s, "
+          f"max {result['max_s']:.3f}s over {args.repeat} runs")
+    for imp in result['slowest_imports']:
+        print(f"    {imp['cumulative_ms']:>10.1f} ms  {imp['module']}")
+
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+
+    if args.max_seconds is not None and result['median_s'] > args.max_seconds:
+        print(f'median cold start exceeds the {args.max_seconds:.3f}s budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
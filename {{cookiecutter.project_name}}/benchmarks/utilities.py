@@ -0,0 +1,261 @@
+"""
+Benchmark the support library utilities on synthetic data at several sizes.
+
+Each benchmark is timed over a few repeats, and run once more under tracemalloc
+for its peak memory. Synthetic data is generated deterministically and kept in
+the work directory, so it is only generated once per size. Results are written
+as JSON, and two result files are compared with the ``compare`` command, which
+exits with an error when anything slowed down beyond the threshold, or is in the
+baseline but missing from the current results without ``--only`` leaving it out.
+
+    python benchmarks/utilities.py run --sizes 10000 100000 --output benchmarks/results/utilities.json
+    python benchmarks/utilities.py compare benchmarks/results/base.json benchmarks/results/utilities.json
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(PROJECT_DIR, 'src')))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import generators  # noqa: E402
+
+DEFAULT_SIZES = (10_000, 100_000)
+
+# configurations and lookups are capped, since settings files never approach millions of keys
+MAX_CONFIG_KEYS = 100_000
+
+# slowdown, as a fraction of the baseline median, flagged by compare
+DEFAULT_THRESHOLD = 0.10
+
+
+# %% BENCHMARKS
+class Benchmark(object):
+    """A utility call to time, with an optional setup run before every repeat and not timed."""
+
+    def __init__(self, name, size, func, setup=None):
+        self.name = name
+        self.size = size
+        self.func = func
+        self.setup = setup
+
+    def run_once(self):
+        state = self.setup() if self.setup is not None else None
+        start = time.perf_counter()
+        self.func(state)
+        return time.perf_counter() - start
+
+    def peak_memory(self):
+        state = self.setup() if self.setup is not None else None
+        tracemalloc.start()
+        try:
+            self.func(state)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def _fresh_dir(pth):
+    def _setup():
+        shutil.rmtree(pth, ignore_errors=True)
+        pth.mkdir(parents=True)
+        return pth
+    return _setup
+
+
+def build_benchmarks(size, work_dir):
+    """Generate the synthetic data for a size, if not already there, and return its benchmarks."""
+    from {{cookiecutter.support_library}}.utilities import utils
+
+    data_dir = Path(work_dir, f'data_{size}')
+    shp_path = Path(data_dir, 'parcels.shp')
+    if not shp_path.exists():
+        generators.make_point_shapefile(shp_path, size)
+
+    registry_path = Path(data_dir, 'registry.csv')
+    store_dir = Path(data_dir, 'store')
+    if not registry_path.exists():
+        generators.make_registry(registry_path, size, store_dir, n_files=10)
+    sources = sorted(store_dir.glob('*.bin'))
+
+    n_keys = min(size, MAX_CONFIG_KEYS)
+    config_path = Path(data_dir, 'settings.yml')
+    leaves = generators.make_nested_config(n_keys)[1]
+    if not config_path.exists():
+        generators.make_config_file(config_path, n_keys)
+    lookups = [leaves[i] for i in np.random.default_rng(0).integers(0, len(leaves), n_keys)]
+
+    out_dir = Path(work_dir, 'out')
+
+    def _registry():
+        # a new index each repeat, so the registry csv is loaded every time
+        cache_dir = Path(_fresh_dir(out_dir)(), 'cache')
+        cache_dir.mkdir()
+        return utils.Registry(registry_path, data_dir=cache_dir, index_file=Path(out_dir, 'index.sqlite'))
+
+    def _registry_lookups(reg):
+        for i in np.random.default_rng(0).integers(0, size, 1000):
+            reg.lookup(f'tag_{i:08d}')
+
+    return [
+        Benchmark('shp_to_df', size, lambda _: utils.shp_to_df(shp_path)),
+        Benchmark('shp_to_df[use_cols]', size, lambda _: utils.shp_to_df(shp_path, use_cols=['LND_VAL'])),
+        Benchmark('copy_shapefiles', size, lambda out: utils.copy_shapefiles(shp_path, out), _fresh_dir(out_dir)),
+        Benchmark('Registry.lookup', size, _registry_lookups, _registry),
+        Benchmark('Registry.copy_file', size, lambda reg: [reg.copy_file(src) for src in sources], _registry),
+        Benchmark('Configuration.dot_settings', n_keys,
+                  lambda _: utils.Configuration(config_path).dot_settings),
+        Benchmark('DotDict.lookup', n_keys, lambda dot: [dot[key] for key in lookups],
+                  lambda: utils.Configuration(config_path).dot_settings),
+    ]
+
+
+def run_benchmark(bench, repeat=3):
+    # one untimed run first, so lazy imports and cold file caches are not counted
+    bench.run_once()
+    timings = [bench.run_once() for _ in range(repeat)]
+    return {
+        'name': bench.name,
+        'size': bench.size,
+        'repeat': repeat,
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'peak_mb': bench.peak_memory() / 2 ** 20,
+    }
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3, only=None, work_dir=None):
+    """Run every benchmark at every size, returning the results document."""
+    tmp = None
+    if work_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix='rp_bench_')
+        work_dir = tmp.name
+
+    results = []
+    try:
+        for size in sizes:
+            for bench in build_benchmarks(size, work_dir):
+                if only is not None and bench.name not in only:
+                    continue
+                res = run_benchmark(bench, repeat)
+                print(f"{res['name']:<28} {res['size']:>10,}  median {res['median_s']:>9.4f}s  "
+                      f"min {res['min_s']:>9.4f}s  peak {res['peak_mb']:>9.1f} MB")
+                results.append(res)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    return {
+        'benchmark': 'utilities',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'only': only,
+        'results': results,
+    }
+
+
+# %% COMPARISON
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two results documents, matching benchmarks on name and size.
+
+    Returns:
+        List of comparison rows, with ``slower`` set when the median time grew by more
+        than the threshold.
+    """
+    base = {(res['name'], res['size']): res for res in baseline['results']}
+    rows = []
+    for res in current['results']:
+        prev = base.get((res['name'], res['size']))
+        if prev is None:
+            continue
+        ratio = res['median_s'] / prev['median_s'] if prev['median_s'] > 0 else float('inf')
+        rows.append({
+            'name': res['name'],
+            'size': res['size'],
+            'baseline_s': prev['median_s'],
+            'current_s': res['median_s'],
+            'ratio': ratio,
+            'peak_mb_change': res['peak_mb'] - prev['peak_mb'],
+            'slower': ratio > 1 + threshold,
+        })
+    return rows
+
+
+def missing(baseline, current, only=None):
+    """
+    Benchmarks in the baseline that the current results do not have, other than those left
+    out on purpose by ``only``, given here or recorded by the current run.
+
+    Returns:
+        List of (name, size) pairs.
+    """
+    only = only if only is not None else current.get('only')
+    ran = {(res['name'], res['size']) for res in current['results']}
+    return [(res['name'], res['size']) for res in baseline['results']
+            if (res['name'], res['size']) not in ran and (only is None or res['name'] in only)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                            help='numbers of rows to generate, for instance 10000 100000 1000000 10000000')
+    run_parser.add_argument('--repeat', type=int, default=3, help='number of timed runs of each benchmark')
+    run_parser.add_argument('--only', nargs='+', default=None, help='names of the benchmarks to run')
+    run_parser.add_argument('--work-dir', type=Path, default=None,
+                            help='directory to keep generated data in between runs, a temporary one by default')
+    run_parser.add_argument('--output', type=Path, default=None, help='optional json file to write results to')
+
+    cmp_parser = commands.add_parser('compare', help='flag slowdowns between two result files')
+    cmp_parser.add_argument('baseline', type=Path)
+    cmp_parser.add_argument('current', type=Path)
+    cmp_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='fraction of the baseline median time a benchmark may slow down by')
+    cmp_parser.add_argument('--only', nargs='+', default=None,
+                            help='names of the benchmarks expected in the current results, '
+                                 'by default those the current run was limited to')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        result = run(args.sizes, args.repeat, args.only, args.work_dir)
+        if args.output is not None:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            args.output.write_text(json.dumps(result, indent=2))
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        flag = 'SLOWER' if row['slower'] else ''
+        print(f"{row['name']:<28} {row['size']:>10,}  {row['baseline_s']:>9.4f}s -> {row['current_s']:>9.4f}s  "
+              f"x{row['ratio']:.2f}  peak {row['peak_mb_change']:+.1f} MB  {flag}")
+    absent = missing(baseline, current, args.only)
+    for name, size in absent:
+        print(f"{name:<28} {size:>10,}  MISSING")
+    slower = [row for row in rows if row['slower']]
+    if len(slower):
+        print(f'{len(slower)} benchmarks slowed down by more than {args.threshold:.0%}')
+    if len(absent):
+        print(f'{len(absent)} benchmarks in the baseline are missing from the current results')
+    if len(slower) or len(absent):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,47 @@
+import os
 import sys
+import hashlib
+import shutil
+import subprocess
 import yaml
 from pathlib import Path
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import argparse
 
 project_dir = Path(__file__).resolve().parent
 
+# build environment written for mamba, and the lockfile copies used instead of solving when present
+BUILD_YML = Path("./build_environment.yml")
+BUILD_CONDA_LOCK = Path("./build_environment.conda.txt")
+BUILD_PIP_LOCK = Path("./build_environment.pip.txt")
+
+# pinned environments keyed on the combined hash of the environment files
+LOCK_DIR = Path(project_dir, "locks")
+
+# use the LibYAML C loader when available, it is much faster than the pure python loader
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@lru_cache(maxsize=None)
+def _load_yml(yml_file, mtime_ns):
+    """parse a yml file, cached on the resolved path and modification time so each file is only read once"""
+    with open(yml_file, "r") as stream:
+        return yaml.load(stream, Loader=_YAML_LOADER) or {}
+
+
+def read_yml(yml_file):
+    """reads yml to a dictionary, reusing the parsed result until the file changes"""
+    yml_file = Path(yml_file).resolve()
+    return _load_yml(yml_file, yml_file.stat().st_mtime_ns)
+
+
+def ordered_union(*lists):
+    """merge lists keeping the first occurrence of each item in order"""
+    return list(dict.fromkeys(item for lst in lists for item in lst))
+
 
 class Environment(object):
     def __init__(self, yml_file, pkg_prj_switch=False):
@@ -17,8 +52,7 @@ class Environment(object):
     @property
     def env_dict(self):
         """reads yml to a dictionary"""
-        with open(self.yml_file, "r") as stream:
-            return yaml.safe_load(stream)
+        return read_yml(self.yml_file)
 
     @property
     def env_name(self):
@@ -28,7 +62,7 @@ class Environment(object):
     @property
     def env_channels(self):
         """returns a list of channels"""
-        return self.env_dict.get("channels")
+        return list(self.env_dict.get("channels") or [])
 
     @property
     def env_dependencies(self):
@@ -44,7 +78,7 @@ class Environment(object):
         reads out the list of conda dependencies from environment.yml
         """
         return [
-            item for item in self.env_dict.get("dependencies") if type(item) is not dict
+            item for item in self.env_dict.get("dependencies") or [] if type(item) is not dict
         ]
 
     @property
@@ -53,12 +87,24 @@ class Environment(object):
         reads an environment.yml for local packages and returns a list of package names
         """
         local = []
-        for item in self.pip_deps:
+        for item in self.pip_deps():
             if item.startswith("-e"):
                 pkg = item.split("/")[-1]
                 local.append(pkg)
         return local
 
+    @property
+    def local_package_paths(self):
+        """
+        reads an environment.yml for local packages and returns the package directories,
+        resolved relative to the directory of the environment.yml
+        """
+        yml_dir = Path(self.yml_file).resolve().parent
+        return [
+            (yml_dir / item.split(" ", 1)[1].strip()).resolve()
+            for item in self.pip_deps() if item.startswith("-e")
+        ]
+
     def pip_deps(self):
         """
         checks an environment yaml for pip installs and returns a list
@@ -68,57 +114,163 @@ class Environment(object):
         if self.pkg_prj:
             deps = "rp_dependencies"
         pip_dict = [
-            item for item in self.env_dict.get(deps) if type(item) is dict
+            item for item in self.env_dict.get(deps) or [] if type(item) is dict
         ]
         if len(pip_dict) > 0:
             pip_dict = pip_dict[0]
-            return pip_dict["pip"]
+            return list(pip_dict["pip"])
         else:
             return []
 
-    def get_package_info(self):
+    def package_environments(self, max_workers=8):
         """
-        searches an environment.yml for relative editable pip installs,
-        return a dict of the environment.yml within the package
+        walks the graph of local packages referenced with relative editable pip installs,
+        reading each package environment.yml concurrently one level at a time, and returns
+        the package environments in breadth first order. Packages already visited are
+        skipped, so reference cycles between packages are reported rather than followed.
         """
-        pip_deps = []
-        conda_deps = []
-        channels = []
-        pkg_pip_deps = self.pip_deps()
+        root = Path(self.yml_file).resolve().parent
+        parents = {root: None}
+        level = []
+        for pth in self.local_package_paths:
+            if pth not in parents:
+                parents[pth] = root
+                level.append(pth)
+        environments = []
+
+        def _ancestors(pkg_dir):
+            while pkg_dir is not None:
+                yield pkg_dir
+                pkg_dir = parents[pkg_dir]
 
-        for item in pkg_pip_deps:
-            # if a local package is specified, append its pip and conda deps
+        def _read_package(pkg_dir):
+            yml_file = pkg_dir / "environment.yml"
+            if not yml_file.exists():
+                print(f"WARNING: {pkg_dir.name} does not have an environment.yml, skipping its dependencies")
+                return None
+            pkg_env = Environment(yml_file=yml_file)
+            pkg_env.env_dict  # parse in the worker thread
+            return pkg_env
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while len(level):
+                next_level = []
+                for pkg_dir, pkg_env in zip(level, executor.map(_read_package, level)):
+                    if pkg_env is None:
+                        continue
+                    environments.append(pkg_env)
+                    for dep_pth in pkg_env.local_package_paths:
+                        if dep_pth in parents:
+                            if dep_pth in _ancestors(pkg_dir):
+                                print(f"WARNING: local package cycle, {pkg_dir.name} references {dep_pth.name}")
+                            continue
+                        parents[dep_pth] = pkg_dir
+                        next_level.append(dep_pth)
+                level = next_level
+
+        return environments
+
+    def _project_relative_pip(self, pkg_env):
+        """pip dependencies of a package with editable installs rewritten relative to this environment"""
+        yml_dir = Path(self.yml_file).resolve().parent
+        pip_deps = []
+        for item in pkg_env.pkg_pip_deps:
             if item.startswith("-e"):
-                # get relative path
-                relative_yml = item.split(" ")[1]
-                yaml_data = Path(relative_yml, "environment.yml")
-                # read yml to dict
-                pkg_env = Environment(yml_file=yaml_data)
-                # append any dependencies
-                pkg_chans = [
-                    chan for chan in pkg_env.env_channels if chan not in channels
-                ]
-                if pkg_chans:
-                    channels += pkg_chans
-                if pkg_env.pkg_pip_deps:
-                    pkg_pips = [
-                        pdeps for pdeps in pkg_env.pkg_pip_deps if pdeps not in pip_deps
-                    ]
-                    if pkg_pips:
-                        pip_deps += pkg_pips
-                pkg_cdeps = [
-                    cdep for cdep in pkg_env.conda_deps if cdep not in conda_deps
-                ]
-                if pkg_cdeps:
-                    conda_deps += pkg_cdeps
+                pkg_dir = (Path(pkg_env.yml_file).resolve().parent / item.split(" ", 1)[1].strip()).resolve()
+                item = f"-e {Path(os.path.relpath(pkg_dir, yml_dir)).as_posix()}"
+            pip_deps.append(item)
+        return pip_deps
+
+    def get_package_info(self, pkg_envs=None):
+        """
+        searches an environment.yml for relative editable pip installs,
+        return the channels, conda dependencies and pip dependencies of all
+        local packages, including packages referenced by other packages
+        """
+        if pkg_envs is None:
+            pkg_envs = self.package_environments()
+        channels = ordered_union(*(pkg_env.env_channels for pkg_env in pkg_envs))
+        conda_deps = ordered_union(*(pkg_env.conda_deps for pkg_env in pkg_envs))
+        pip_deps = ordered_union(*(self._project_relative_pip(pkg_env) for pkg_env in pkg_envs))
         return channels, conda_deps, pip_deps
 
 
+def environment_hash(project_env, pkg_envs):
+    """
+    combined content hash of the project environment.yml and every local package environment.yml
+    it references, along with the platform, since resolved environments are platform specific
+    """
+    hsh = hashlib.sha256()
+    hsh.update(f"{sys.platform}|{project_env.pkg_prj}".encode())
+    for env in [project_env] + list(pkg_envs):
+        yml_file = Path(env.yml_file).resolve()
+        hsh.update(f"|{yml_file.parent.name}|".encode())
+        hsh.update(yml_file.read_bytes())
+    return hsh.hexdigest()[:16]
+
+
+def lock_paths(env_hash):
+    """conda explicit spec and pip requirements making up the lockfile for an environment hash"""
+    return Path(LOCK_DIR, f"{env_hash}.conda.txt"), Path(LOCK_DIR, f"{env_hash}.pip.txt")
+
+
+def _conda_exe():
+    return os.environ.get("CONDA_EXE", "conda")
+
+
+def record_lock(env_name, env_hash, build_yml=BUILD_YML):
+    """
+    pin a freshly solved environment, writing a conda explicit spec, which installs without
+    solving, and pip requirements, keeping the editable installs from the build environment
+    """
+    conda_lock, pip_lock = lock_paths(env_hash)
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+
+    explicit = subprocess.run([_conda_exe(), "list", "--explicit", "--md5", "--name", env_name],
+                              check=True, capture_output=True, text=True).stdout
+    # every installed distribution, not only the top level ones, so transitive dependencies are pinned too
+    frozen = subprocess.run([_conda_exe(), "run", "--name", env_name, "python", "-m", "pip", "list",
+                             "--format=freeze", "--exclude-editable"],
+                            check=True, capture_output=True, text=True).stdout
+
+    # keep the editable installs of local packages as they are in the build environment
+    build_pip = [item for item in read_yml(build_yml)["dependencies"] if type(item) is dict]
+    editable = [item for item in (build_pip[0]["pip"] if build_pip else []) if item.startswith("-e")]
+
+    conda_lock.write_text(explicit)
+    pip_lock.write_text("\n".join(editable + frozen.splitlines()) + "\n")
+    print(f"recorded lockfile {conda_lock.name} for {env_name}")
+    return conda_lock, pip_lock
+
+
+def use_lock(env_hash):
+    """
+    copy the lockfile for an environment hash next to the build environment if there is one,
+    otherwise remove any stale copy, so make only solves when the environment files changed
+    """
+    conda_lock, pip_lock = lock_paths(env_hash)
+    hit = conda_lock.exists() and pip_lock.exists()
+    for lock, build in [(conda_lock, BUILD_CONDA_LOCK), (pip_lock, BUILD_PIP_LOCK)]:
+        if hit:
+            shutil.copyfile(lock, build)
+        elif build.exists():
+            build.unlink()
+    return hit
+
+
+def clear_lock():
+    """remove any lockfile copies next to the build environment so the environment is solved"""
+    for build in (BUILD_CONDA_LOCK, BUILD_PIP_LOCK):
+        if build.exists():
+            build.unlink()
+
+
 def missing(list_a, list_b):
-    return [item for item in list_b if item not in list_a]
+    set_a = set(list_a)
+    return list(dict.fromkeys(item for item in list_b if item not in set_a))
 
 
-def main(project_yml, prj_pkg_switch):
+def main(project_yml, prj_pkg_switch, use_locks=True):
 
     project_env = Environment(yml_file=project_yml,
                               pkg_prj_switch=prj_pkg_switch)
@@ -129,7 +281,8 @@ def main(project_yml, prj_pkg_switch):
     proj_pip_deps = project_env.pip_deps()
 
     # generate list of channels and dependencies (conda and pip) in local packages
-    pkg_channels, pkg_conda_deps, pkg_pip_deps = project_env.get_package_info()
+    pkg_envs = project_env.package_environments()
+    pkg_channels, pkg_conda_deps, pkg_pip_deps = project_env.get_package_info(pkg_envs)
 
     # compare package list to project list and update project lists accordingly
     missing_channels = missing(list_a=proj_channels, list_b=pkg_channels)
@@ -149,19 +302,38 @@ def main(project_yml, prj_pkg_switch):
     )
 
     # write out new version of environment with package pips included
-    with open("./build_environment.yml", "w") as build_yml:
+    with open(BUILD_YML, "w") as build_yml:
         yaml.dump(dict(build_environment), build_yml)
 
+    # reuse the pinned environment if none of the environment files changed
+    env_hash = environment_hash(project_env, pkg_envs)
+    if use_locks and use_lock(env_hash):
+        print(f"environment files unchanged, using lockfile {env_hash}")
+    else:
+        clear_lock()
+        print(f"no lockfile for environment {env_hash}, the environment will be solved")
+
+    return env_hash
+
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument('--package', dest='package', default=False, action='store_true')
+    parser.add_argument('--no-lock', dest='use_locks', default=True, action='store_false',
+                        help='always solve the environment, ignoring any lockfile')
+    parser.add_argument('--record-lock', dest='record_lock', default=None, metavar='ENV_NAME',
+                        help='pin the named, freshly built, environment as the lockfile for the current files')
     args = parser.parse_args()
 
+    if args.record_lock is not None:
+        prj_env = Environment(yml_file=Path(project_dir, "environment.yml"), pkg_prj_switch=args.package)
+        record_lock(args.record_lock, environment_hash(prj_env, prj_env.package_environments()))
+        sys.exit(0)
+
     if args.package:
         print('building package version of environment')
     else:
         print('building project version of environment')
-    main(project_yml=Path(project_dir, "environment.yml"), prj_pkg_switch=args.package)
+    main(project_yml=Path(project_dir, "environment.yml"), prj_pkg_switch=args.package, use_locks=args.use_locks)
     # main(project_yml=Path(project_dir, "environment.yml"), prj_pkg_switch=True)
@@ -52,10 +52,16 @@ GOTO %1
     ENDLOCAL & (
         :: Install MAMBA for faster solves
         CALL conda install -c conda-forge mamba yaml -y
-        :: update environment with package dependencies
+        :: update environment with package dependencies, picking up the lockfile if nothing changed
         CALL python check_package_deps.py
-        :: Create new environment from environment file
-        CALL mamba env create -f build_environment.yml
+        :: Create new environment from the lockfile without solving, or solve and record a lockfile
+        IF EXIST build_environment.conda.txt (
+            CALL mamba create --name %ENV_NAME% --file build_environment.conda.txt -y
+            CALL conda run --name %ENV_NAME% python -m pip install -r build_environment.pip.txt
+        ) ELSE (
+            CALL mamba env create -f build_environment.yml
+            CALL python check_package_deps.py --record-lock %ENV_NAME%
+        )
         :: Activate the environment so you can get to work
         CALL activate %ENV_NAME%
         :: Install the local package in development (experimental) mode
@@ -0,0 +1,242 @@
+from pathlib import Path
+import argparse
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, NamedTuple, Sequence, Union
+
+# rendered into the generated project, so the project directory holds setup.py and the environment files
+PROJECT_DIR = Path(__file__).parent.absolute()
+SCRIPTS_DIR = Path(PROJECT_DIR, "scripts")
+PACKAGE_DEPS_SCRIPT = Path(PROJECT_DIR, "check_package_deps.py")
+
+PROJECT_NAME = "{{cookiecutter.project_name}}"
+SUPPORT_LIBRARY = "{{cookiecutter.support_library}}"
+ENV_NAME = "{{cookiecutter.conda_environment_name}}"
+ENV_NAME_ARC = f"{ENV_NAME}_arc"
+
+# lockfile copies written next to the build environment by check_package_deps.py when nothing changed
+BUILD_CONDA_LOCK = Path(PROJECT_DIR, "build_environment.conda.txt")
+BUILD_PIP_LOCK = Path(PROJECT_DIR, "build_environment.pip.txt")
+
+
+def _in_env(env_name, command):
+    """run a command inside a conda environment, activation does not carry over between subprocesses"""
+    return ["conda", "run", "--no-capture-output", "--name", env_name] + command
+
+
+# commands
+setup_conda = ["conda", "install", "-c", "conda-forge", "mamba", "yaml", "-y"]
+compile_env = ["python", PACKAGE_DEPS_SCRIPT]
+build_env = ["mamba", "env", "create", "-f", "build_environment.yml"]
+build_env_lock = ["mamba", "create", "--name", ENV_NAME, "--file", BUILD_CONDA_LOCK.name, "-y"]
+install_pip_lock = _in_env(ENV_NAME, ["python", "-m", "pip", "install", "-r", BUILD_PIP_LOCK.name])
+record_lock = ["python", PACKAGE_DEPS_SCRIPT, "--record-lock", ENV_NAME]
+build_env_arc = ["mamba", "env", "create", "-f", "environment_arc.yml"]
+env_activate = ["conda", "activate", ENV_NAME]
+env_activate_arc = ["conda", "activate", ENV_NAME_ARC]
+env_deactivate = ["conda", "deactivate"]
+install_local = _in_env(ENV_NAME, ["python", "-m", "pip", "install", "-e", "."])
+install_local_arc = _in_env(ENV_NAME_ARC, ["python", "-m", "pip", "install", "-e", "."])
+remove_env = ["mamba", "env", "remove", "--name", ENV_NAME]
+remove_env_arc = ["mamba", "env", "remove", "--name", ENV_NAME_ARC]
+
+
+class Step(NamedTuple):
+    """
+    A named step in a build, run once every step it requires has succeeded. The commands
+    can be a callable returning the commands, so they are only decided when the step starts.
+    """
+    name: str
+    commands: Union[Sequence[list], Callable[[], Sequence[list]]]
+    requires: Sequence[str] = ()
+
+
+class StepResult(NamedTuple):
+    """Outcome of a step, status is 'ok', 'failed' or 'skipped' when a required step failed"""
+    name: str
+    status: str
+    seconds: float
+    returncode: int = None
+
+
+_PRINT_LOCK = threading.Lock()
+
+
+def _print(line):
+    with _PRINT_LOCK:
+        print(line, flush=True)
+
+
+def _run_command(name, command, cwd):
+    """run a command streaming its output live, each line prefixed with the step name"""
+    _print(f"[{name}] >>> {' '.join(str(arg) for arg in command)}")
+    # tools such as conda and arcpy can write output in a legacy code page, so undecodable bytes are replaced
+    with subprocess.Popen([str(arg) for arg in command], cwd=cwd, stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, text=True, errors="replace", bufsize=1) as proc:
+        for line in proc.stdout:
+            _print(f"[{name}] {line.rstrip()}")
+    return proc.returncode
+
+
+def _run_step(step, cwd):
+    """run the commands of a step, any error marking the step failed rather than stopping the build"""
+    start = time.perf_counter()
+    try:
+        commands = step.commands() if callable(step.commands) else step.commands
+        for command in commands:
+            returncode = _run_command(step.name, command, cwd)
+            if returncode != 0:
+                return StepResult(step.name, "failed", time.perf_counter() - start, returncode)
+    except Exception as e:
+        _print(f"[{step.name}] {type(e).__name__}: {e}")
+        return StepResult(step.name, "failed", time.perf_counter() - start, -1)
+    return StepResult(step.name, "ok", time.perf_counter() - start, 0)
+
+
+def run_steps(steps, max_workers=4, cwd=PROJECT_DIR):
+    """
+    Run a graph of steps, starting each as soon as the steps it requires have succeeded, so
+    independent steps run concurrently. When a step fails, the steps depending on it are skipped.
+
+    Returns:
+        dictionary of step name to StepResult, in the order the steps finished
+    """
+    steps = {step.name: step for step in steps}
+    for step in steps.values():
+        unknown = [req for req in step.requires if req not in steps]
+        if len(unknown):
+            raise ValueError(f"step {step.name} requires unknown steps {unknown}")
+
+    results = {}
+    pending = dict(steps)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(pending) or len(running):
+            # skip steps depending on a failure, and start steps whose requirements have succeeded
+            for name, step in list(pending.items()):
+                if any(results.get(req, StepResult(req, "ok", 0)).status != "ok" for req in step.requires):
+                    results[name] = StepResult(name, "skipped", 0.0)
+                    _print(f"[{name}] skipped, a required step did not succeed")
+                    del pending[name]
+                elif all(req in results for req in step.requires):
+                    running[executor.submit(_run_step, step, cwd)] = name
+                    del pending[name]
+
+            if not len(running):
+                if len(pending):
+                    raise ValueError(f"steps {list(pending)} have circular requirements")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[result.name] = result
+                del running[future]
+
+    return results
+
+
+def print_timings(results):
+    """print the status and wall clock time of every step"""
+    width = max([len(name) for name in results] + [4])
+    print(f"{'step':<{width}}  {'status':<7}  {'seconds':>8}")
+    for res in results.values():
+        print(f"{res.name:<{width}}  {res.status:<7}  {res.seconds:>8.2f}")
+
+
+def _lock_aware_build():
+    """create the environment from the lockfile without solving if there is one, otherwise solve and record one"""
+    if BUILD_CONDA_LOCK.exists() and BUILD_PIP_LOCK.exists():
+        return [build_env_lock, install_pip_lock]
+    return [build_env, record_lock]
+
+
+# build graphs
+ENV_STEPS = [
+    Step("setup_conda", [setup_conda]),
+    Step("compile_env", [compile_env], requires=["setup_conda"]),
+    Step("build_env", _lock_aware_build, requires=["compile_env"]),
+    Step("install_local", [install_local], requires=["build_env"]),
+]
+ARC_ENV_STEPS = [
+    Step("setup_conda", [setup_conda]),
+    Step("build_env_arc", [build_env_arc], requires=["setup_conda"]),
+    Step("install_local_arc", [install_local_arc], requires=["build_env_arc"]),
+]
+
+
+def _command_runner(commands=None):
+    """run commands one after the other, stopping at the first failure"""
+    steps = [Step(f"{i}", [command], requires=[f"{i - 1}"] if i else ()) for i, command in enumerate(commands)]
+    return run_steps(steps, max_workers=1)
+
+
+def _make(steps, max_workers=4):
+    results = run_steps(steps, max_workers=max_workers)
+    print_timings(results)
+    return results
+
+
+# make functions
+def make_env(steps=ENV_STEPS, max_workers=4):
+    """Build the local environment from the environment file"""
+    results = _make(steps, max_workers)
+    print(f"activate the environment with: conda activate {ENV_NAME}")
+    return results
+
+
+def make_arc_env(steps=ARC_ENV_STEPS, max_workers=4):
+    """Build the local environment from the environment file for arcpy"""
+    results = _make(steps, max_workers)
+    print(f"activate the environment with: conda activate {ENV_NAME_ARC}")
+    return results
+
+
+def make_all_envs(max_workers=4):
+    """Build the standard and arcpy environments, overlapping the builds after the shared setup"""
+    steps = list({step.name: step for step in ENV_STEPS + ARC_ENV_STEPS}.values())
+    return _make(steps, max_workers)
+
+
+def drop_env(steps=(Step("remove_env", [remove_env]),), max_workers=4):
+    """Remove the environment"""
+    return _make(steps, max_workers)
+
+
+def drop_arc_env(steps=(Step("remove_env_arc", [remove_env_arc]),), max_workers=4):
+    """Remove the environment for arc"""
+    return _make(steps, max_workers)
+
+
+def switch_branches():
+    """switch local packages to project branch"""
+    pass
+
+
+def setup_user():
+    pass
+
+
+TARGETS = {
+    "make_env": make_env,
+    "make_arc_env": make_arc_env,
+    "make_all_envs": make_all_envs,
+    "drop_env": drop_env,
+    "drop_arc_env": drop_arc_env,
+}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("target", choices=list(TARGETS))
+    parser.add_argument("--max-workers", dest="max_workers", type=int, default=4,
+                        help="maximum number of steps run at the same time")
+    args = parser.parse_args()
+
+    results = TARGETS[args.target](max_workers=args.max_workers)
+    sys.exit(0 if all(res.status == "ok" for res in results.values()) else 1)
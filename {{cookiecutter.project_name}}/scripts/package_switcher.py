@@ -4,10 +4,19 @@
 3) if it is, set branch to (DEV_INIT)
 4) pull the latest changes
 6) create a new branch from the package with the project name as the branch [dev-init-project-name]
+
+All local packages are synced concurrently, each with a single Repo handle. The
+remote heads are read once per package with ``git ls-remote``, so packages whose
+base branch has not changed on the remote skip the pull, and project branches
+already up to date on the remote skip the push.
 """
-from git.repo import Repo
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from check_package_deps import Environment
+from typing import List, NamedTuple, Optional
+
+from git.repo import Repo
 
 RP_GITHUB_URL = "https://github.com/renaissanceplanning"
 PROJECT_DIR = Path(__file__).parent.parent
@@ -15,56 +24,128 @@ PACKAGES_DIR = PROJECT_DIR.parent / 'packages'
 
 # assumes all branches of our packages will be branches off of whatever is provided here
 DEFAULT_BRANCH = "DEV_INIT"
-BASE_BRANCH = {{cookiecutter.package_base_branch}}
-PROJECT_NAME = {{cookiecutter.project_name}}
+BASE_BRANCH = "{{cookiecutter.package_base_branch}}"
+PROJECT_NAME = "{{cookiecutter.project_name}}"
 ENVIRONMENT_YML = Path(PROJECT_DIR, 'environment.yml')
 
-environment = Environment(ENVIRONMENT_YML)
 
+class SyncResult(NamedTuple):
+    """Outcome of syncing one local package"""
+    package: str
+    status: str  # 'ok' or 'failed'
+    seconds: float
+    actions: List[str]
+    error: Optional[str] = None
 
-def locate_local_package(package_name):
+
+def locate_local_package(package_name, packages_dir=PACKAGES_DIR):
     """
     Given a package name, check it it exists in the packages directory
     """
-    pkg_path = Path(PACKAGES_DIR, package_name)
+    pkg_path = Path(packages_dir, package_name)
     if pkg_path.exists():
         return pkg_path
 
 
-def check_branch(package_path, branch_name):
+def check_branch(repo, branch_name):
     """
-    Given a package path and a branch name, check if the branch exists in the package
+    Given a repo, or a package path, and a branch name, check if the branch exists in the package
     """
-    repo = Repo(package_path)
-    if branch_name in repo.branches:
+    repo = repo if isinstance(repo, Repo) else Repo(repo)
+    if branch_name in repo.heads:
         return True
     return False
 
 
-def main():
-    # identify local packages in the environment and clone if they don't exist
-    for package in environment.local_packages:
-        pkg_path = locate_local_package(package)
-        prj_repo_name = f"{DEFAULT_BRANCH}-{PROJECT_NAME}"
-        # if package is local, switch to base branch "dev-init"
-        if pkg_path:
-            # switch branch to dev_init
-            repo = Repo(pkg_path)
-            if repo.active_branch.name != BASE_BRANCH:
-                repo.git.checkout(BASE_BRANCH)
-                repo.git.pull()
-        # otherwise clone the package from github
+def remote_heads(repo, remote='origin'):
+    """Get the commit of every branch on the remote in one round trip, without fetching any objects"""
+    heads = {}
+    for line in repo.git.ls_remote('--heads', remote).splitlines():
+        sha, ref = line.split('\t')
+        heads[ref[len('refs/heads/'):]] = sha
+    return heads
+
+
+def sync_package(package, packages_dir=PACKAGES_DIR, remote_url=RP_GITHUB_URL, base_branch=BASE_BRANCH,
+                 project_branch=f"{DEFAULT_BRANCH}-{PROJECT_NAME}", push=True):
+    """
+    Bring one local package onto the project branch, cloning it if it is not local yet.
+
+    Returns:
+        SyncResult with the actions taken and the time spent.
+    """
+    start = time.perf_counter()
+    actions = []
+    try:
+        pkg_path = locate_local_package(package, packages_dir)
+
+        # if package is not local, clone it from github
+        if pkg_path is None:
+            pkg_path = Path(packages_dir, package)
+            repo = Repo.clone_from(url=f'{remote_url}/{package}', to_path=str(pkg_path), branch=base_branch)
+            heads = remote_heads(repo)
+            actions.append('cloned')
+
+        # if package is local, switch to base branch and pull only if the remote moved
         else:
-            print(f'Cloning {package}')
-            repo = Repo.clone_from(url=f'{RP_GITHUB_URL}/{package}', to_path=str(pkg_path), branch=BASE_BRANCH)
+            repo = Repo(pkg_path)
+            heads = remote_heads(repo)
+            if repo.active_branch.name != base_branch:
+                repo.git.checkout(base_branch)
+                actions.append(f'checked out {base_branch}')
+            if heads.get(base_branch) != repo.head.commit.hexsha:
+                repo.git.pull('origin', base_branch)
+                actions.append('pulled')
+            else:
+                actions.append('up to date')
 
         # check if the project branch exists, if not create it
-        if not check_branch(pkg_path, prj_repo_name):
-            repo.create_head(prj_repo_name)
-        # check out the project branch and push up to github
-        repo.git.checkout(prj_repo_name)
-        repo.git.push()
+        if not check_branch(repo, project_branch):
+            repo.create_head(project_branch)
+            actions.append(f'created {project_branch}')
+
+        # check out the project branch and push up to github if the remote is behind
+        repo.git.checkout(project_branch)
+        if push and heads.get(project_branch) != repo.head.commit.hexsha:
+            repo.git.push('--set-upstream', 'origin', project_branch)
+            actions.append('pushed')
+
+        return SyncResult(package, 'ok', time.perf_counter() - start, actions)
+
+    except Exception as e:
+        return SyncResult(package, 'failed', time.perf_counter() - start, actions, error=str(e).strip())
+
+
+def sync_packages(packages, max_workers=4, **kwargs):
+    """Sync many local packages concurrently, passing keyword arguments through to sync_package."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda pkg: sync_package(pkg, **kwargs), packages))
+
+
+def print_summary(results, elapsed):
+    """Print the per package timings and actions."""
+    width = max([len(res.package) for res in results] + [7])
+    print(f"{'package':<{width}}  {'status':<6}  {'seconds':>8}  actions")
+    for res in results:
+        detail = res.error if res.error is not None else ', '.join(res.actions)
+        print(f"{res.package:<{width}}  {res.status:<6}  {res.seconds:>8.2f}  {detail}")
+    print(f"synced {len(results)} packages in {elapsed:.2f}s")
+
+
+def main(packages=None, max_workers=4, **kwargs):
+    # identify local packages in the environment
+    if packages is None:
+        sys.path.insert(0, str(PROJECT_DIR))
+        from check_package_deps import Environment
+        packages = Environment(ENVIRONMENT_YML).local_packages
+
+    start = time.perf_counter()
+    results = sync_packages(packages, max_workers=max_workers, **kwargs)
+    print_summary(results, time.perf_counter() - start)
+
+    return results
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    results = main()
+    sys.exit(1 if any(res.status == 'failed' for res in results) else 0)
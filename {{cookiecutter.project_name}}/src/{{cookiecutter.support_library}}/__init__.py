@@ -7,15 +7,26 @@ __copyright__ = 'Copyright 2020 by {{ cookiecutter.author_name }}'
 __all__ = ['example_function', 'ExampleObject']
 
 # add specific imports below if you want to organize your code into modules, which is mostly what I do
-from .utilities import utils
-
-from typing import Union
+import importlib
+from typing import TYPE_CHECKING, Dict, List, Union
 from pathlib import Path
 
-import pandas as pd
+# pandas is only imported for type checking here, and within the functions using it, to keep imports fast
+if TYPE_CHECKING:
+    import pandas as pd
+
 
+def __getattr__(name):
+    # load the utilities, which pull in the heavy geospatial backends, only when first referenced
+    if name == 'utilities':
+        return importlib.import_module('.utilities', __name__)
+    if name == 'utils':
+        return importlib.import_module('.utilities.utils', __name__)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
-def example_function(in_path: Union[str, Path]) -> pd.DataFrame:
+
+def example_function(in_path: Union[str, Path], usecols: List[str] = None, dtype: Dict[str, str] = None,
+                     **kwargs) -> 'pd.DataFrame':
     """
     This is an example function, mostly to provide a template for properly
     structuring a function and docstring for both you, and also for myself,
@@ -25,9 +36,13 @@ def example_function(in_path: Union[str, Path]) -> pd.DataFrame:
     Args:
         in_path: Required path to something you really care about, or at least
             want to exploit, a really big word used to simply say, *use*.
+        usecols: Optional list of columns to read, reading only what you need is much faster.
+        dtype: Optional dictionary of column name to dtype, so types do not have to be guessed.
+        **kwargs: Passed through to ``read_table``, such as ``cache=True`` or ``sep``.
 
     Returns:
-        Hypothetically, a Pandas Dataframe. Good luck with that.
+        Hypothetically, a Pandas Dataframe. Good luck with that. With ``cache=True`` the parsed table
+        is cached, so loading the same, unchanged, table again is near instant.
 
     .. code-block:: python
 
@@ -37,7 +52,9 @@ def example_function(in_path: Union[str, Path]) -> pd.DataFrame:
 
         df = example_function(pth)
     """
-    return pd.read_csv(in_path)
+    from .utilities.tables import read_table
+
+    return read_table(in_path, usecols=usecols, dtype=dtype, **kwargs)
 
 
 class ExampleObject(object):
@@ -54,7 +71,8 @@ class ExampleObject(object):
         super().__init__(*args, **kwargs)
 
     @staticmethod
-    def example_static_function(in_path: Union[str, Path]) -> pd.DataFrame:
+    def example_static_function(in_path: Union[str, Path], usecols: List[str] = None, dtype: Dict[str, str] = None,
+                                **kwargs) -> 'pd.DataFrame':
         """
         This is an example function, mostly to provide a template for properly
         structuring a function and docstring for both you, and also for myself,
@@ -64,6 +82,9 @@ class ExampleObject(object):
         Args:
             in_path: Required path to something you really care about, or at least
                 want to exploit, a really big word used to simply say, *use*.
+            usecols: Optional list of columns to read, reading only what you need is much faster.
+            dtype: Optional dictionary of column name to dtype, so types do not have to be guessed.
+            **kwargs: Passed through to ``read_table``, such as ``cache=True`` or ``sep``.
 
         Returns:
             Hypothetically, a Pandas Dataframe. Good luck with that.
@@ -76,7 +97,7 @@ class ExampleObject(object):
 
             df = ExampleObject.example_function(pth)
         """
-        return pd.read_csv(in_path)
+        return example_function(in_path, usecols=usecols, dtype=dtype, **kwargs)
 
     @classmethod
     def example_class_method(cls):
@@ -1,5 +1,48 @@
 __all__ = ['add_group', 'create_local_data_resources',
-           'Paths', 'Configuration', 'DotDict', 'Registry',
-           'create_aoi_mask_layer']
+           'Paths', 'Configuration', 'DotDict', 'FrozenDotDict', 'Registry',
+           'create_aoi_mask_layer', 'RegistryIndex', 'CacheManager',
+           'FetchReport', 'atomic_copy', 'shp_to_df', 'read_dbf', 'iter_dbf',
+           'copy_shapefiles', 'copy_shapefile_dir', 'shapefile_parts',
+           'provision_workspaces', 'FolderBackend', 'ArcpyBackend',
+           'aoi_mask_geometry', 'create_aoi_mask', 'read_table', 'iter_table',
+           'InterimStore', 'memoize', 'timed', 'timer',
+           'SpatialIndex', 'query_shapefile', 'download', 'ConnectionPool']
 
-from .utils import *
\ No newline at end of file
+import importlib
+
+# public names mapped to the submodule defining them, imported on first access so importing
+# utilities does not pull in pandas, fiona, arcgis or arcpy until something actually needs them
+_LAZY_NAMES = {
+    **dict.fromkeys([
+        'get_gis', 'clear_gis_sessions', 'add_group', 'add_directory_to_gis', 'create_local_data_resources',
+        'create_aoi_mask_layer',
+        'Paths', 'DotDict', 'FrozenDotDict', 'Configuration', 'os_cache', 'random_prefix', 'check_overwrite_path',
+        'shp_to_df', 'check_overwrite_paths', 'wait_for_trash', 'OverwriteResult',
+        'shapefile_parts', 'copy_shapefiles', 'copy_shapefile_dir', 'atomic_copy', 'FetchResult', 'FetchReport',
+        'Registry', 'has_arcgis', 'has_arcpy', 'SHAPEFILE_SIDECARS',
+    ], 'utils'),
+    **dict.fromkeys(['RegistryIndex', 'file_hash', 'CacheManager', 'CacheUsage'], 'registry_index'),
+    **dict.fromkeys(['download', 'ConnectionPool', 'remote_size', 'parse_checksum'], 'downloads'),
+    **dict.fromkeys(['read_dbf', 'iter_dbf', 'read_header', 'read_dbf_rows'], 'dbf'),
+    **dict.fromkeys(['provision_workspaces', 'FolderBackend', 'ArcpyBackend'], 'workspaces'),
+    **dict.fromkeys(['aoi_mask_geometry', 'create_aoi_mask'], 'aoi'),
+    **dict.fromkeys(['read_table', 'iter_table', 'table_files'], 'tables'),
+    **dict.fromkeys(['InterimStore'], 'interim'),
+    **dict.fromkeys(['memoize', 'evict'], 'memoize'),
+    **dict.fromkeys(['timed', 'timer', 'enable_timings', 'print_timings', 'timing_report'], 'timings'),
+    **dict.fromkeys(['SpatialIndex', 'query_shapefile', 'read_record_bounds', 'read_shapes'], 'spatial_index'),
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        value = getattr(importlib.import_module(f'.{_LAZY_NAMES[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    if name in set(_LAZY_NAMES.values()):
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
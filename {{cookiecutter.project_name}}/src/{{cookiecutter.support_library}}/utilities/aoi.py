@@ -0,0 +1,206 @@
+"""
+Area of interest (AOI) mask geometry, built with shapely so it works without arcpy.
+
+A mask is a frame around the AOI, in the AOI's own coordinate system, with the
+simplified AOI cut out of it. Erasing from a frame only somewhat larger than the
+AOI is far cheaper than erasing from a polygon covering the entire globe, and
+masks are cached keyed on the AOI geometries and parameters, so repeated map
+builds for the same study area reuse the mask without even dissolving the AOI.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Union
+
+from shapely import wkb as shapely_wkb
+from shapely.geometry import box, shape
+from shapely.geometry.base import BaseGeometry
+from shapely.ops import unary_union
+
+# number of masks kept in memory
+MASK_CACHE_SIZE = 32
+
+# number of masks kept in a disk cache directory
+MASK_DISK_CACHE_SIZE = 256
+
+_MASK_CACHE = OrderedDict()
+_MASK_CACHE_LOCK = threading.Lock()
+
+
+def _as_parts(aoi: Union[BaseGeometry, Iterable[BaseGeometry]]) -> List[BaseGeometry]:
+    """Get the geometries making up the AOI, a single geometry as a list of one."""
+    if isinstance(aoi, BaseGeometry):
+        return [aoi]
+    return list(aoi)
+
+
+def _as_geometry(parts: List[BaseGeometry]) -> BaseGeometry:
+    """Dissolve the AOI geometries into one, or pass a single geometry through."""
+    if len(parts) == 1:
+        return parts[0]
+    return unary_union(parts)
+
+
+def _bounds(parts: List[BaseGeometry]) -> tuple:
+    """Extent of the AOI geometries, the same as the extent of their dissolved union."""
+    bounds = [part.bounds for part in parts if not part.is_empty]
+    return (min(b[0] for b in bounds), min(b[1] for b in bounds),
+            max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+
+def mask_cache_key(aoi: Union[BaseGeometry, Iterable[BaseGeometry]], tolerance: float, frame_ratio: float) -> str:
+    """Key identifying a mask by the AOI geometries and the parameters used to build it."""
+    hsh = hashlib.sha1()
+    for part in _as_parts(aoi):
+        hsh.update(part.wkb)
+        hsh.update(b'|')
+    hsh.update(f'{tolerance!r}|{frame_ratio!r}'.encode())
+    return hsh.hexdigest()
+
+
+def clear_mask_cache():
+    """Discard all masks cached in memory."""
+    with _MASK_CACHE_LOCK:
+        _MASK_CACHE.clear()
+
+
+def prune_mask_cache(cache_dir: Union[str, Path], max_entries: int = None) -> int:
+    """
+    Remove the least recently used masks from a disk cache directory, keeping at most ``max_entries``,
+    by default ``MASK_DISK_CACHE_SIZE``.
+
+    Returns:
+        Number of masks removed.
+    """
+    max_entries = MASK_DISK_CACHE_SIZE if max_entries is None else max_entries
+    entries = []
+    for pth in Path(cache_dir).glob('*.wkb'):
+        try:
+            entries.append((pth.stat().st_mtime, pth))
+        except FileNotFoundError:
+            continue
+    entries.sort(reverse=True)
+    for _, pth in entries[max_entries:]:
+        pth.unlink(missing_ok=True)
+    return max(len(entries) - max_entries, 0)
+
+
+def _write_mask(mask: BaseGeometry, cache_pth: Path):
+    """Write a mask to a uniquely named temporary file and swap it in, so concurrent writers do not collide."""
+    cache_pth.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=cache_pth.parent, suffix='.tmp', delete=False) as tmp:
+        tmp.write(mask.wkb)
+    try:
+        os.replace(tmp.name, cache_pth)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
+
+
+def aoi_mask_geometry(aoi: Union[BaseGeometry, Iterable[BaseGeometry]], tolerance: float = None,
+                      tolerance_ratio: float = 0.01, frame_ratio: float = 0.5,
+                      cache_dir: Union[str, Path] = None) -> BaseGeometry:
+    """
+    Create a mask geometry covering everything around an area of interest.
+
+    Args:
+        aoi: Polygon, or iterable of polygons dissolved into one, in the coordinate system
+            the mask should be in.
+        tolerance: Simplification tolerance in the AOI's units. Defaults to ``tolerance_ratio``
+            times the average of the AOI extent width and height.
+        tolerance_ratio: Fraction of the AOI extent used as the default tolerance.
+        frame_ratio: How far the mask frame extends beyond the AOI extent on every side, as
+            a fraction of the extent width and height.
+        cache_dir: Optional directory to also cache masks on disk as WKB, so they are reused
+            across processes. The least recently used masks beyond ``MASK_DISK_CACHE_SIZE`` are
+            removed.
+
+    Returns:
+        Mask geometry, the frame with the simplified AOI removed.
+
+    .. code-block:: python
+
+        from shapely.geometry import Point
+        from {{cookiecutter.support_library}}.utilities.aoi import aoi_mask_geometry
+
+        mask = aoi_mask_geometry(Point(500000, 3000000).buffer(10000))
+    """
+    parts = _as_parts(aoi)
+    if (all(part.is_empty for part in parts)
+            or any(part.geom_type not in ('Polygon', 'MultiPolygon') for part in parts)):
+        raise ValueError('The area of interest must be a polygon.')
+
+    # the extent and key come from the parts, so a cached mask is found without dissolving them
+    minx, miny, maxx, maxy = _bounds(parts)
+    width, height = maxx - minx, maxy - miny
+    if tolerance is None:
+        tolerance = (width + height) / 2 * tolerance_ratio
+
+    key = mask_cache_key(parts, tolerance, frame_ratio)
+
+    # first look in memory, then on disk
+    with _MASK_CACHE_LOCK:
+        mask = _MASK_CACHE.get(key)
+        if mask is not None:
+            _MASK_CACHE.move_to_end(key)
+            return mask
+
+    cache_pth = None if cache_dir is None else Path(cache_dir, f'{key}.wkb')
+    mask = None
+    if cache_pth is not None:
+        try:
+            mask = shapely_wkb.loads(cache_pth.read_bytes())
+            os.utime(cache_pth)
+        except FileNotFoundError:
+            pass
+
+    # dissolve and simplify the geometry for rendering efficiency, and cut it out of the frame
+    if mask is None:
+        aoi = _as_geometry(parts)
+        smpl = aoi.simplify(tolerance, preserve_topology=True)
+        frame = box(minx - width * frame_ratio, miny - height * frame_ratio,
+                    maxx + width * frame_ratio, maxy + height * frame_ratio)
+        mask = frame.difference(smpl)
+
+        if cache_pth is not None:
+            _write_mask(mask, cache_pth)
+            prune_mask_cache(cache_pth.parent)
+
+    with _MASK_CACHE_LOCK:
+        _MASK_CACHE[key] = mask
+        while len(_MASK_CACHE) > MASK_CACHE_SIZE:
+            _MASK_CACHE.popitem(last=False)
+
+    return mask
+
+
+def create_aoi_mask(aoi_path: Union[str, Path], output_path: Union[str, Path], driver: str = None,
+                    **kwargs) -> Path:
+    """
+    Create an AOI mask feature class from a polygon dataset without arcpy.
+
+    Args:
+        aoi_path: Path to a polygon dataset readable by fiona, such as a shapefile.
+        output_path: Path to write the mask to, in the coordinate system of the AOI.
+        driver: Optional fiona driver for the output. Defaults to the driver of the input.
+        **kwargs: Passed through to ``aoi_mask_geometry``.
+
+    Returns:
+        Path to the mask dataset.
+    """
+    import fiona
+    from shapely.geometry import mapping
+
+    with fiona.open(aoi_path) as src:
+        crs_wkt = src.crs_wkt
+        driver = src.driver if driver is None else driver
+        mask = aoi_mask_geometry([shape(feat['geometry']) for feat in src], **kwargs)
+
+    schema = {'geometry': mask.geom_type, 'properties': {'id': 'int'}}
+    with fiona.open(output_path, 'w', driver=driver, crs_wkt=crs_wkt, schema=schema) as dst:
+        dst.write({'geometry': mapping(mask), 'properties': {'id': 1}})
+
+    return Path(output_path)
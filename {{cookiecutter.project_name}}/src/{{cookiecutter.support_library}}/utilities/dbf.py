@@ -0,0 +1,304 @@
+"""
+Columnar reader for dBase (.dbf) attribute tables, the attribute store of shapefiles.
+
+Records in a DBF file are fixed width, so a block of records can be viewed as a
+NumPy structured array without parsing row by row. Only the requested columns
+are included in the view, and each one is converted to a typed array in a
+single vectorized pass.
+"""
+import codecs
+import re
+import struct
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .timings import timed
+
+# default number of records per chunk when iterating
+DEFAULT_CHUNKSIZE = 100_000
+
+# code page names written to .cpg files by ArcGIS and other tools that are not python codec names
+ESRI_CODE_PAGES = {
+    'UTF8': 'utf-8',
+    'UTF-8': 'utf-8',
+    'ANSI': 'cp1252',
+    'OEM': 'cp437',
+    'BIG5': 'big5',
+    'GB2312': 'gb2312',
+    'SJIS': 'shift_jis',
+    'SHIFT_JIS': 'shift_jis',
+}
+
+
+class DbfField(NamedTuple):
+    """Field descriptor from the DBF header"""
+    name: str
+    type: str
+    length: int
+    decimals: int
+    offset: int
+
+
+class DbfHeader(NamedTuple):
+    """Table level information from the DBF header"""
+    num_records: int
+    header_length: int
+    record_length: int
+    fields: List[DbfField]
+
+
+def _dbf_path(file_path: Union[str, Path]) -> Path:
+    """Accept a path to the .dbf or to any other part of a shapefile."""
+    file_path = Path(file_path)
+    if file_path.suffix.lower() != '.dbf':
+        file_path = file_path.with_suffix('.dbf')
+    return file_path
+
+
+def cpg_codec(code_page: str) -> Optional[str]:
+    """
+    Get the python codec for a code page name from a .cpg file, such as ``ANSI 1252``,
+    ``88591`` or ``UTF-8``.
+
+    Returns:
+        Codec name, or None if the code page is not recognized.
+    """
+    name = code_page.strip().upper()
+    if name in ESRI_CODE_PAGES:
+        return ESRI_CODE_PAGES[name]
+
+    # ISO 8859 parts, written as 88591, 8859-1 or ISO 8859-1
+    match = re.fullmatch(r'(?:ISO[ _-]?)?8859[ _-]?(\d{1,2})', name)
+    if match:
+        codec = f'iso8859-{match.group(1)}'
+    else:
+        # windows and dos code pages, written as ANSI 1252, CP1252, 1252 or 437
+        match = re.fullmatch(r'(?:ANSI|CP|OEM|WINDOWS)?[ _-]?(\d{3,5})', name)
+        codec = f'cp{match.group(1)}' if match else code_page.strip()
+
+    try:
+        return codecs.lookup(codec).name
+    except LookupError:
+        return None
+
+
+def _encoding(dbf_path: Path, encoding: Optional[str]) -> str:
+    """Use the explicit encoding if given, then the .cpg sidecar, then utf-8."""
+    if encoding is not None:
+        return encoding
+    cpg_path = dbf_path.with_suffix('.cpg')
+    if cpg_path.exists():
+        cpg = cpg_path.read_text(errors='replace').strip()
+        if len(cpg):
+            # an unrecognized code page falls back to utf-8, decoding errors are replaced anyway
+            return cpg_codec(cpg) or 'utf-8'
+    return 'utf-8'
+
+
+def read_header(file_path: Union[str, Path], encoding: str = None) -> DbfHeader:
+    """
+    Read the header and field descriptors of a DBF file.
+
+    Args:
+        file_path: Path to the .dbf file, or to the .shp of a shapefile.
+        encoding: Optional encoding for field names. Defaults to the .cpg sidecar or utf-8.
+
+    Returns:
+        DbfHeader with the record count, record length and field descriptors.
+    """
+    dbf_path = _dbf_path(file_path)
+    encoding = _encoding(dbf_path, encoding)
+
+    with open(dbf_path, 'rb') as f:
+        num_records, header_length, record_length = struct.unpack('<xxxxLHH20x', f.read(32))
+
+        # field descriptors are 32 bytes each until the 0x0D terminator
+        fields = []
+        offset = 1  # first byte of every record is the deletion flag
+        for _ in range((header_length - 33) // 32):
+            desc = f.read(32)
+            if desc[:1] == b'\r':
+                break
+            name = desc[:11].split(b'\x00')[0].decode(encoding, errors='replace').strip()
+            typ = chr(desc[11])
+            length, decimals = desc[16], desc[17]
+            fields.append(DbfField(name, typ, length, decimals, offset))
+            offset += length
+
+    return DbfHeader(num_records, header_length, record_length, fields)
+
+
+def _select_fields(header: DbfHeader, columns: Optional[List[str]]) -> List[DbfField]:
+    """Get the field descriptors for the requested columns in the requested order."""
+    if columns is None:
+        return list(header.fields)
+    if isinstance(columns, str):
+        columns = [columns]
+    by_name = {fld.name: fld for fld in header.fields}
+    missing = [col for col in columns if col not in by_name]
+    if len(missing):
+        raise KeyError(f'columns not found in the attribute table: {missing}')
+    return [by_name[col] for col in columns]
+
+
+def _record_dtype(header: DbfHeader, fields: List[DbfField]) -> np.dtype:
+    """Structured dtype viewing only the deletion flag and the selected fields of each record."""
+    return np.dtype({
+        'names': ['_deleted'] + [f'f{i}' for i in range(len(fields))],
+        'formats': ['S1'] + [f'S{fld.length}' for fld in fields],
+        'offsets': [0] + [fld.offset for fld in fields],
+        'itemsize': header.record_length,
+    })
+
+
+def _to_numeric(raw: np.ndarray, fld: DbfField):
+    """
+    Convert fixed width numeric text to nullable Int64 for integer fields, so every chunk of a
+    table has the same dtype whether or not it has blanks, otherwise float64 with NaN for blanks.
+    """
+    stripped = np.char.strip(raw)
+    if fld.type == 'N' and fld.decimals == 0:
+        # blank or overflow ('*' filled) values become missing in a nullable integer column
+        missing = (np.char.str_len(stripped) == 0) | np.char.startswith(stripped, b'*')
+        values = np.zeros(len(stripped), dtype=np.int64)
+        try:
+            values[~missing] = stripped[~missing].astype(np.int64)
+            return pd.arrays.IntegerArray(values, missing)
+        except ValueError:
+            pass
+    try:
+        return stripped.astype(np.float64)
+    except ValueError:
+        # blank or overflow ('*' filled) values become NaN
+        return pd.to_numeric(pd.Series(stripped).str.decode('ascii', errors='replace'), errors='coerce').to_numpy()
+
+
+def _convert(raw: np.ndarray, fld: DbfField, encoding: str):
+    """Convert one column of raw fixed width bytes to a typed array."""
+    if fld.type in ('N', 'F'):
+        return _to_numeric(raw, fld)
+
+    if fld.type == 'L':
+        first = raw.astype('S1')
+        values = np.full(len(raw), None, dtype=object)
+        values[np.isin(first, [b'Y', b'y', b'T', b't'])] = True
+        values[np.isin(first, [b'N', b'n', b'F', b'f'])] = False
+        return values
+
+    if fld.type == 'D':
+        text = pd.Series(np.char.strip(raw)).str.decode('ascii', errors='replace')
+        return pd.to_datetime(text, format='%Y%m%d', errors='coerce').to_numpy()
+
+    # character, memo pointers and anything else come through as stripped text
+    return pd.Series(np.char.strip(raw)).str.decode(encoding, errors='replace').to_numpy()
+
+
+def _frame(block: np.ndarray, fields: List[DbfField], encoding: str, start: int) -> pd.DataFrame:
+    """Build a DataFrame from a block of records, dropping records flagged as deleted."""
+    block = block[block['_deleted'] != b'*']
+    data = {fld.name: _convert(block[f'f{i}'], fld, encoding) for i, fld in enumerate(fields)}
+    index = pd.RangeIndex(start, start + len(block))
+    return pd.DataFrame(data, index=index, columns=[fld.name for fld in fields])
+
+
+def iter_dbf(file_path: Union[str, Path], columns: List[str] = None, chunksize: int = DEFAULT_CHUNKSIZE,
+             encoding: str = None) -> Iterator[pd.DataFrame]:
+    """
+    Iterate a DBF attribute table in fixed size DataFrame chunks, keeping memory bounded
+    by the chunk size rather than the table size.
+
+    Args:
+        file_path: Path to the .dbf file, or to the .shp of a shapefile.
+        columns: Optional list of columns to read. Only these columns are decoded.
+        chunksize: Number of records per chunk.
+        encoding: Optional text encoding. Defaults to the .cpg sidecar or utf-8.
+
+    Returns:
+        Iterator of DataFrames with a continuous index across chunks.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities import iter_dbf
+
+        for chunk in iter_dbf('C:/data/parcels.shp', columns=['PARCEL_ID', 'LND_VAL'], chunksize=500_000):
+            ...
+    """
+    dbf_path = _dbf_path(file_path)
+    encoding = _encoding(dbf_path, encoding)
+    header = read_header(dbf_path, encoding)
+    fields = _select_fields(header, columns)
+    dtype = _record_dtype(header, fields)
+
+    with open(dbf_path, 'rb') as f:
+        f.seek(header.header_length)
+        start = 0
+        remaining = header.num_records
+        while remaining > 0:
+            count = min(chunksize, remaining)
+            buf = f.read(count * header.record_length)
+            count = len(buf) // header.record_length
+            if count == 0:
+                break
+            block = np.frombuffer(buf, dtype=dtype, count=count)
+            chunk = _frame(block, fields, encoding, start)
+            start += len(chunk)
+            remaining -= count
+            yield chunk
+
+
+def read_dbf_rows(file_path: Union[str, Path], rows, columns: List[str] = None, encoding: str = None) -> pd.DataFrame:
+    """
+    Read only the given records of a DBF attribute table, without reading the rest of the file.
+
+    Args:
+        file_path: Path to the .dbf file, or to the .shp of a shapefile.
+        rows: Record numbers, zero based, to read.
+        columns: Optional list of columns to read. Only these columns are decoded.
+        encoding: Optional text encoding. Defaults to the .cpg sidecar or utf-8.
+
+    Returns:
+        DataFrame indexed by record number, in the order of ``rows``, with records
+        flagged as deleted dropped.
+    """
+    dbf_path = _dbf_path(file_path)
+    encoding = _encoding(dbf_path, encoding)
+    header = read_header(dbf_path, encoding)
+    fields = _select_fields(header, columns)
+    rows = np.asarray(rows, dtype=np.int64)
+    if not len(rows):
+        return pd.DataFrame(columns=[fld.name for fld in fields])
+
+    # the records are fixed width, so map them and pick out the requested ones
+    records = np.memmap(dbf_path, dtype=_record_dtype(header, fields), mode='r', offset=header.header_length,
+                        shape=(header.num_records,))
+    block = np.array(records[rows])
+    keep = block['_deleted'] != b'*'
+    df = _frame(block, fields, encoding, 0)
+    df.index = pd.Index(rows[keep], name=None)
+    return df
+
+
+@timed
+def read_dbf(file_path: Union[str, Path], columns: List[str] = None, encoding: str = None) -> pd.DataFrame:
+    """
+    Read a DBF attribute table into a DataFrame with typed columns.
+
+    Args:
+        file_path: Path to the .dbf file, or to the .shp of a shapefile.
+        columns: Optional list of columns to read. Only these columns are decoded.
+        encoding: Optional text encoding. Defaults to the .cpg sidecar or utf-8.
+
+    Returns:
+        DataFrame with integer fields as nullable Int64, other numeric fields as
+        float64, logical fields as objects holding True, False or None, date fields
+        as datetime64, and all other fields as strings.
+    """
+    header = read_header(file_path, encoding)
+    chunks = list(iter_dbf(file_path, columns=columns, chunksize=max(header.num_records, 1), encoding=encoding))
+    if len(chunks) == 0:
+        fields = _select_fields(header, columns)
+        return pd.DataFrame(columns=[fld.name for fld in fields])
+    return chunks[0]
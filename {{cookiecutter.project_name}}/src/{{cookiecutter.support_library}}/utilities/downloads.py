@@ -0,0 +1,285 @@
+"""
+HTTP downloads for registry files served from URLs.
+
+Connections are pooled, one per host and thread, and kept open between requests,
+so fetching many files from the same server does not pay for a new connection and
+TLS handshake every time. Each download is written to a ``.part`` file next to the
+target. An interrupted download is resumed from the end of the ``.part`` file with
+a range request, and servers that ignore ranges, such as ``http.server``, simply
+send the whole file again. The ETag or Last-Modified date of the download is kept
+next to the ``.part`` file and sent with ``If-Range`` when resuming, so a file
+changed on the server is downloaded again from the start rather than appended to
+a partial copy of the old one. The finished file is checked against its checksum
+and then renamed into place.
+"""
+import hashlib
+import http.client
+import os
+import posixpath
+import threading
+from pathlib import Path
+from typing import Optional, Tuple, Union
+from urllib.parse import quote, unquote, urljoin, urlsplit
+
+# read responses in 1 MiB blocks
+_BLOCK_SIZE = 1 << 20
+
+# suffix of the partial download kept next to the target until it completes
+PART_SUFFIX = '.part'
+
+# suffix of the file holding the ETag or Last-Modified date of a partial download
+VALIDATOR_SUFFIX = '.validator'
+
+DEFAULT_TIMEOUT = 60
+
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+_MAX_REDIRECTS = 5
+
+# errors raised when a server has closed a kept alive connection between requests
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                            ConnectionResetError, BrokenPipeError)
+
+
+def is_url(value) -> bool:
+    """True for http and https URL strings."""
+    return isinstance(value, str) and value.lower().startswith(('http://', 'https://'))
+
+
+def join_url(base: str, name: str) -> str:
+    """URL of a file name under a base URL, such as the store of a registry row."""
+    return f"{base.rstrip('/')}/{quote(name)}"
+
+
+def url_file_name(url: str) -> str:
+    """File name at the end of a URL path."""
+    return unquote(posixpath.basename(urlsplit(url).path))
+
+
+def parse_checksum(checksum: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Split a checksum into its algorithm and hex digest.
+
+    Checksums are written as ``'<algorithm>:<hex digest>'``, such as ``'md5:9e10...'``,
+    or as a bare hex digest, which is taken as SHA-256.
+
+    Returns:
+        Tuple of the algorithm and digest, or None for an empty checksum.
+    """
+    if not checksum:
+        return None
+    algorithm, sep, digest = checksum.strip().rpartition(':')
+    return (algorithm.lower() if sep else 'sha256'), digest.lower()
+
+
+class ConnectionPool(object):
+    """
+    HTTP connections kept open for reuse, one per host for every thread using the pool.
+
+    Args:
+        timeout: Seconds to wait on connecting and on each read before giving up.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    def _connection(self, scheme: str, netloc: str, fresh: bool = False) -> http.client.HTTPConnection:
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None or fresh:
+            if conn is not None:
+                conn.close()
+            conn_cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = conns[(scheme, netloc)] = conn_cls(netloc, timeout=self.timeout)
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    def _send(self, method: str, url: str, headers: dict) -> http.client.HTTPResponse:
+        parts = urlsplit(url)
+        target = f'{parts.path or "/"}?{parts.query}' if parts.query else parts.path or '/'
+        conn = self._connection(parts.scheme.lower(), parts.netloc)
+        try:
+            conn.request(method, target, headers=headers)
+            return conn.getresponse()
+        except _STALE_CONNECTION_ERRORS:
+            # the server closed the kept alive connection, so retry once on a new one
+            conn = self._connection(parts.scheme.lower(), parts.netloc, fresh=True)
+            conn.request(method, target, headers=headers)
+            return conn.getresponse()
+
+    def request(self, method: str, url: str, headers: dict = None) -> http.client.HTTPResponse:
+        """
+        Send a request on this thread's connection to the host, following redirects.
+
+        The response must be read to the end, or the connection discarded, before the
+        next request to the same host from the same thread. The URL the response came
+        from, after any redirects, is its ``url`` attribute.
+        """
+        for _ in range(_MAX_REDIRECTS + 1):
+            resp = self._send(method, url, headers or {})
+            resp.url = url
+            location = resp.getheader('Location')
+            if resp.status not in _REDIRECT_STATUSES or not location:
+                return resp
+            resp.read()
+            url = urljoin(url, location)
+        raise IOError(f'too many redirects requesting {url}')
+
+    def discard(self, url: str):
+        """Close this thread's connection to the host of a URL, such as after a failed read."""
+        parts = urlsplit(url)
+        conn = getattr(self._local, 'conns', {}).pop((parts.scheme.lower(), parts.netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        """Close every connection opened through the pool, from any thread."""
+        with self._lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened.clear()
+
+
+def remote_size(url: str, pool: ConnectionPool = None) -> Optional[int]:
+    """Size of the file at a URL from a HEAD request, or None if the server does not report it."""
+    pool = pool if pool is not None else ConnectionPool()
+    resp = pool.request('HEAD', url)
+    resp.read()
+    length = resp.getheader('Content-Length')
+    return int(length) if resp.status == 200 and length is not None else None
+
+
+def _total_size(resp: http.client.HTTPResponse) -> Optional[int]:
+    """Full size of the file from a 206 or 416 Content-Range or a 200 Content-Length header."""
+    if resp.status in (206, 416):
+        total = (resp.getheader('Content-Range') or '').rpartition('/')[2]
+        return int(total) if total.isdigit() else None
+    length = resp.getheader('Content-Length')
+    return int(length) if length is not None else None
+
+
+def _range_start(resp: http.client.HTTPResponse) -> Optional[int]:
+    """First byte of a 206 response from its Content-Range header, such as ``bytes 100-199/200``."""
+    content_range = (resp.getheader('Content-Range') or '').partition(' ')[2]
+    start = content_range.partition('-')[0]
+    return int(start) if start.isdigit() else None
+
+
+def _validator(resp: http.client.HTTPResponse) -> Optional[str]:
+    """Strong ETag, or otherwise the Last-Modified date, identifying the version of a file for If-Range."""
+    etag = resp.getheader('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return resp.getheader('Last-Modified')
+
+
+def _clear_partial(part_file: Path):
+    part_file.unlink(missing_ok=True)
+    part_file.with_name(f'{part_file.name}{VALIDATOR_SUFFIX}').unlink(missing_ok=True)
+
+
+def download(url: str, out_file: Union[str, Path], checksum: str = None,
+             pool: ConnectionPool = None) -> Tuple[int, str]:
+    """
+    Download a URL to a file, resuming the partial download left by an earlier attempt.
+
+    Args:
+        url: URL to download.
+        out_file: Path to write the file to.
+        checksum: Optional checksum the file must match, as ``'<algorithm>:<hex digest>'``
+            or a bare SHA-256 hex digest. A file that does not match is deleted.
+        pool: Optional connection pool to reuse connections from.
+
+    Returns:
+        Tuple of the number of bytes downloaded by this call and the hex digest of the
+        file, SHA-256 unless the checksum names another algorithm.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities.downloads import download
+
+        size, digest = download('https://example.com/data/parcels.zip', 'C:/data/parcels.zip',
+                                checksum='sha256:9f86d081884c7d65...')
+    """
+    out_file = Path(out_file)
+    expected = parse_checksum(checksum)
+    pool = pool if pool is not None else ConnectionPool()
+    part_file = out_file.with_name(f'{out_file.name}{PART_SUFFIX}')
+    validator_file = part_file.with_name(f'{part_file.name}{VALIDATOR_SUFFIX}')
+
+    offset = part_file.stat().st_size if part_file.exists() else 0
+    headers = {}
+    if offset:
+        headers['Range'] = f'bytes={offset}-'
+        # the server only sends the range if the file is still the version the partial download came from
+        if validator_file.exists():
+            headers['If-Range'] = validator_file.read_text()
+    resp = pool.request('GET', url, headers)
+
+    hsh = hashlib.new(expected[0] if expected is not None else 'sha256')
+    received = 0
+    try:
+        restart = False
+        if resp.status == 416 and offset:
+            # the range starts at or past the end of the file, which only means the earlier attempt got
+            # all of it if the partial download is exactly the size of the file
+            resp.read()
+            mode, total = None, offset
+            restart = _total_size(resp) != offset
+        elif resp.status == 206 and offset:
+            mode, total = 'ab', _total_size(resp)
+            restart = _range_start(resp) != offset
+            if restart:
+                resp.read()
+        elif resp.status == 200:
+            # a fresh download, or the server ignored the range or the file changed, and is sending all of it
+            mode, total, offset = 'wb', _total_size(resp), 0
+            validator = _validator(resp)
+            if validator is not None:
+                validator_file.write_text(validator)
+            else:
+                validator_file.unlink(missing_ok=True)
+        else:
+            resp.read()
+            raise IOError(f'{url} returned HTTP {resp.status} {resp.reason}')
+
+        if restart:
+            # the partial download does not line up with the file on the server, so start over
+            _clear_partial(part_file)
+            return download(url, out_file, checksum=checksum, pool=pool)
+
+        # the digest covers the whole file, so hash what an earlier attempt already wrote
+        if offset:
+            with open(part_file, 'rb') as f:
+                for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+                    hsh.update(block)
+
+        if mode is not None:
+            with open(part_file, mode) as f:
+                for block in iter(lambda: resp.read(_BLOCK_SIZE), b''):
+                    hsh.update(block)
+                    f.write(block)
+                    received += len(block)
+    except BaseException:
+        # the rest of the response may still be unread, so the connection to the host it came from,
+        # after any redirects, cannot be reused
+        pool.discard(getattr(resp, 'url', url))
+        raise
+
+    size = offset + received
+    if total is not None and size != total:
+        raise IOError(f'incomplete download of {url}, {size} of {total} bytes, fetch again to resume')
+
+    digest = hsh.hexdigest()
+    if expected is not None and digest != expected[1]:
+        _clear_partial(part_file)
+        raise ValueError(f'checksum mismatch for {url}, expected {expected[1]} but got {digest}')
+
+    os.replace(part_file, out_file)
+    validator_file.unlink(missing_ok=True)
+    return received, digest
@@ -0,0 +1,231 @@
+"""
+Columnar store for intermediate tables in the INTERIM data directory.
+
+Intermediates are written as Parquet, or GeoParquet for GeoDataFrames, which is
+compressed and read back with only the columns requested and with filters
+pushed down to skip row groups that cannot match. Intermediates re-read many
+times in a run can instead be written as uncompressed Arrow IPC (Feather v2)
+files, which are memory-mapped on read, so reloading them costs no copy and no
+decoding.
+
+The DataFrame index is stored with the table in both formats and restored on
+read, with a default ``RangeIndex`` kept only as metadata.
+"""
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Union
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from .timings import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# file suffixes of the formats in the store
+PARQUET_SUFFIX = '.parquet'
+ARROW_SUFFIX = '.arrow'
+
+# schema metadata key recording the geometry columns of a GeoDataFrame stored as Arrow
+_GEO_METADATA = b'rp_geo'
+
+
+def _is_geodataframe(df) -> bool:
+    return hasattr(df, 'geometry') and hasattr(df, 'crs') and hasattr(df, 'to_wkb')
+
+
+def _index_columns(schema: pa.Schema) -> List[str]:
+    """Names of the columns storing the pandas index, left out of ``RangeIndex`` tables."""
+    metadata = (schema.metadata or {}).get(b'pandas')
+    if metadata is None:
+        return []
+    return [col for col in json.loads(metadata).get('index_columns', []) if isinstance(col, str)]
+
+
+def _with_index(schema: pa.Schema, columns: Optional[List[str]]) -> Optional[List[str]]:
+    """Add the index columns to a column selection, so the index survives reading a subset."""
+    if columns is None:
+        return None
+    return list(columns) + [col for col in _index_columns(schema) if col not in columns]
+
+
+def _atomic_write(pth: Path, write):
+    """Write to a temporary file and swap it in, so readers never see a partial file."""
+    pth.parent.mkdir(parents=True, exist_ok=True)
+    tmp_pth = pth.with_name(f'{pth.name}.{os.getpid()}.tmp')
+    try:
+        write(tmp_pth)
+        os.replace(tmp_pth, pth)
+    finally:
+        if tmp_pth.exists():
+            tmp_pth.unlink()
+    return pth
+
+
+class InterimStore(object):
+    """
+    Named intermediate tables stored in a directory, usually ``Paths.dir_int``.
+
+    Args:
+        directory: Directory the tables are stored in.
+        compression: Parquet compression codec, such as ``'zstd'``, ``'snappy'`` or ``None``.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities import Paths
+
+        store = Paths().interim
+        store.write('parcels', parcel_df)
+        df = store.read('parcels', columns=['PARCEL_ID', 'LND_VAL'], filters=[('LND_VAL', '>', 100000)])
+    """
+
+    def __init__(self, directory: Union[str, Path], compression: Optional[str] = 'zstd'):
+        self.directory = Path(directory)
+        self.compression = compression
+
+    def __repr__(self):
+        return f'InterimStore({str(self.directory)!r})'
+
+    def path(self, name: str, suffix: str = PARQUET_SUFFIX) -> Path:
+        """Path to the file holding a named table."""
+        return Path(self.directory, f'{name}{suffix}')
+
+    def _find(self, name: str) -> Path:
+        for suffix in (PARQUET_SUFFIX, ARROW_SUFFIX):
+            pth = self.path(name, suffix)
+            if pth.exists():
+                return pth
+        raise FileNotFoundError(f'no interim table named {name} in {self.directory}')
+
+    def exists(self, name: str) -> bool:
+        """Whether a table with this name is in the store, in either format."""
+        return any(self.path(name, suffix).exists() for suffix in (PARQUET_SUFFIX, ARROW_SUFFIX))
+
+    def names(self) -> List[str]:
+        """Names of all tables in the store."""
+        if not self.directory.exists():
+            return []
+        return sorted({pth.stem for pth in self.directory.iterdir()
+                       if pth.suffix in (PARQUET_SUFFIX, ARROW_SUFFIX)})
+
+    def remove(self, name: str):
+        """Remove a table from the store, in both formats."""
+        for suffix in (PARQUET_SUFFIX, ARROW_SUFFIX):
+            self.path(name, suffix).unlink(missing_ok=True)
+
+    @timed
+    def write(self, name: str, df: 'pd.DataFrame', compression: Optional[str] = None,
+              row_group_size: int = None) -> Path:
+        """
+        Write a DataFrame as Parquet, or a GeoDataFrame as GeoParquet, replacing any
+        table with the same name. The index is written with the table.
+
+        Args:
+            name: Name of the table in the store.
+            df: DataFrame or GeoDataFrame to write.
+            compression: Compression codec. Defaults to the compression of the store.
+            row_group_size: Optional maximum rows per row group. Smaller row groups let filters
+                skip more of the file, at some cost in compression.
+
+        Returns:
+            Path to the Parquet file.
+        """
+        compression = self.compression if compression is None else compression
+        self.path(name, ARROW_SUFFIX).unlink(missing_ok=True)
+        return _atomic_write(self.path(name), lambda pth: df.to_parquet(
+            pth, compression=compression, row_group_size=row_group_size))
+
+    @timed
+    def read(self, name: str, columns: List[str] = None, filters: list = None) -> 'pd.DataFrame':
+        """
+        Read a table written with ``write``, as a GeoDataFrame if a GeoDataFrame was written.
+
+        Args:
+            name: Name of the table in the store.
+            columns: Optional list of columns to read, all others are never decoded. A geometry
+                column must be included to get a GeoDataFrame back.
+            filters: Optional row filters in the pyarrow format, such as ``[('YEAR', '==', 2020),
+                ('LND_VAL', '>', 0)]``. Row groups whose statistics cannot match are skipped.
+
+        Returns:
+            DataFrame or GeoDataFrame.
+        """
+        pth = self._find(name)
+        if pth.suffix == ARROW_SUFFIX:
+            return self.read_arrow(name, columns=columns, filters=filters)
+
+        schema = pq.read_schema(pth)
+        metadata = schema.metadata or {}
+        if b'geo' in metadata:
+            import geopandas as gpd
+            geo_cols = json.loads(metadata[b'geo'])['columns']
+            if columns is None or any(col in geo_cols for col in columns):
+                return gpd.read_parquet(pth, columns=columns, filters=filters)
+
+        return pq.read_table(pth, columns=_with_index(schema, columns), filters=filters).to_pandas()
+
+    @timed
+    def write_arrow(self, name: str, df: 'pd.DataFrame') -> Path:
+        """
+        Write a DataFrame or GeoDataFrame as an uncompressed Arrow IPC file, which is memory
+        mapped by ``read_arrow``. Geometries are stored as WKB, and the index is written with the table.
+
+        Returns:
+            Path to the Arrow file.
+        """
+        metadata = {}
+        if _is_geodataframe(df):
+            geo_cols = [col for col in df.columns if df[col].dtype.name == 'geometry']
+            crs = None if df.crs is None else df.crs.to_wkt()
+            metadata[_GEO_METADATA] = json.dumps(
+                {'columns': geo_cols, 'geometry': df.geometry.name, 'crs': crs}).encode()
+            df = df.to_wkb()
+
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+        self.path(name, PARQUET_SUFFIX).unlink(missing_ok=True)
+        return _atomic_write(self.path(name, ARROW_SUFFIX),
+                             lambda pth: feather.write_feather(table, pth, compression='uncompressed'))
+
+    @timed
+    def read_arrow(self, name: str, columns: List[str] = None, filters: list = None, as_table: bool = False):
+        """
+        Memory map a table written with ``write_arrow``.
+
+        Args:
+            name: Name of the table in the store.
+            columns: Optional list of columns to read.
+            filters: Optional row filters in the pyarrow format, as for ``read``. Arrow files have
+                no row group statistics, so the filters are applied to the mapped table, which
+                copies the matching rows.
+            as_table: Return the ``pyarrow.Table``, whose buffers point into the mapped file
+                without any copy, rather than converting to a DataFrame.
+
+        Returns:
+            pyarrow Table, DataFrame, or GeoDataFrame if a GeoDataFrame was written.
+        """
+        table = feather.read_table(self.path(name, ARROW_SUFFIX), memory_map=True)
+        if filters:
+            table = table.filter(pq.filters_to_expression(filters))
+        if columns is not None:
+            table = table.select(_with_index(table.schema, columns))
+        if as_table:
+            return table
+
+        df = table.to_pandas()
+        geo = (table.schema.metadata or {}).get(_GEO_METADATA)
+        if geo is None:
+            return df
+
+        import geopandas as gpd
+        geo = json.loads(geo)
+        geo_cols = [col for col in geo['columns'] if col in df.columns]
+        if not len(geo_cols):
+            return df
+        for col in geo_cols:
+            df[col] = gpd.GeoSeries.from_wkb(df[col], crs=geo['crs'])
+        geometry = geo['geometry'] if geo['geometry'] in geo_cols else geo_cols[0]
+        return gpd.GeoDataFrame(df, geometry=geometry, crs=geo['crs'])
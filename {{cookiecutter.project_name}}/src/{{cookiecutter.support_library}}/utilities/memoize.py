@@ -0,0 +1,319 @@
+"""
+On-disk memoization of expensive pipeline steps.
+
+Results are pickled under the user cache directory, keyed on the source code of
+the function, its arguments and, for arguments that are paths, the size and
+modification time (or the content hash) of the files they point to. Changing
+the function or any input means a new key, so re-running a notebook or job only
+recomputes the steps whose inputs changed.
+
+Each result is computed under a lock file created with ``O_CREAT | O_EXCL``, which
+works across processes and platforms, so parallel workers asking for the same
+result compute it once. The holder keeps the lock file's modification time fresh
+while it computes, so only a lock left behind by a process that died is broken.
+The cache is kept within a size and entry budget by evicting the least recently
+used results.
+"""
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path, PurePath
+from typing import Callable, Optional, Union
+
+from .registry_index import file_hash
+from .utils import os_cache
+
+# cache directory name under the user cache
+MEMO_CACHE_NAME = 'rp_cache_memo'
+
+RESULT_SUFFIX = '.pkl'
+LOCK_SUFFIX = '.lock'
+
+# minimum seconds between scans of the cache to evict results over the budget
+EVICT_INTERVAL = 30.0
+
+
+def _path_token(pth: Path, hash_paths: str):
+    """Identify the state of a path, a file by its size and mtime or content, a directory by its files."""
+    pth = Path(pth)
+    if not pth.exists():
+        return 'missing', str(pth)
+    if pth.is_dir():
+        files = sorted(p for p in pth.rglob('*') if p.is_file())
+        return 'dir', str(pth.resolve()), [(str(p.relative_to(pth)), _path_token(p, hash_paths)) for p in files]
+    if hash_paths == 'content':
+        return 'file', str(pth.resolve()), file_hash(pth)
+    stat = pth.stat()
+    return 'file', str(pth.resolve()), stat.st_size, stat.st_mtime_ns
+
+
+def _token(value, hash_paths: str):
+    """Reduce an argument to something with a stable byte representation for the cache key."""
+    if isinstance(value, PurePath):
+        return _path_token(Path(value), hash_paths)
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return value
+    if isinstance(value, dict):
+        return 'dict', sorted((repr(k), _token(v, hash_paths)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, [_token(v, hash_paths) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return 'set', sorted(repr(_token(v, hash_paths)) for v in value)
+
+    # data frames and arrays hash by content, pickles of either are not stable enough
+    if type(value).__module__.split('.')[0] in ('pandas', 'geopandas'):
+        import pandas as pd
+        if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+            try:
+                hashed = pd.util.hash_pandas_object(value, index=True).to_numpy()
+                return (type(value).__name__, list(getattr(value, 'columns', [])),
+                        hashlib.sha256(hashed.tobytes()).hexdigest())
+            except TypeError:
+                # cells holding lists or dictionaries cannot be hashed, so these fall back to a pickle
+                pass
+    if type(value).__module__ == 'numpy':
+        return 'ndarray', str(value.dtype), value.shape, hashlib.sha256(value.tobytes()).hexdigest()
+
+    try:
+        return 'pickle', hashlib.sha256(pickle.dumps(value, protocol=4)).hexdigest()
+    except Exception:
+        return 'repr', repr(value)
+
+
+def function_token(func: Callable) -> str:
+    """Identify a function by its qualified name and source, so editing it invalidates its results."""
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = repr(getattr(func, '__code__', func))
+    return f'{func.__module__}.{func.__qualname__}\n{source}'
+
+
+class _FileLock(object):
+    """
+    Lock held by creating a file exclusively, released by removing it. While held, a heartbeat
+    thread touches the file, so a lock is only stale once it has gone ``timeout`` seconds
+    without a heartbeat.
+    """
+
+    def __init__(self, pth: Path, timeout: float = 600.0, poll: float = 0.1):
+        self.pth = Path(pth)
+        self.timeout = timeout
+        self.poll = poll
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _owned(self) -> bool:
+        try:
+            return self.pth.read_text() == self.owner
+        except OSError:
+            return False
+
+    def _beat(self):
+        interval = max(min(self.timeout / 4, 30.0), 0.01)
+        while not self._stop.wait(interval):
+            try:
+                os.utime(self.pth)
+            except FileNotFoundError:
+                return
+
+    def __enter__(self):
+        while True:
+            try:
+                fd = os.open(self.pth, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, self.owner.encode())
+                os.close(fd)
+                break
+            except FileExistsError:
+                # a lock left behind by a process that died stops getting heartbeats, and is
+                # broken once it is older than the timeout
+                try:
+                    if time.time() - self.pth.stat().st_mtime > self.timeout:
+                        self.pth.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                time.sleep(self.poll)
+
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name=f'heartbeat-{self.pth.name}', daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._heartbeat.join()
+        # only remove the lock if it was not broken and taken by another process
+        if self._owned():
+            self.pth.unlink(missing_ok=True)
+
+
+def _load(pth: Path):
+    with open(pth, 'rb') as f:
+        return pickle.load(f)
+
+
+def _try_load(pth: Path):
+    """
+    Load a stored result, removing it if it cannot be loaded, such as a truncated pickle or one
+    referring to a class that no longer exists.
+
+    Returns:
+        Tuple of whether the result was loaded and the result.
+    """
+    try:
+        return True, _load(pth)
+    except FileNotFoundError:
+        return False, None
+    except Exception:
+        pth.unlink(missing_ok=True)
+        return False, None
+
+
+def _dump(value, pth: Path):
+    tmp_pth = pth.with_name(f'{pth.name}.{os.getpid()}.tmp')
+    with open(tmp_pth, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_pth, pth)
+
+
+def evict(cache_dir: Union[str, Path], max_bytes: Optional[int] = None, max_entries: Optional[int] = None) -> int:
+    """
+    Remove the least recently used results until the cache is within budget. Results are
+    touched when read, so their modification time is their last use.
+
+    Args:
+        cache_dir: Memoization cache directory.
+        max_bytes: Optional maximum total size of the results.
+        max_entries: Optional maximum number of results.
+
+    Returns:
+        Number of results removed.
+    """
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists() or (max_bytes is None and max_entries is None):
+        return 0
+
+    entries = []
+    for pth in cache_dir.rglob(f'*{RESULT_SUFFIX}'):
+        try:
+            stat = pth.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, pth))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, pth in entries:
+        over_bytes = max_bytes is not None and total > max_bytes
+        over_entries = max_entries is not None and len(entries) - removed > max_entries
+        if not (over_bytes or over_entries):
+            break
+        # leave results being recomputed alone
+        if pth.with_suffix(LOCK_SUFFIX).exists():
+            continue
+        pth.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def memoize(func: Callable = None, *, cache_dir: Union[str, Path] = None, hash_paths: str = 'mtime',
+            max_bytes: Optional[int] = None, max_entries: Optional[int] = None, lock_timeout: float = 600.0):
+    """
+    Decorator caching the results of a function on disk.
+
+    Args:
+        func: Function to memoize. The decorator can be used with or without arguments.
+        cache_dir: Directory for the results. Defaults to the user cache directory.
+        hash_paths: How path arguments are identified, ``'mtime'`` by their size and modification
+            time, or ``'content'`` by a hash of their contents, which survives copies and touches.
+        max_bytes: Optional maximum total size of this function's results, least recently used ones are
+            evicted after a new result is stored, at most once every ``EVICT_INTERVAL`` seconds.
+        max_entries: Optional maximum number of results of this function in the cache.
+        lock_timeout: Seconds without a heartbeat after which a lock left by a crashed process
+            is broken.
+
+    Returns:
+        The wrapped function, with ``cache_key``, ``cache_clear`` and ``uncached`` attributes.
+
+    .. code-block:: python
+
+        from pathlib import Path
+        from {{cookiecutter.support_library}}.utilities import memoize
+
+        @memoize(max_bytes=5 * 2**30)
+        def summarize_parcels(parcel_pth: Path, year: int):
+            ...
+
+        df = summarize_parcels(Path('C:/data/parcels.shp'), 2020)
+    """
+    if hash_paths not in ('mtime', 'content'):
+        raise ValueError(f"hash_paths must be 'mtime' or 'content', not '{hash_paths}'")
+
+    def decorator(fn):
+        root = Path(cache_dir) if cache_dir is not None else os_cache(MEMO_CACHE_NAME)
+        fn_dir = Path(root, f'{fn.__module__}.{fn.__qualname__}'.replace('<', '').replace('>', ''))
+        fn_token = function_token(fn)
+        signature = inspect.signature(fn)
+        budget = max_bytes is not None or max_entries is not None
+        last_evict = [0.0]
+
+        def cache_key(*args, **kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = [(name, _token(value, hash_paths)) for name, value in bound.arguments.items()]
+            return hashlib.sha256(repr((fn_token, arguments)).encode()).hexdigest()
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = cache_key(*args, **kwargs)
+            result_pth = Path(fn_dir, f'{key}{RESULT_SUFFIX}')
+
+            if result_pth.exists():
+                loaded, value = _try_load(result_pth)
+                if loaded:
+                    os.utime(result_pth)
+                    return value
+
+            fn_dir.mkdir(parents=True, exist_ok=True)
+            with _FileLock(result_pth.with_suffix(LOCK_SUFFIX), timeout=lock_timeout):
+                # another process may have computed the result while waiting for the lock
+                if result_pth.exists():
+                    loaded, value = _try_load(result_pth)
+                    if loaded:
+                        return value
+                value = fn(*args, **kwargs)
+                _dump(value, result_pth)
+
+            # scanning the cache is not free, so it is only done with a budget and not on every miss
+            now = time.monotonic()
+            if budget and now - last_evict[0] >= EVICT_INTERVAL:
+                last_evict[0] = now
+                # the budget is this function's, so other functions sharing the root keep their results
+                evict(fn_dir, max_bytes=max_bytes, max_entries=max_entries)
+            return value
+
+        def cache_clear():
+            """Remove all cached results of this function."""
+            if fn_dir.exists():
+                for pth in fn_dir.glob(f'*{RESULT_SUFFIX}'):
+                    pth.unlink(missing_ok=True)
+
+        wrapper.cache_key = cache_key
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_dir = fn_dir
+        wrapper.uncached = fn
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
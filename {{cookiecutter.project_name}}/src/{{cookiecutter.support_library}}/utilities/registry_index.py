@@ -0,0 +1,601 @@
+"""
+Persistent SQLite index backing the ``Registry`` local file cache.
+
+The index records the rows of the registry CSV along with the name, size,
+modification time and content hash of every file in the cache directory,
+so lookups and "is it already cached" checks do not need to re-read the
+CSV or walk the cache directory. ``CacheManager`` uses the same index to keep
+the cache directory under a size limit.
+"""
+import csv
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+from .downloads import is_url, parse_checksum
+
+# read files in 1 MiB blocks when hashing
+_HASH_BLOCK_SIZE = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS registry (
+    row INTEGER PRIMARY KEY,
+    tag TEXT,
+    name TEXT,
+    store TEXT,
+    checksum TEXT
+);
+CREATE INDEX IF NOT EXISTS registry_tag ON registry (tag);
+CREATE TABLE IF NOT EXISTS files (
+    relpath TEXT PRIMARY KEY,
+    name TEXT,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_name ON files (name);
+CREATE TABLE IF NOT EXISTS dirs (
+    relpath TEXT PRIMARY KEY,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    hash TEXT
+);
+CREATE TABLE IF NOT EXISTS access (
+    relpath TEXT PRIMARY KEY,
+    atime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS pins (
+    tag TEXT PRIMARY KEY
+);
+"""
+
+
+def file_hash(file_path: Union[str, Path], algorithm: str = 'sha256') -> str:
+    """
+    Compute the hex digest of a file's contents, reading in blocks so large files
+    are never loaded into memory at once.
+
+    Args:
+        file_path: Path to the file to hash.
+        algorithm: Any algorithm name understood by ``hashlib.new``.
+
+    Returns:
+        Hex digest string.
+    """
+    hsh = hashlib.new(algorithm)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            hsh.update(block)
+    return hsh.hexdigest()
+
+
+def _signature(st: os.stat_result) -> str:
+    """Compact change signature for a file from its stat result."""
+    return f'{st.st_size}:{st.st_mtime_ns}'
+
+
+class RegistryIndex(object):
+    """
+    On-disk index of a registry CSV and the local cache directory it populates.
+
+    The index is refreshed incrementally. The CSV is only re-parsed when its size
+    or modification time changes, and only cache directories whose modification
+    time changed are re-listed, so a refresh costs one ``stat`` per directory
+    rather than one per file. A file rewritten in place does not change its
+    directory's modification time, so where sizes must be exact, such as for a
+    maintenance report of cache usage, ``refresh_files(restat=True)`` also re-stats
+    every recorded file. Content hashes are computed lazily and reused until the file's
+    size or modification time changes.
+
+    Args:
+        registry_file: Path to the registry CSV with at least ``tag``, ``name`` and
+            ``store`` columns, and optionally a ``checksum`` column. A store may be a
+            directory or a base URL.
+        data_dir: Local cache directory the registry files are copied into.
+        index_file: Path to the SQLite database holding the index.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities.registry_index import RegistryIndex
+
+        idx = RegistryIndex('registry.csv', 'C:/cache', 'C:/cache_index/registry.sqlite')
+
+        if not idx.is_cached('parcels'):
+            ...
+    """
+
+    def __init__(self, registry_file: Union[str, Path], data_dir: Union[str, Path],
+                 index_file: Union[str, Path]):
+        self.registry_file = Path(registry_file)
+        self.data_dir = Path(data_dir)
+        self.index_file = Path(index_file)
+
+        if not self.index_file.parent.exists():
+            self.index_file.parent.mkdir(parents=True)
+
+        # single connection shared across threads, serialized with a lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.index_file), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+        # indexes made before the checksum column was added get it, and re-read the csv to fill it
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(registry)')]
+        if 'checksum' not in columns:
+            with self._conn:
+                self._conn.execute('ALTER TABLE registry ADD COLUMN checksum TEXT')
+                self._conn.execute("DELETE FROM meta WHERE key = 'registry_signature'")
+
+        # in memory copies of the registry rows, keyed on the csv signature
+        self._csv_sig = None
+        self._records = []
+        self._by_tag = {}
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    # meta helpers
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    # registry csv
+    def refresh_registry(self) -> bool:
+        """
+        Re-read the registry CSV into the index if it changed since the last refresh.
+
+        Returns:
+            True if the registry rows were reloaded from the CSV.
+        """
+        sig = _signature(self.registry_file.stat())
+
+        # nothing to do if the in-memory copy is current
+        if sig == self._csv_sig:
+            return False
+
+        with self._lock, self._conn:
+            reloaded = sig != self._get_meta('registry_signature')
+
+            # the csv changed on disk, so parse it and replace the stored rows
+            if reloaded:
+                with open(self.registry_file, newline='') as f:
+                    rows = [
+                        (i, rec.get('tag') or None, rec.get('name') or None, rec.get('store') or None,
+                         rec.get('checksum') or None)
+                        for i, rec in enumerate(csv.DictReader(f))
+                    ]
+                self._conn.execute('DELETE FROM registry')
+                self._conn.executemany(
+                    'INSERT INTO registry (row, tag, name, store, checksum) VALUES (?, ?, ?, ?, ?)', rows)
+                self._set_meta('registry_signature', sig)
+
+            # load the rows into memory for constant time lookups
+            cur = self._conn.execute('SELECT tag, name, store, checksum FROM registry ORDER BY row')
+            records = [{'tag': tag, 'name': name, 'store': store, 'checksum': checksum}
+                       for tag, name, store, checksum in cur]
+
+            # first record wins for duplicate tags, matching the order of the csv
+            by_tag = {}
+            for rec in records:
+                by_tag.setdefault(rec['tag'], rec)
+
+            # swap the new lookups in together, so readers never see a partly built index
+            self._records = records
+            self._by_tag = by_tag
+            self._csv_sig = sig
+
+        return reloaded
+
+    @property
+    def records(self) -> List[dict]:
+        """Registry rows as a list of ``{'tag', 'name', 'store', 'checksum'}`` dictionaries."""
+        self.refresh_registry()
+        return list(self._records)
+
+    @property
+    def tags(self) -> List[str]:
+        """Unique tags in registry order."""
+        self.refresh_registry()
+        return list(self._by_tag.keys())
+
+    def lookup(self, tag: str) -> Optional[dict]:
+        """Get the registry row for a tag, or None if the tag is not registered."""
+        self.refresh_registry()
+        rec = self._by_tag.get(tag)
+        return None if rec is None else dict(rec)
+
+    def local_path(self, tag: str) -> Optional[Path]:
+        """Path the file for a tag is stored at in the local cache."""
+        rec = self.lookup(tag)
+        if rec is None or rec['name'] is None:
+            return None
+        return Path(self.data_dir, rec['name'])
+
+    # cache directory
+    def _relpath(self, pth: Union[str, Path]) -> str:
+        return Path(os.path.relpath(pth, self.data_dir)).as_posix()
+
+    def _scan_dir(self, rel_dir: str, known_dirs: Dict[str, int], children: Dict[str, List[str]],
+                  seen_dirs: set):
+        """Re-list one directory if it changed, then recurse into its subdirectories."""
+        abs_dir = self.data_dir if rel_dir == '.' else Path(self.data_dir, rel_dir)
+
+        try:
+            dir_mtime = abs_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        seen_dirs.add(rel_dir)
+
+        # unchanged directory - the set of entries is the same, so only recurse into known children
+        if known_dirs.get(rel_dir) == dir_mtime:
+            subdirs = children.get(rel_dir, [])
+
+        # changed directory - re-list the entries and replace the file rows directly in it
+        else:
+            prefix = '' if rel_dir == '.' else f'{rel_dir}/'
+            files, subdirs = [], []
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(f'{prefix}{entry.name}')
+                    elif entry.is_file():
+                        st = entry.stat()
+                        files.append((f'{prefix}{entry.name}', entry.name, st.st_size, st.st_mtime_ns))
+
+            cur = self._conn.execute('SELECT relpath FROM files WHERE relpath LIKE ? ESCAPE ?',
+                                     (_like_prefix(prefix), '\\'))
+            stale = [(r,) for (r,) in cur if '/' not in r[len(prefix):]]
+            self._conn.executemany('DELETE FROM files WHERE relpath = ?', stale)
+            self._conn.executemany('INSERT INTO files (relpath, name, size, mtime_ns) VALUES (?, ?, ?, ?)', files)
+            self._conn.execute('INSERT OR REPLACE INTO dirs (relpath, mtime_ns) VALUES (?, ?)', (rel_dir, dir_mtime))
+
+        for child in subdirs:
+            self._scan_dir(child, known_dirs, children, seen_dirs)
+
+    def _restat_files(self):
+        """Update the size and modification time of recorded files rewritten in place, and drop removed files."""
+        changed, gone = [], []
+        for relpath, size, mtime_ns in self._conn.execute('SELECT relpath, size, mtime_ns FROM files').fetchall():
+            try:
+                st = os.stat(Path(self.data_dir, relpath))
+            except FileNotFoundError:
+                gone.append((relpath,))
+                continue
+            if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                changed.append((st.st_size, st.st_mtime_ns, relpath))
+        self._conn.executemany('UPDATE files SET size = ?, mtime_ns = ? WHERE relpath = ?', changed)
+        self._conn.executemany('DELETE FROM files WHERE relpath = ?', gone)
+
+    def refresh_files(self, restat: bool = False):
+        """
+        Bring the file rows up to date with the cache directory, re-listing only changed directories.
+
+        Args:
+            restat: Also stat every recorded file, catching files rewritten in place, which
+                leave the modification time of their directory unchanged.
+        """
+        with self._lock, self._conn:
+            known_dirs = dict(self._conn.execute('SELECT relpath, mtime_ns FROM dirs'))
+
+            # map each known directory to its known subdirectories
+            children = {}
+            for rel_dir in known_dirs:
+                if rel_dir != '.':
+                    parent = rel_dir.rsplit('/', 1)[0] if '/' in rel_dir else '.'
+                    children.setdefault(parent, []).append(rel_dir)
+
+            seen_dirs = set()
+            self._scan_dir('.', known_dirs, children, seen_dirs)
+
+            # drop directories, and the files in them, that no longer exist
+            for gone in set(known_dirs) - seen_dirs:
+                self._conn.execute('DELETE FROM dirs WHERE relpath = ?', (gone,))
+                self._conn.execute('DELETE FROM files WHERE relpath LIKE ? ESCAPE ?',
+                                   (_like_prefix(f'{gone}/'), '\\'))
+
+            if restat:
+                self._restat_files()
+
+    @property
+    def cached_files(self) -> List[Path]:
+        """Paths of all files in the cache directory."""
+        self.refresh_files()
+        with self._lock:
+            cur = self._conn.execute('SELECT relpath FROM files ORDER BY relpath')
+            return [Path(self.data_dir, r) for (r,) in cur]
+
+    def record_file(self, file_path: Union[str, Path], digest: str = None):
+        """
+        Record a file just written into the cache directory, optionally with its
+        already known content hash, so it does not have to be re-hashed later.
+        """
+        file_path = Path(file_path)
+        st = file_path.stat()
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO files (relpath, name, size, mtime_ns) VALUES (?, ?, ?, ?)',
+                               (self._relpath(file_path), file_path.name, st.st_size, st.st_mtime_ns))
+            if digest is not None:
+                self._conn.execute('INSERT OR REPLACE INTO hashes (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)',
+                                   (str(file_path.absolute()), st.st_size, st.st_mtime_ns, digest))
+
+    def hash(self, file_path: Union[str, Path]) -> str:
+        """
+        Content hash of any file, local or external, reusing the stored hash when the
+        file's size and modification time are unchanged.
+        """
+        file_path = Path(file_path)
+        st = file_path.stat()
+        key = str(file_path.absolute())
+
+        with self._lock:
+            row = self._conn.execute('SELECT size, mtime_ns, hash FROM hashes WHERE path = ?', (key,)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        # hash outside the lock so large files do not block other threads
+        digest = file_hash(file_path)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO hashes (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)',
+                               (key, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def is_cached(self, tag: str, verify: bool = False) -> bool:
+        """
+        Determine if the file for a tag is already in the local cache.
+
+        Args:
+            tag: Registry tag to check.
+            verify: If True, also compare the size and content hash of the cached copy
+                against the source listed in the registry, or against the registry checksum
+                when there is one.
+
+        Returns:
+            True if the file is cached (and matches its source when verifying).
+        """
+        local_pth = self.local_path(tag)
+        if local_pth is None or not local_pth.is_file():
+            return False
+
+        if verify:
+            rec = self._by_tag[tag]
+            if rec['checksum'] is not None:
+                return self.matches_checksum(local_pth, rec['checksum'])
+            # sources behind a URL are only verified through their checksum
+            if rec['store'] is None or is_url(rec['store']):
+                return True
+            return self.matches(Path(rec['store'], rec['name']), local_pth)
+
+        return True
+
+    def matches(self, source: Union[str, Path], target: Union[str, Path]) -> bool:
+        """True if two files have the same size and content hash, comparing size first."""
+        try:
+            if Path(source).stat().st_size != Path(target).stat().st_size:
+                return False
+        except FileNotFoundError:
+            return False
+        return self.hash(source) == self.hash(target)
+
+    def matches_checksum(self, file_path: Union[str, Path], checksum: str) -> bool:
+        """True if a file's content hash equals a checksum such as ``'sha256:9f86...'``."""
+        algorithm, digest = parse_checksum(checksum)
+        # only SHA-256 hashes are kept in the index, other algorithms are computed every time
+        actual = self.hash(file_path) if algorithm == 'sha256' else file_hash(file_path, algorithm)
+        return actual == digest
+
+
+class CacheUsage(NamedTuple):
+    """Size of the cache directory, from the file sizes recorded in the index"""
+    files: int
+    bytes: int
+    pinned_files: int
+    pinned_bytes: int
+    max_bytes: Optional[int]
+
+
+class CacheManager(object):
+    """
+    Keeps the cache directory of a ``RegistryIndex`` under a size limit by evicting
+    the least recently used files.
+
+    Accesses are recorded in the index, since many file systems do not update file
+    access times. Files never accessed through the registry count as last used when
+    they were written. Eviction reads the sizes recorded when the registry wrote each
+    file and the access times, oldest first, and stops as soon as the cache is back
+    under the low water mark, so it never walks the cache directory. Files rewritten
+    in place outside of the registry are only picked up by ``usage(refresh=True)`` or
+    ``RegistryIndex.refresh_files(restat=True)``. Shapefiles are evicted together with
+    their component files, and the files of pinned tags are never evicted.
+
+    Args:
+        index: Index of the registry and its cache directory.
+        max_bytes: Size to keep the cache directory under. None for no limit.
+        low_water: Fraction of ``max_bytes`` that eviction brings the cache down to,
+            so fetches made close to the limit do not each trigger another eviction.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities import Registry
+
+        reg = Registry('C:/data/registry.csv', max_bytes=50 * 2 ** 30)
+        reg.cache.pin('parcels', 'zoning')
+        print(reg.cache.usage())
+    """
+
+    def __init__(self, index: RegistryIndex, max_bytes: int = None, low_water: float = 0.9):
+        self.index = index
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        # lets the eviction query join each file to the shapefile it belongs to
+        with self._lock:
+            self._conn.create_function('rp_shp_candidate', 1, _shp_candidate, deterministic=True)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self.index._conn
+
+    @property
+    def _lock(self) -> threading.RLock:
+        return self.index._lock
+
+    # access and pins
+    def touch(self, paths: Iterable[Union[str, Path]]):
+        """Record files in the cache directory as used now."""
+        now = time.time_ns()
+        rows = [(self.index._relpath(pth), now) for pth in paths]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO access (relpath, atime_ns) VALUES (?, ?)', rows)
+
+    def pin(self, *tags: str):
+        """Never evict the files of these registry tags."""
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR IGNORE INTO pins (tag) VALUES (?)', [(tag,) for tag in tags])
+
+    def unpin(self, *tags: str):
+        """Allow the files of these registry tags to be evicted again."""
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM pins WHERE tag = ?', [(tag,) for tag in tags])
+
+    @property
+    def pinned(self) -> List[str]:
+        """Pinned registry tags."""
+        with self._lock:
+            return [tag for (tag,) in self._conn.execute('SELECT tag FROM pins ORDER BY tag')]
+
+    # eviction units, a file on its own or a shapefile with all of its component files
+    def _unit(self, relpath: str) -> str:
+        shp = _shp_candidate(relpath)
+        if shp is not None and self._conn.execute('SELECT 1 FROM files WHERE relpath = ?', (shp,)).fetchone():
+            return shp
+        return relpath
+
+    def _members(self, unit: str) -> List[tuple]:
+        """Relative path, size and last access of every file in a unit."""
+        sql = ('SELECT f.relpath, f.size, COALESCE(a.atime_ns, f.mtime_ns) FROM files f '
+               'LEFT JOIN access a ON a.relpath = f.relpath ')
+        if not unit.lower().endswith('.shp'):
+            return self._conn.execute(f'{sql}WHERE f.relpath = ?', (unit,)).fetchall()
+        stem = unit[:-4]
+        rows = self._conn.execute(f'{sql}WHERE f.relpath LIKE ? ESCAPE ?', (_like_prefix(f'{stem}.'), '\\'))
+        return [row for row in rows if row[0] in (unit, f'{unit}.xml') or row[0].rpartition('.')[0] == stem]
+
+    def _pinned_units(self) -> set:
+        units = set()
+        for tag in self.pinned:
+            rec = self.index.lookup(tag)
+            if rec is not None and rec['name'] is not None:
+                units.add(self._unit(Path(rec['name']).as_posix()))
+        return units
+
+    def _ensure_scanned(self):
+        """List the cache directory once if the index has never seen it."""
+        with self._lock:
+            scanned = self._conn.execute('SELECT 1 FROM dirs LIMIT 1').fetchone() is not None
+        if not scanned:
+            self.index.refresh_files()
+
+    def usage(self, refresh: bool = False) -> CacheUsage:
+        """
+        Size of the cache directory, read from the index rather than from disk.
+
+        Args:
+            refresh: Bring the index up to date with the directory first, to count files
+                added, removed or rewritten outside of the registry. Only changed directories
+                are re-listed, but every recorded file is re-stat'd.
+        """
+        if refresh:
+            self.index.refresh_files(restat=True)
+        else:
+            self._ensure_scanned()
+        with self._lock:
+            files, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files').fetchone()
+            pinned = [row for unit in self._pinned_units() for row in self._members(unit)]
+        return CacheUsage(files, size, len(pinned), sum(row[1] for row in pinned), self.max_bytes)
+
+    def enforce(self, protect: Iterable[Union[str, Path]] = ()) -> List[Path]:
+        """
+        Evict the least recently used files if the cache is over ``max_bytes``, until
+        it is under the low water mark.
+
+        Args:
+            protect: Paths in the cache directory not to evict, such as files just fetched.
+
+        Returns:
+            Paths of the evicted files.
+        """
+        if self.max_bytes is None:
+            return []
+        self._ensure_scanned()
+
+        with self._lock:
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM files').fetchone()[0]
+            if total <= self.max_bytes:
+                return []
+            target = self.max_bytes * self.low_water
+
+            seen = self._pinned_units() | {self._unit(self.index._relpath(pth)) for pth in protect}
+            victims, freed = [], 0
+            # the unit of each file comes from the same query, joining component files to their .shp
+            cur = self._conn.execute('SELECT COALESCE(s.relpath, f.relpath), COALESCE(a.atime_ns, f.mtime_ns) AS last '
+                                     'FROM files f LEFT JOIN access a ON a.relpath = f.relpath '
+                                     'LEFT JOIN files s ON s.relpath = rp_shp_candidate(f.relpath) ORDER BY last')
+            for unit, last in cur:
+                if unit in seen:
+                    continue
+                members = self._members(unit)
+                # a unit is used as recently as its most recently used file, where it comes up again
+                if max(row[2] for row in members) > last:
+                    continue
+                seen.add(unit)
+                victims += [row[0] for row in members]
+                freed += sum(row[1] for row in members)
+                if total - freed <= target:
+                    break
+            cur.close()
+
+            evicted = []
+            for relpath in victims:
+                pth = Path(self.index.data_dir, relpath)
+                try:
+                    pth.unlink()
+                except FileNotFoundError:
+                    pass
+                evicted.append(pth)
+
+            with self._conn:
+                self._conn.executemany('DELETE FROM files WHERE relpath = ?', [(r,) for r in victims])
+                self._conn.executemany('DELETE FROM access WHERE relpath = ?', [(r,) for r in victims])
+                self._conn.executemany('DELETE FROM hashes WHERE path = ?', [(str(pth.absolute()),) for pth in evicted])
+        return evicted
+
+
+def _shp_candidate(relpath: str) -> Optional[str]:
+    """The .shp a file would belong to if it is a shapefile component, or None for a .shp or a file without a suffix."""
+    stem, dot, _ = relpath.rpartition('.')
+    if not dot or relpath.lower().endswith('.shp'):
+        return None
+    # metadata is kept as parcels.shp.xml, the other component files as parcels.dbf and so on
+    return stem if relpath.lower().endswith('.shp.xml') else f'{stem}.shp'
+
+
+def _like_prefix(prefix: str) -> str:
+    """Escape a path prefix for use in a SQL LIKE pattern."""
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}%'
@@ -0,0 +1,324 @@
+"""
+Persistent spatial index for shapefiles, answering bounding box and intersects queries
+by reading only the matching records.
+
+The bounding box of every record is read straight from the .shp file, using the
+.shx offsets, without decoding any geometry. The boxes are packed into a static
+R-tree with the Sort-Tile-Recursive (STR) algorithm. Each node holds up to
+``node_size`` entries, nodes are stored level by level as plain NumPy arrays, and
+queries descend the tree one level at a time with vectorized box tests.
+
+The tree is saved in a sidecar file next to the shapefile. It records the size and
+modification time of the .shp and .shx files, so it is rebuilt when either one
+changes. If the shapefile directory is not writable, the sidecar is kept in the
+user cache instead.
+"""
+import hashlib
+import math
+from pathlib import Path
+from typing import Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .dbf import read_dbf_rows
+from .timings import timed
+from .utils import os_cache
+
+# suffix of the index sidecar file written next to the .shp
+SIDECAR_SUFFIX = '.rpidx'
+
+# cache directory name used when the shapefile directory is not writable
+INDEX_CACHE_NAME = 'rp_cache_spatial_index'
+
+# entries per tree node
+DEFAULT_NODE_SIZE = 16
+
+# records whose bounding boxes are read from the .shp at a time when building
+_BBOX_CHUNK = 1_000_000
+
+_INDEX_VERSION = 1
+
+# shape types storing a single point, all others store a bounding box after the shape type
+_POINT_TYPES = (1, 11, 21)
+
+Bounds = Tuple[float, float, float, float]
+
+
+def _signature(shp_path: Path) -> np.ndarray:
+    """Size and modification time of the .shp and .shx files."""
+    sig = []
+    for pth in (shp_path, shp_path.with_suffix('.shx')):
+        stat = pth.stat()
+        sig += [stat.st_size, stat.st_mtime_ns]
+    return np.array(sig, dtype=np.int64)
+
+
+def read_record_bounds(shp_path: Union[str, Path]) -> np.ndarray:
+    """
+    Read the bounding box of every record of a shapefile without decoding the geometries.
+
+    Args:
+        shp_path: Path to the .shp file.
+
+    Returns:
+        Array of shape (number of records, 4) with the minx, miny, maxx and maxy of each
+        record, NaN for null shapes.
+    """
+    shp_path = Path(shp_path)
+    shx = np.fromfile(shp_path.with_suffix('.shx'), dtype=[('offset', '>i4'), ('length', '>i4')], offset=100)
+    # offsets are in 16 bit words and point at the 8 byte record header
+    starts = shx['offset'].astype(np.int64) * 2 + 8
+
+    shp = np.memmap(shp_path, dtype=np.uint8, mode='r')
+    bounds = np.full((len(starts), 4), np.nan)
+    for first in range(0, len(starts), _BBOX_CHUNK):
+        chunk = starts[first:first + _BBOX_CHUNK]
+        # gather the shape type and the 32 bytes following it for every record in the chunk,
+        # clipped at the end of the file, since a trailing point record is only 20 bytes long
+        raw = np.asarray(shp[np.minimum(chunk[:, None] + np.arange(36), len(shp) - 1)])
+        shape_type = raw[:, :4].copy().view('<i4')[:, 0]
+        values = raw[:, 4:].copy().view('<f8')
+
+        point = np.isin(shape_type, _POINT_TYPES)
+        other = (shape_type != 0) & ~point
+        out = bounds[first:first + len(chunk)]
+        out[point] = values[point][:, [0, 1, 0, 1]]
+        out[other] = values[other]
+    return bounds
+
+
+def _str_order(bounds: np.ndarray, node_size: int) -> np.ndarray:
+    """Sort-Tile-Recursive order, tiles of boxes sorted by x, each tile sorted by y."""
+    n = len(bounds)
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+    n_leaves = math.ceil(n / node_size)
+    slice_size = math.ceil(math.sqrt(n_leaves)) * node_size
+    by_x = np.argsort(cx, kind='stable')
+    tile = np.empty(n, dtype=np.int64)
+    tile[by_x] = np.arange(n) // slice_size
+    return np.lexsort((cy, tile))
+
+
+def _pack_level(boxes: np.ndarray, node_size: int) -> np.ndarray:
+    """Bounding boxes of consecutive groups of ``node_size`` boxes."""
+    starts = np.arange(0, len(boxes), node_size)
+    return np.column_stack([
+        np.minimum.reduceat(boxes[:, 0], starts),
+        np.minimum.reduceat(boxes[:, 1], starts),
+        np.maximum.reduceat(boxes[:, 2], starts),
+        np.maximum.reduceat(boxes[:, 3], starts),
+    ])
+
+
+def _intersects(boxes: np.ndarray, bbox: Bounds) -> np.ndarray:
+    minx, miny, maxx, maxy = bbox
+    return (boxes[:, 0] <= maxx) & (boxes[:, 2] >= minx) & (boxes[:, 1] <= maxy) & (boxes[:, 3] >= miny)
+
+
+class SpatialIndex(object):
+    """
+    Packed STR R-tree over the record bounding boxes of a shapefile.
+
+    Use ``SpatialIndex.open`` to load the sidecar, building it first if it is missing
+    or out of date.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities import SpatialIndex
+
+        idx = SpatialIndex.open('C:/data/parcels.shp')
+        records = idx.query_bbox((-80.3, 25.7, -80.2, 25.8))
+    """
+
+    def __init__(self, shp_path: Path, order: np.ndarray, levels: List[np.ndarray], node_size: int,
+                 signature: np.ndarray):
+        self.shp_path = Path(shp_path)
+        self.order = order
+        self.levels = levels
+        self.node_size = node_size
+        self.signature = signature
+
+    def __len__(self):
+        return len(self.order)
+
+    def __repr__(self):
+        return f'SpatialIndex({str(self.shp_path)!r}, {len(self)} records, {len(self.levels)} levels)'
+
+    @property
+    def bounds(self) -> Bounds:
+        """Extent of all the indexed records."""
+        if not len(self.order):
+            return (np.nan,) * 4
+        return tuple(self.levels[-1][0])
+
+    @classmethod
+    def build(cls, shp_path: Union[str, Path], node_size: int = DEFAULT_NODE_SIZE) -> 'SpatialIndex':
+        """Build the index from the record bounding boxes, without saving it."""
+        shp_path = Path(shp_path)
+        signature = _signature(shp_path)
+        bounds = read_record_bounds(shp_path)
+
+        # null shapes are never returned by a query, so they are left out of the tree
+        valid = np.flatnonzero(~np.isnan(bounds[:, 0]))
+        order = valid[_str_order(bounds[valid], node_size)] if len(valid) else valid
+
+        levels = [bounds[order]]
+        while len(levels[-1]) > 1:
+            levels.append(_pack_level(levels[-1], node_size))
+        return cls(shp_path, order, levels, node_size, signature)
+
+    @staticmethod
+    def sidecar_paths(shp_path: Union[str, Path]) -> List[Path]:
+        """Locations the sidecar is looked for, next to the shapefile and in the user cache."""
+        shp_path = Path(shp_path).resolve()
+        key = hashlib.sha1(str(shp_path).encode()).hexdigest()
+        return [shp_path.with_suffix(SIDECAR_SUFFIX), Path(os_cache(INDEX_CACHE_NAME), f'{key}{SIDECAR_SUFFIX}')]
+
+    def save(self) -> Path:
+        """Write the index to its sidecar, falling back to the user cache if the directory is read only."""
+        arrays = {
+            'version': np.array([_INDEX_VERSION]),
+            'signature': self.signature,
+            'node_size': np.array([self.node_size]),
+            'order': self.order,
+            'level_sizes': np.array([len(level) for level in self.levels], dtype=np.int64),
+            'boxes': np.concatenate(self.levels) if len(self.levels) else np.empty((0, 4)),
+        }
+        for pth in self.sidecar_paths(self.shp_path):
+            try:
+                pth.parent.mkdir(parents=True, exist_ok=True)
+                tmp_pth = pth.with_name(f'{pth.name}.tmp')
+                with open(tmp_pth, 'wb') as f:
+                    np.savez(f, **arrays)
+                tmp_pth.replace(pth)
+                return pth
+            except OSError:
+                continue
+        raise OSError(f'could not write a spatial index for {self.shp_path}')
+
+    @classmethod
+    def load(cls, shp_path: Union[str, Path]) -> 'SpatialIndex':
+        """
+        Load the index from its sidecar.
+
+        Returns:
+            The index, or None if there is no sidecar for the current version of the shapefile.
+        """
+        shp_path = Path(shp_path)
+        signature = _signature(shp_path)
+        for pth in cls.sidecar_paths(shp_path):
+            if not pth.exists():
+                continue
+            with np.load(pth) as data:
+                if data['version'][0] != _INDEX_VERSION or not np.array_equal(data['signature'], signature):
+                    continue
+                boxes = data['boxes']
+                bounds = np.cumsum(np.concatenate([[0], data['level_sizes']]))
+                levels = [boxes[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+                return cls(shp_path, data['order'], levels, int(data['node_size'][0]), signature)
+        return None
+
+    @classmethod
+    @timed(name='SpatialIndex.open')
+    def open(cls, shp_path: Union[str, Path], rebuild: bool = False,
+             node_size: int = DEFAULT_NODE_SIZE) -> 'SpatialIndex':
+        """Load the index of a shapefile, building and saving it first if it is missing or out of date."""
+        index = None if rebuild else cls.load(shp_path)
+        if index is None:
+            index = cls.build(shp_path, node_size)
+            index.save()
+        return index
+
+    def query_bbox(self, bbox: Bounds) -> np.ndarray:
+        """
+        Find the records whose bounding boxes intersect a box.
+
+        Args:
+            bbox: Box as (minx, miny, maxx, maxy) in the coordinate system of the shapefile.
+
+        Returns:
+            Sorted array of record numbers, zero based.
+        """
+        if not len(self.order):
+            return np.empty(0, dtype=np.int64)
+
+        # descend from the root, keeping only the children of nodes intersecting the box
+        candidates = np.array([0])
+        for depth in range(len(self.levels) - 1, -1, -1):
+            boxes = self.levels[depth]
+            candidates = candidates[_intersects(boxes[candidates], bbox)]
+            if depth == 0 or not len(candidates):
+                break
+            children = (candidates[:, None] * self.node_size + np.arange(self.node_size)).ravel()
+            candidates = children[children < len(self.levels[depth - 1])]
+
+        if not len(candidates):
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self.order[candidates])
+
+
+def read_shapes(shp_path: Union[str, Path], records: Iterable[int]) -> list:
+    """
+    Read the geometries of the given records as shapely geometries, seeking to each
+    record through the .shx offsets rather than reading the whole file.
+    """
+    import shapefile
+    from shapely.geometry import shape
+
+    with shapefile.Reader(str(shp_path)) as reader:
+        shapes = []
+        for rec in records:
+            shp = reader.shape(int(rec))
+            shapes.append(None if shp.shapeType == shapefile.NULL else shape(shp.__geo_interface__))
+        return shapes
+
+
+@timed
+def query_shapefile(shp_path: Union[str, Path], bbox: Bounds = None, geometry=None, predicate: str = 'intersects',
+                    columns: List[str] = None, rebuild: bool = False) -> pd.DataFrame:
+    """
+    Read the records of a shapefile within a box or matching a geometry, reading only those
+    records from disk.
+
+    Args:
+        shp_path: Path to the .shp file.
+        bbox: Box as (minx, miny, maxx, maxy). Records whose bounding boxes intersect it are returned.
+        geometry: Shapely geometry. Records are narrowed by its bounding box and then tested with
+            the predicate.
+        predicate: Name of the shapely predicate tested between each record and the geometry,
+            such as ``'intersects'``, ``'within'`` or ``'contains'``.
+        columns: Optional list of attribute columns to read.
+        rebuild: Rebuild the spatial index even if the sidecar is current.
+
+    Returns:
+        DataFrame indexed by record number with the attributes and a ``geometry`` column of
+        shapely geometries, which ``geopandas.GeoDataFrame(df, geometry='geometry')`` converts.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities import query_shapefile
+
+        df = query_shapefile('C:/data/parcels.shp', geometry=neighborhood, columns=['PARCEL_ID', 'LND_VAL'])
+    """
+    if bbox is None and geometry is None:
+        raise ValueError('a bbox or a geometry is required')
+    if bbox is None:
+        bbox = geometry.bounds
+
+    records = SpatialIndex.open(shp_path, rebuild=rebuild).query_bbox(bbox)
+    shapes = read_shapes(shp_path, records)
+
+    # exact test of the candidates against the geometry
+    if geometry is not None:
+        import shapely
+        shapely.prepare(geometry)
+        test = getattr(shapely, predicate)
+        keep = np.array([shp is not None and bool(test(shp, geometry)) for shp in shapes], dtype=bool)
+        records = records[keep]
+        shapes = [shp for shp, k in zip(shapes, keep) if k]
+
+    df = read_dbf_rows(shp_path, records, columns=columns)
+    df['geometry'] = pd.Series(shapes, index=records, dtype=object).reindex(df.index)
+    return df
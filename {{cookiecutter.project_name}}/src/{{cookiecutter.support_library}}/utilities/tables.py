@@ -0,0 +1,248 @@
+"""
+Loading of large delimited tables, such as travel demand model outputs and parcel tables.
+
+Tables are read with only the columns needed and explicit dtypes, using the
+multithreaded pyarrow parser when available. A directory of partitioned CSVs is
+read in parallel and concatenated. Parsed tables can optionally be cached as
+Parquet, keyed on the size and modification time of every source file along with
+the columns and dtypes requested, so loading an unchanged table again only reads
+the cache. The cache is pruned, oldest first, to stay under a size budget.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from .timings import bind, timed
+from .utils import os_cache
+
+# directory under the user cache holding parsed tables
+TABLE_CACHE_NAME = 'rp_cache_tables'
+
+# default number of rows per chunk when iterating
+DEFAULT_CHUNKSIZE = 500_000
+
+# default size budget for the parquet cache, 2 GB
+DEFAULT_CACHE_BYTES = 2 * 1024 ** 3
+
+# read_csv options the pyarrow parser rejects, reading with the c parser instead when any is given
+PYARROW_UNSUPPORTED = frozenset({
+    'chunksize', 'comment', 'converters', 'dayfirst', 'delim_whitespace', 'dialect', 'float_precision',
+    'iterator', 'lineterminator', 'low_memory', 'memory_map', 'nrows', 'quoting', 'skipfooter',
+    'skipinitialspace', 'thousands',
+})
+
+logger = logging.getLogger(__name__)
+
+
+def has_pyarrow() -> bool:
+    """Whether pyarrow is installed, used for both the CSV parser and the Parquet cache."""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def table_files(source: Union[str, Path], pattern: str = '*.csv') -> List[Path]:
+    """
+    Get the files making up a table, the file itself or the partitions in a directory.
+
+    Args:
+        source: Path to a delimited file, or to a directory of partition files.
+        pattern: Glob pattern matching partition files when the source is a directory.
+
+    Returns:
+        Sorted list of file paths.
+    """
+    source = Path(source)
+    if source.is_dir():
+        files = sorted(pth for pth in source.glob(pattern) if pth.is_file())
+        if not len(files):
+            raise FileNotFoundError(f'no files matching {pattern} in {source}')
+        return files
+    if not source.exists():
+        raise FileNotFoundError(f'{source} does not exist')
+    return [source]
+
+
+def table_cache_key(files: List[Path], usecols: Optional[List[str]] = None,
+                    dtype: Optional[Dict[str, str]] = None, **read_kwargs) -> str:
+    """Key identifying a parsed table by its source files, their size and mtime, and the parse options."""
+    hsh = hashlib.sha1()
+    for pth in files:
+        stat = pth.stat()
+        hsh.update(f'{pth.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|'.encode())
+    usecols = None if usecols is None else list(usecols)
+    dtype = None if dtype is None else sorted((col, str(typ)) for col, typ in dtype.items())
+    hsh.update(repr((usecols, dtype, sorted(read_kwargs.items()))).encode())
+    return hsh.hexdigest()
+
+
+def _default_engine(usecols, read_kwargs: dict) -> str:
+    """The pyarrow parser if installed and it supports every option given, otherwise the c parser."""
+    if not has_pyarrow() or callable(usecols) or PYARROW_UNSUPPORTED.intersection(read_kwargs):
+        return 'c'
+    skiprows = read_kwargs.get('skiprows')
+    if skiprows is not None and not isinstance(skiprows, int):
+        return 'c'
+    if callable(read_kwargs.get('on_bad_lines')):
+        return 'c'
+    return 'pyarrow'
+
+
+def _read_csv(pth: Path, usecols, dtype, engine, **read_kwargs) -> pd.DataFrame:
+    return pd.read_csv(pth, usecols=usecols, dtype=dtype, engine=engine, **read_kwargs)
+
+
+def prune_table_cache(cache_dir: Union[str, Path], max_bytes: int = DEFAULT_CACHE_BYTES) -> List[Path]:
+    """
+    Remove the least recently used cached tables until the cache is no larger than ``max_bytes``.
+
+    Args:
+        cache_dir: Directory holding the Parquet cache.
+        max_bytes: Size budget for the cache in bytes.
+
+    Returns:
+        List of the cache files removed.
+    """
+    entries = []
+    for pth in Path(cache_dir).glob('*.parquet'):
+        try:
+            stat = pth.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_atime, stat.st_size, pth))
+
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, pth in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        try:
+            pth.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed.append(pth)
+    return removed
+
+
+def _write_cache(df: pd.DataFrame, cache_pth: Path, max_bytes: int) -> None:
+    """Write a parsed table to the cache, logging rather than raising if it cannot be written."""
+    tmp_pth = cache_pth.with_name(f'{cache_pth.stem}.{os.getpid()}.tmp')
+    try:
+        cache_pth.parent.mkdir(parents=True, exist_ok=True)
+        # the index is written along with the columns, so a table read with index_col round trips
+        df.to_parquet(tmp_pth)
+        os.replace(tmp_pth, cache_pth)
+    except Exception as e:
+        logger.warning('could not cache %s: %s', cache_pth.name, e, extra={'path': str(cache_pth)})
+        tmp_pth.unlink(missing_ok=True)
+        return
+    prune_table_cache(cache_pth.parent, max_bytes)
+
+
+@timed
+def read_table(source: Union[str, Path], usecols: List[str] = None, dtype: Dict[str, str] = None,
+               engine: str = None, pattern: str = '*.csv', cache: bool = False,
+               cache_dir: Union[str, Path] = None, max_cache_bytes: int = DEFAULT_CACHE_BYTES,
+               max_workers: int = 4, **read_kwargs) -> pd.DataFrame:
+    """
+    Read a delimited table, or a directory of partitioned tables, into a DataFrame.
+
+    Args:
+        source: Path to a delimited file, or to a directory of partition files sharing a schema.
+        usecols: Optional list of columns to read. Reading only what is needed saves parse time
+            and memory.
+        dtype: Optional dictionary of column name to dtype, such as ``{'PARCEL_ID': 'string',
+            'LND_VAL': 'float32', 'LU_CODE': 'category'}``, avoiding type inference.
+        engine: Parser engine passed to ``pandas.read_csv``. Defaults to ``'pyarrow'`` if
+            installed, otherwise ``'c'``. The ``'c'`` parser is also used by default when an
+            option the pyarrow parser does not support is given, such as ``nrows``,
+            ``low_memory``, a list of ``skiprows`` or a callable ``usecols``.
+        pattern: Glob pattern matching partition files when the source is a directory.
+        cache: Whether to cache the parsed table as Parquet and reuse it while the source is unchanged.
+            Off by default. If the table cannot be written to the cache, a warning is logged and the
+            parsed table is still returned.
+        cache_dir: Directory for the Parquet cache. Defaults to the user cache directory.
+        max_cache_bytes: Size budget for the Parquet cache. The least recently used tables are removed
+            after writing a new one to stay under it.
+        max_workers: Maximum number of partition files read at the same time.
+        **read_kwargs: Passed through to ``pandas.read_csv``, such as ``sep``.
+
+    Returns:
+        DataFrame with partitions concatenated in file name order.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities import read_table
+
+        df = read_table('C:/data/parcels', usecols=['PARCEL_ID', 'LND_VAL'], dtype={'PARCEL_ID': 'string'},
+                        cache=True)
+    """
+    files = table_files(source, pattern)
+    engine = engine if engine is not None else _default_engine(usecols, read_kwargs)
+
+    # the parquet cache needs pyarrow as well
+    cache_pth = None
+    if cache and has_pyarrow():
+        cache_dir = Path(cache_dir) if cache_dir is not None else os_cache(TABLE_CACHE_NAME)
+        cache_pth = Path(cache_dir, f'{table_cache_key(files, usecols, dtype, **read_kwargs)}.parquet')
+        if cache_pth.exists():
+            try:
+                return pd.read_parquet(cache_pth)
+            except Exception as e:
+                logger.warning('could not read cached %s, parsing again: %s', cache_pth.name, e,
+                               extra={'path': str(cache_pth)})
+
+    # read partitions in parallel, the pyarrow parser releases the GIL while parsing
+    if len(files) == 1:
+        df = _read_csv(files[0], usecols, dtype, engine, **read_kwargs)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            read = bind(lambda pth: _read_csv(pth, usecols, dtype, engine, **read_kwargs))
+            parts = list(executor.map(read, files))
+        df = pd.concat(parts, ignore_index=True)
+
+    # write to a temporary file and swap it in so a partial cache is never read
+    if cache_pth is not None:
+        _write_cache(df, cache_pth, max_cache_bytes)
+
+    return df
+
+
+def iter_table(source: Union[str, Path], chunksize: int = DEFAULT_CHUNKSIZE, usecols: List[str] = None,
+               dtype: Dict[str, str] = None, pattern: str = '*.csv', **read_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Iterate a delimited table, or a directory of partitioned tables, in DataFrame chunks,
+    keeping memory bounded by the chunk size rather than the table size.
+
+    Args:
+        source: Path to a delimited file, or to a directory of partition files sharing a schema.
+        chunksize: Number of rows per chunk.
+        usecols: Optional list of columns to read.
+        dtype: Optional dictionary of column name to dtype.
+        pattern: Glob pattern matching partition files when the source is a directory.
+        **read_kwargs: Passed through to ``pandas.read_csv``.
+
+    Returns:
+        Iterator of DataFrames with a continuous index across chunks and partitions.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities import iter_table
+
+        for chunk in iter_table('C:/data/trips.csv', chunksize=1_000_000, usecols=['ORIG', 'DEST', 'TRIPS']):
+            ...
+    """
+    start = 0
+    for pth in table_files(source, pattern):
+        # the pyarrow parser does not read in chunks, so the c parser is used here
+        with pd.read_csv(pth, usecols=usecols, dtype=dtype, engine='c', chunksize=chunksize,
+                         **read_kwargs) as reader:
+            for chunk in reader:
+                chunk.index = pd.RangeIndex(start, start + len(chunk))
+                start += len(chunk)
+                yield chunk
@@ -0,0 +1,195 @@
+"""
+Hierarchical timing of instrumented utility calls.
+
+Functions decorated with ``timed``, such as registry fetches, table reads and
+shapefile copies, record their wall clock time, CPU time and how much the peak
+resident memory of the process grew during the call when timings are enabled.
+The operating system only reports the peak of the whole process, so a call that
+stays under an earlier peak records no growth. Calls are aggregated by their
+position in the call tree, so a report shows where the time in a run went.
+When timings are disabled, which is the default, ``timed`` adds only a flag
+check to each call.
+
+CPU time is for the whole process, so it includes any worker threads. Calls
+made from worker threads are attributed to the caller when the work submitted to
+the pool is wrapped with ``bind``. Concurrent children can add up to more wall
+time than their parent.
+"""
+import functools
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+_ENABLED = False
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+# aggregated stats keyed on the path of names from the root of the call tree
+_STATS: Dict[Tuple[str, ...], list] = {}
+
+
+def _peak_rss() -> Optional[int]:
+    """Peak resident set size of the process in bytes, if it can be determined."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    except ImportError:
+        return None
+
+
+def _stack() -> list:
+    stack = getattr(_LOCAL, 'stack', None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    return stack
+
+
+def enable_timings(enabled: bool = True):
+    """Turn recording of instrumented calls on or off."""
+    global _ENABLED
+    _ENABLED = enabled
+
+
+def timings_enabled() -> bool:
+    return _ENABLED
+
+
+def reset_timings():
+    """Discard everything recorded so far."""
+    with _LOCK:
+        _STATS.clear()
+
+
+class timer(object):
+    """
+    Context manager recording the block it wraps under a name, when timings are enabled.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities.timings import timer
+
+        with timer('summarize parcels'):
+            ...
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._path = None
+
+    def __enter__(self):
+        if _ENABLED:
+            stack = _stack()
+            stack.append(self.name)
+            self._path = tuple(stack)
+            self._peak = _peak_rss()
+            self._wall = time.perf_counter()
+            self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        if self._path is None:
+            return
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        peak = _peak_rss()
+        # the process peak only ever rises, so its growth is what this call added to it
+        growth = None if peak is None or self._peak is None else max(peak - self._peak, 0)
+        _stack().pop()
+        with _LOCK:
+            stats = _STATS.setdefault(self._path, [0, 0.0, 0.0, None])
+            stats[0] += 1
+            stats[1] += wall
+            stats[2] += cpu
+            if growth is not None:
+                stats[3] = growth if stats[3] is None else max(stats[3], growth)
+        self._path = None
+
+
+def timed(func: Callable = None, *, name: str = None):
+    """
+    Decorator recording every call of a function, under its qualified name by default.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities.timings import timed
+
+        @timed
+        def summarize_parcels(df):
+            ...
+    """
+    def decorator(fn):
+        label = name if name is not None else fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            with timer(label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def bind(fn: Callable) -> Callable:
+    """Wrap work submitted to a thread pool, so the calls it makes are attributed to the submitting call."""
+    if not _ENABLED:
+        return fn
+    parent = list(_stack())
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_LOCAL, 'stack', None)
+        _LOCAL.stack = list(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _LOCAL.stack = previous
+
+    return wrapper
+
+
+def timing_report() -> list:
+    """
+    Recorded timings in call tree order.
+
+    Returns:
+        List of dictionaries with the ``path`` of names from the root, ``calls``, ``wall`` and
+        ``cpu`` seconds, and ``peak_growth`` bytes, the most any one call raised the peak
+        resident memory of the process.
+    """
+    with _LOCK:
+        items = sorted(_STATS.items())
+    return [{'path': path, 'calls': calls, 'wall': wall, 'cpu': cpu, 'peak_growth': growth}
+            for path, (calls, wall, cpu, growth) in items]
+
+
+def print_timings(file=None):
+    """Print the recorded timings as an indented tree."""
+    file = sys.stderr if file is None else file
+    rows = timing_report()
+    if not len(rows):
+        print('no instrumented calls recorded', file=file)
+        return
+    width = max(len(row['path']) * 2 + len(row['path'][-1]) for row in rows)
+    print(f"{'call':<{width}}  {'calls':>6}  {'wall s':>9}  {'cpu s':>9}  {'peak +MB':>9}", file=file)
+    for row in rows:
+        label = '  ' * (len(row['path']) - 1) + row['path'][-1]
+        growth = '' if row['peak_growth'] is None else f"{row['peak_growth'] / 2 ** 20:.1f}"
+        print(f"{label:<{width}}  {row['calls']:>6}  {row['wall']:>9.3f}  {row['cpu']:>9.3f}  {growth:>9}", file=file)
+    peak = _peak_rss()
+    if peak is not None:
+        print(f"process peak resident memory {peak / 2 ** 20:.1f} MB", file=file)
@@ -1,35 +1,91 @@
+from __future__ import annotations
+
 import os
 import re
+import hashlib
+import importlib
 import importlib.util
+import logging
+import queue
 import string
 import random
-from pathlib import Path, PurePath
+from pathlib import Path
 import shutil
-from functools import reduce
-from typing import Union
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, NamedTuple, Optional
 import appdirs
-import yaml
 
-import fiona
-import pandas as pd
+from .downloads import ConnectionPool, download, is_url, join_url, parse_checksum, remote_size, url_file_name
+from .registry_index import CacheManager, RegistryIndex
+from .timings import bind, timed
+
+if TYPE_CHECKING:
+    from arcgis.gis import GIS, Group
+
+logger = logging.getLogger(__name__)
+
+# copy files in 1 MiB blocks
+_COPY_BLOCK_SIZE = 1 << 20
+
+# shapefile component files copied alongside the .shp
+SHAPEFILE_SIDECARS = (".shx", ".dbf", ".prj", ".cpg", ".sbn", ".sbx", ".qix")
+
+# directory, next to outputs being overwritten, that outputs are moved into before being deleted
+TRASH_DIR_NAME = ".rp_trash"
 
 # from dotenv import find_dotenv, load_dotenv   #TODO: determine the need for this
 # # load the .env into the namespace
 # load_dotenv(find_dotenv())    #TODO: determine the need for this
 
+
+class _LazyModule(object):
+    """
+    Stand-in for a module that is only imported on first attribute access, so heavy
+    dependencies (arcpy alone takes seconds) are not loaded just by importing utilities.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+pd = _LazyModule("pandas")
+fiona = _LazyModule("fiona")
+yaml = _LazyModule("yaml")
+
 # check for arcgis to accomodate projects not needing arcgis
 if importlib.util.find_spec("arcgis") is not None:
-    from arcgis.gis import GIS, Group
-    from arcgis.env import active_gis
+    arcgis_gis = _LazyModule("arcgis.gis")
+    arcgis_env = _LazyModule("arcgis.env")
     has_arcgis = True
 else:
     has_arcgis = False
-    GIS = None
-    Group = None
+    arcgis_gis = None
+    arcgis_env = None
+
+# GIS sessions keyed on (url, username, credential hash), so each is only signed into once per process
+_GIS_SESSIONS = {}
+_GIS_LOCK = threading.Lock()
+
+# group and folder lookups memoized per GIS session
+_SESSION_LOOKUPS = weakref.WeakKeyDictionary()
 
 # see if arcpy available to accommodate non-windows environments
 if importlib.util.find_spec('arcpy') is not None:
-    import arcpy
+    arcpy = _LazyModule('arcpy')
     has_arcpy = True
 else:
     has_arcpy = False
@@ -43,25 +99,78 @@ def _not_none_and_len(string: str) -> bool:
     return status
 
 
-def get_gis():
-    """Try to get a GIS object first from an active_gis and then trying to create from the .env file."""
-    # if there is an active_gis, just use it
-    if isinstance(active_gis, GIS):
-        gis = active_gis
+def _arcgis_required():
+    if not has_arcgis:
+        raise ImportError(
+            "attempting to use 'arcgis' python api, but package is not installed"
+        )
+
+
+def _session_lookups(gis) -> dict:
+    """Memoized group and folder lookups for a GIS session, discarded along with the session"""
+    with _GIS_LOCK:
+        try:
+            return _SESSION_LOOKUPS.setdefault(gis, {"groups": {}, "folders": set()})
+        except TypeError:
+            # objects not supporting weak references are not memoized
+            return {"groups": {}, "folders": set()}
+
+
+def clear_gis_sessions():
+    """Discard all cached GIS sessions, so the next get_gis call signs in again"""
+    with _GIS_LOCK:
+        _GIS_SESSIONS.clear()
+
+
+@timed
+def get_gis(url: str = None, username: str = None, password: str = None, refresh: bool = False,
+            gis_factory=None):
+    """
+    Try to get a GIS object first from an active_gis and then trying to create from the .env file.
+
+    Sessions created from credentials are cached keyed on the url, username and a hash of
+    the password, so each process only authenticates once and reuses the session token
+    afterwards, while a call with different credentials signs in again.
+
+    Args:
+        url: Optional portal url. Defaults to ESRI_GIS_URL from the .env file, or ArcGIS Online.
+        username: Optional username. Defaults to ESRI_GIS_USERNAME from the .env file.
+        password: Optional password. Defaults to ESRI_GIS_PASSWORD from the .env file.
+        refresh: Sign in again even if there is a cached session.
+        gis_factory: Optional callable creating the session, called like ``arcgis.gis.GIS``.
+            Defaults to ``arcgis.gis.GIS``, but can be a stand-in for a mock portal.
+
+    Returns: GIS, or None if there is no active GIS and no credentials are available.
+    """
+    explicit = url is not None or username is not None or password is not None
+    if gis_factory is None:
+        _arcgis_required()
+        gis_factory = arcgis_gis.GIS
+
+        # if there is an active_gis, and no credentials were provided, just use it
+        if not explicit and isinstance(arcgis_env.active_gis, arcgis_gis.GIS):
+            return arcgis_env.active_gis
 
     # if not an active_gis, see what may be available in the .env file
-    else:
-        url = os.getenv('ESRI_GIS_URL')
-        usr = os.getenv('ESRI_GIS_USERNAME')
-        pswd = os.getenv('ESRI_GIS_PASSWORD')
-
-        # if credentials are found, use them to create a gis (url is not needed since defaults to AGOL)
-        if url is not None and usr is not None and pswd is not None:
-            gis = GIS(url, username=usr, password=pswd)
-        elif usr is not None and pswd is not None:
-            gis = GIS(username=usr, password=pswd)
-        else:
-            gis = None
+    url = os.getenv('ESRI_GIS_URL') if url is None else url
+    usr = os.getenv('ESRI_GIS_USERNAME') if username is None else username
+    pswd = os.getenv('ESRI_GIS_PASSWORD') if password is None else password
+
+    # without credentials there is nothing to sign in with
+    if usr is None or pswd is None:
+        return None
+
+    # only a digest of the credentials is kept in the key, not the password itself
+    key = (url, usr, hashlib.sha256(f"{usr}\0{pswd}".encode()).hexdigest())
+    with _GIS_LOCK:
+        gis = _GIS_SESSIONS.get(key)
+        if gis is None or refresh:
+            # if credentials are found, use them to create a gis (url is not needed since defaults to AGOL)
+            if url is not None:
+                gis = gis_factory(url, username=usr, password=pswd)
+            else:
+                gis = gis_factory(username=usr, password=pswd)
+            _GIS_SESSIONS[key] = gis
 
     return gis
 
@@ -71,7 +180,7 @@ def add_group(gis: GIS = None, group_name: str = None) -> Group:
     Add a group to the GIS for the project for saving resources.
     Args:
         gis: Optional
-            arcgis.gis.GIS object instance.
+            arcgis.gis.GIS object instance. Default is to use get_gis.
         group_name: Optional
             Group to be added to the cloud GIS for storing project resources. Default
             is to load from the .env file. If a group name is not provided, and one is
@@ -79,40 +188,48 @@ def add_group(gis: GIS = None, group_name: str = None) -> Group:
 
     Returns: Group
     """
-    if not has_arcgis:
-        raise ImportError(
-            "attempting to use 'arcgis' python api, but package is not installed"
-        )
-    else:
-        # if no group name provided
-        if group_name is None:
-            # load the group name
-            group_name = os.getenv('ESRI_GIS_GROUP')
+    # if no group name provided
+    if group_name is None:
+        # load the group name
+        group_name = os.getenv('ESRI_GIS_GROUP')
+
+        err_msg = 'A group name must either be defined in the .env file or explicitly provided.'
+        assert isinstance(group_name, str), err_msg
+        assert len(group_name), err_msg
+
+    # try to figure out what GIS to use
+    if gis is None:
+        gis = get_gis()
+
+    # groups already found or created in this session
+    grp_cache = _session_lookups(gis)["groups"]
+    grp = grp_cache.get(group_name.lower())
+    if grp is not None:
+        return grp
 
-            err_msg = 'A group name must either be defined in the .env file or explicitly provided.'
-            assert isinstance(group_name, str), err_msg
-            assert len(group_name), err_msg
+    # create an instance of the group manager
+    gmgr = gis.groups
 
-        # create an instance of the group manager
-        gmgr = gis.groups
+    # determine if group exists, filtering by title on the server and matching exactly here
+    grp_srch = [g for g in gmgr.search(query=f'title:"{group_name}"')
+                if g.title.lower() == group_name.lower()]
 
-        # determine if group exists
-        grp_srch = [g for g in gmgr.search() if g.title.lower() == group_name.lower()]
+    # if the group does not exist
+    if len(grp_srch) == 0:
 
-        # if the group does not exist
-        if len(grp_srch) == 0:
+        # create the group
+        grp = gmgr.create(group_name)
 
-            # create the group
-            grp = gmgr.create(group_name)
+        # ensure the group was successfully created
+        assert grp is not None, 'Failed to create the group in the Cloud GIS.'
 
-            # ensure the group was successfully created
-            assert isinstance(grp, Group), 'Failed to create the group in the Cloud GIS.'
+    # if the group already exists, just get it
+    else:
+        grp = grp_srch[0]
 
-        # if the group already exists, just get it
-        else:
-            grp = grp_srch[0]
+    grp_cache[group_name.lower()] = grp
 
-        return grp
+    return grp
 
 
 def add_directory_to_gis(dir_name: str = None, gis: GIS = None):
@@ -124,34 +241,48 @@ def add_directory_to_gis(dir_name: str = None, gis: GIS = None):
     assert isinstance(dir_name, str), 'A name for the directory must be provided explicitly in the "dir_name" ' \
                                       'parameter if there is not a PROJECT_NAME specified in the .env file.'
 
-    if not has_arcgis:
-        raise ImportError(
-            "attempting to use 'arcgis' python api, but package is not installed"
-        )
-    else:
-        # try to figure out what GIS to use
-        if gis is None:
-            gis = get_gis()
+    # try to figure out what GIS to use
+    if gis is None:
+        gis = get_gis()
 
-        assert isinstance(gis, GIS), 'A GIS instance, either an active_gis in the session, credentials in the .env file, ' \
-                                     'or an active GIS instance explicitly passed into the "gis" parameter.'
+    assert gis is not None, 'A GIS instance, either an active_gis in the session, credentials in the .env file, ' \
+                            'or an active GIS instance explicitly passed into the "gis" parameter.'
 
-        # create the directory
-        res = gis.content.create_folder(dir_name)
+    # folders already created or found in this session do not need another round trip
+    folder_cache = _session_lookups(gis)["folders"]
+    if dir_name.lower() in folder_cache:
+        return True
 
-        # if the response is None, the folder already exists, so don't worry about it
-        if res is None:
-            status = True
+    # create the directory
+    res = gis.content.create_folder(dir_name)
 
-        # otherwise, set status based on if the title is in the response
-        else:
-            status = 'title' in res.keys()
+    # if the response is None, the folder already exists, so don't worry about it
+    if res is None:
+        status = True
 
-        return status
+    # otherwise, set status based on if the title is in the response
+    else:
+        status = 'title' in res.keys()
+
+    if status:
+        folder_cache.add(dir_name.lower())
+
+    return status
 
 
-def create_local_data_resources(data_pth: Path = None, mobile_geodatabases=False) -> Path:
-    """create all the data resources for the available environment"""
+def create_local_data_resources(data_pth: Path = None, mobile_geodatabases=False, rebuild=False, backend=None,
+                                max_workers=4) -> Path:
+    """
+    create all the data resources for the available environment
+
+    Workspaces are provisioned concurrently and only missing geodatabases are created,
+    while geodatabases the manifest records as created with a different version of
+    ArcGIS Pro are upgraded in place. With arcpy, workspaces are provisioned one at a
+    time, since arcpy is not thread safe. Pass ``rebuild=True`` to remove and recreate everything, and a backend such as
+    ``workspaces.FolderBackend`` to provision without arcpy.
+    """
+    from .workspaces import provision_workspaces
+
     # default to the expected project structure
     if data_pth is None:
         data_pth = Path(__file__).parent.parent.parent / 'data'
@@ -159,61 +290,66 @@ def create_local_data_resources(data_pth: Path = None, mobile_geodatabases=False
     # cover if a string is inadvertently passed in as the path
     data_pth = Path(data_pth) if isinstance(data_pth, str) else data_pth
 
-    # iterate the data subdirectories
-    for data_name in ['INTERIM', 'RAW', 'PRODUCTION', 'REF']:
-
-        # ensure the data subdirectory exists
-        dir_pth = data_pth / data_name
-        if not dir_pth.exists():
-            dir_pth.mkdir(parents=True)
-
-        # if working in an arcpy environment
-        if has_arcpy:
-            # remove the file geodatabase if it exists and recreate it to make sure compatible with version of Pro
-            fgdb_pth = dir_pth / f'{data_name}.gdb'
-            if fgdb_pth.exists():
-                shutil.rmtree(fgdb_pth)
-            arcpy.management.CreateFileGDB(str(dir_pth), f'{data_name}.gdb')
-
-            # do the same thing for a mobile geodatabase, a sqlite database
-            if mobile_geodatabases:
-                gdb_pth = dir_pth / f'{data_name}.geodatabase'
-                if gdb_pth.exists():
-                    gdb_pth.unlink()
-                arcpy.management.CreateMobileGDB(str(dir_pth), f'{data_name}.geodatabase')
+    provision_workspaces(data_pth, mobile_geodatabases=mobile_geodatabases, backend=backend, rebuild=rebuild,
+                         max_workers=max_workers)
 
     return data_pth
 
 
-def create_aoi_mask_layer(paths, aoi_feature_layer, output_feature_class, style_layer=None):
-    """Create a visibility mask to focus on an Area of Interest in a map."""
+def create_aoi_mask_layer(paths, aoi_feature_layer, output_feature_class, style_layer=None, tolerance=None,
+                          frame_ratio=0.5):
+    """
+    Create a visibility mask to focus on an Area of Interest in a map.
+
+    The mask is a frame around the AOI, in the AOI's spatial reference, with the
+    simplified AOI erased from it. When shapely is available, the mask geometry is
+    built and cached by ``aoi.aoi_mask_geometry``, so repeated builds for the same
+    AOI are near instant.
+    """
     assert has_arcpy, 'ArcPy is required (environment with arcpy referencing ArcGIS Pro functionality) to create an AOI mask.'
 
     # get the style layer if one is not provided
     styl_lyr = paths.dir_arcgis_lyrs / 'aoi_mask.lyrx' if style_layer is None else style_layer
 
     # ensure aoi is polygon
-    geom_typ = arcpy.Describe(aoi_feature_layer).shapeType
-    assert geom_typ == 'Polygon', 'The area of interest must be a polygon.'
-
-    # if multiple polygons, dissolve into one
-    if int(arcpy.management.GetCount(aoi_feature_layer)[0]) > 1:
-        aoi_feature_layer = arcpy.analysis.PairwiseDissolve(aoi_feature_layer, arcpy.Geometry())
-
-    # simplify the geometry for rendering efficiency later
     desc = arcpy.Describe(aoi_feature_layer)
-    tol_val = (desc.extent.width + desc.extent.height) / 2 * 0.01
-    smpl_feat = arcpy.cartography.SimplifyPolygon(aoi_feature_layer, out_feature_class=arcpy.Geometry(),
-                                                  algorithm='POINT_REMOVE', tolerance=tol_val,
-                                                  collapsed_point_option='NO_KEEP').split(';')[0]
-
-    # create polygon covering the entire globe to cut out from
-    coord_lst = [[-180.0, -90.0], [-180.0, 90.0], [180.0, 90.0], [180.0, -90.0], [-180.0, -90.0]]
-    coord_arr = arcpy.Array((arcpy.Point(x, y) for x, y in coord_lst))
-    mask_geom = [arcpy.Polygon(coord_arr, arcpy.SpatialReference(4326))]
-
-    # erase the simplified area of interest from the global extent polygon
-    mask_fc = arcpy.analysis.Erase(mask_geom, smpl_feat, output_feature_class)
+    assert desc.shapeType == 'Polygon', 'The area of interest must be a polygon.'
+    spatial_ref = desc.spatialReference
+
+    # build the mask geometry with shapely if available
+    if importlib.util.find_spec('shapely') is not None:
+        from shapely import wkb as shapely_wkb
+        from .aoi import aoi_mask_geometry
+
+        with arcpy.da.SearchCursor(aoi_feature_layer, ['SHAPE@WKB']) as cur:
+            aoi_geoms = [shapely_wkb.loads(bytes(row[0])) for row in cur]
+        mask = aoi_mask_geometry(aoi_geoms, tolerance=tolerance, frame_ratio=frame_ratio,
+                                 cache_dir=os_cache('rp_aoi_masks'))
+        mask_geom = [arcpy.FromWKB(bytearray(mask.wkb), spatial_ref)]
+        mask_fc = arcpy.management.CopyFeatures(mask_geom, output_feature_class)[0]
+
+    # otherwise fall back to building the mask with arcpy
+    else:
+        # if multiple polygons, dissolve into one
+        if int(arcpy.management.GetCount(aoi_feature_layer)[0]) > 1:
+            aoi_feature_layer = arcpy.analysis.PairwiseDissolve(aoi_feature_layer, arcpy.Geometry())
+
+        # simplify the geometry for rendering efficiency later
+        ext = arcpy.Describe(aoi_feature_layer).extent
+        tol_val = (ext.width + ext.height) / 2 * 0.01 if tolerance is None else tolerance
+        smpl_feat = arcpy.cartography.SimplifyPolygon(aoi_feature_layer, out_feature_class=arcpy.Geometry(),
+                                                      algorithm='POINT_REMOVE', tolerance=tol_val,
+                                                      collapsed_point_option='NO_KEEP').split(';')[0]
+
+        # create a frame around the area of interest in its own spatial reference to cut out from
+        dx, dy = ext.width * frame_ratio, ext.height * frame_ratio
+        coord_lst = [[ext.XMin - dx, ext.YMin - dy], [ext.XMin - dx, ext.YMax + dy],
+                     [ext.XMax + dx, ext.YMax + dy], [ext.XMax + dx, ext.YMin - dy], [ext.XMin - dx, ext.YMin - dy]]
+        coord_arr = arcpy.Array((arcpy.Point(x, y) for x, y in coord_lst))
+        mask_geom = [arcpy.Polygon(coord_arr, spatial_ref)]
+
+        # erase the simplified area of interest from the frame polygon
+        mask_fc = arcpy.analysis.Erase(mask_geom, smpl_feat, output_feature_class)
 
     # create a layer and make it pretty
     strt_lyr = arcpy.management.MakeFeatureLayer(mask_fc)[0]
@@ -225,16 +361,29 @@ def create_aoi_mask_layer(paths, aoi_feature_layer, output_feature_class, style_
 
 # CLASSES
 class Paths:
-    """Object to easily reference project resources"""
+    """
+    Object to easily reference project resources
+
+    Data storage resources are registered in ``resources``, mapping each attribute
+    name to the kind of resource it is, a directory (``'dir'``), file geodatabase
+    (``'fgdb'``) or mobile geodatabase (``'mgdb'``), so ``create_resources`` knows
+    how to create them.
+    """
+
+    # resource kinds by path suffix
+    _SUFFIX_KINDS = {'.gdb': 'fgdb', '.geodatabase': 'mgdb'}
 
     def __init__(self, data_dir=None):
+        self.resources = {}
+        self._existing = set()
+
         # set defaults for project and data directories
         self.dir_prj = dir_prj = Path(__file__).parent.parent.parent
 
         if data_dir is None:
-            self.dir_data = Path(self.dir_prj, 'data')
+            self.add_resource('dir_data', Path(self.dir_prj, 'data'))
         else:
-            self.dir_data = Path(data_dir)
+            self.add_resource('dir_data', Path(data_dir))
 
         # set internal project paths
         self.dir_app = Path(self.dir_prj, 'app')
@@ -242,15 +391,40 @@ class Paths:
         self.dir_arcgis = Path(self.dir_prj, 'arcgis')
         self.dir_arcgis_lyrs = Path(self.dir_arcgis, 'layer_files')
         # set data folders
-        self.dir_raw = Path(self.dir_data, 'RAW')
-        self.dir_int = Path(self.dir_data, 'INTERIM')
-        self.dir_out = Path(self.dir_data, 'PROCESSED')
+        self.add_resource('dir_raw', Path(self.dir_data, 'RAW'))
+        self.add_resource('dir_int', Path(self.dir_data, 'INTERIM'))
+        self.add_resource('dir_out', Path(self.dir_data, 'PROCESSED'))
         # reference folder
-        self.dir_ref = Path(self.dir_data, 'REF')
+        self.add_resource('dir_ref', Path(self.dir_data, 'REF'))
         # set geodatabase paths
-        self.gdb_raw = str(Path(self.dir_raw, 'raw.gdb'))
-        self.gdb_int = str(Path(self.dir_int, 'interim.gdb'))
-        self.gdb_out = str(Path(self.dir_out, 'processed.gdb'))
+        self.add_resource('gdb_raw', Path(self.dir_raw, 'raw.gdb'))
+        self.add_resource('gdb_int', Path(self.dir_int, 'interim.gdb'))
+        self.add_resource('gdb_out', Path(self.dir_out, 'processed.gdb'))
+
+    def add_resource(self, name, pth, kind=None):
+        """
+        Register a data storage resource as an attribute so it is created by
+        ``create_resources``. The kind is inferred from the suffix if not provided.
+        """
+        pth = Path(pth)
+        if kind is None:
+            kind = self._SUFFIX_KINDS.get(pth.suffix, 'dir')
+        if kind not in ('dir', 'fgdb', 'mgdb'):
+            raise ValueError(f"resource kind must be 'dir', 'fgdb' or 'mgdb', not '{kind}'")
+        setattr(self, name, pth)
+        self.resources[name] = kind
+        return pth
+
+    @property
+    def interim(self):
+        """
+        Columnar store for intermediate tables in the interim directory, see ``InterimStore``.
+        """
+        from .interim import InterimStore
+
+        if getattr(self, '_interim', None) is None or self._interim.directory != self.dir_int:
+            self._interim = InterimStore(self.dir_int)
+        return self._interim
 
     # TODO: flush this out more cleanly
     def add_dir(self, dir_name, dir_path):
@@ -258,70 +432,158 @@ class Paths:
         allows Paths object to be extended to include more paths if needed in
         procedural code
         """
-        new_path = Path(dir_path, dir_name)
+        new_path = self.add_resource(dir_name, Path(dir_path, dir_name), kind='dir')
         if not new_path.exists():
             new_path.mkdir()
-        setattr(self, dir_name, new_path)
+        self._existing.add(new_path)
         return new_path
 
     @staticmethod
-    def _create_resource(pth: Path) -> Path:
+    def _create_resource(pth: Path, kind: str = None, backend=None) -> Path:
         """Internal function to create resources."""
+        from .workspaces import default_backend
 
-        # see if we're working with a file geodatabase
-        is_gdb = (pth.suffix == '.gdb' or pth.suffix == '.geodatabase')
+        if kind is None:
+            kind = Paths._SUFFIX_KINDS.get(pth.suffix, 'dir')
 
         # if a geodatabase, the path dir is one level up
-        pth_dir = pth.parent if is_gdb else pth
+        pth_dir = pth if kind == 'dir' else pth.parent
 
         # ensure the file directory exists including parents as necessary
         if not pth_dir.exists():
             pth_dir.mkdir(parents=True)
 
-        # now if a geodatabase, create it
-        if is_gdb:
+        # now if a geodatabase, create it if the backend, arcpy by default, is available
+        if kind != 'dir':
+            backend = default_backend() if backend is None else backend
+            if backend is not None and not backend.exists(pth):
+                if kind == 'fgdb':
+                    backend.create_file_gdb(pth)
+                else:
+                    backend.create_mobile_gdb(pth)
+
+        return pth
 
-            # flag if-exists so only run function once
-            gdb_exists = arcpy.Exists(str(pth))
+    @timed
+    def create_resources(self, backend=None, max_workers=4, refresh=False):
+        """
+        Create data storage resources if they do not already exist.
 
-            # if a file geodatabase, create it
-            if pth.suffix == '.gdb' and not gdb_exists:
-                arcpy.management.CreateFileGDB(pth_dir, pth.stem)
+        All missing resources are created in one pass, shallowest paths first so parents
+        exist before their children, with resources at the same depth, independent of
+        each other, created concurrently. With a backend that is not thread safe, such as
+        arcpy, resources are checked and created one at a time. Resources known to exist
+        are remembered, so repeated calls do not touch the file system. Pass ``refresh=True``
+        to check again.
 
-            # if a mobile geodatabase, create it
-            if pth.suffix == '.geodatabase' and not gdb_exists:
-                arcpy.management.CreateMobileGDB(pth_dir, pth.stem)
+        Returns:
+            List of the resource paths created.
+        """
+        from .workspaces import default_backend
 
-        return pth
+        if refresh:
+            self._existing.clear()
 
-    def create_resources(self):
-        """Create data storage resources if they do not already exist."""
-        # get the data resources from the object properties
-        pth_lst = [p for p in dir(self) if isinstance(p, Path)]
+        # get the data resources not already known to exist
+        pending = [(getattr(self, name), kind) for name, kind in self.resources.items()]
+        pending = [(pth, kind) for pth, kind in pending if pth not in self._existing]
+        if not len(pending):
+            return []
 
-        # iterate the paths and create any necessary resources
-        for pth in pth_lst:
-            self._create_resource(pth)
+        backend = default_backend() if backend is None and any(k != 'dir' for _, k in pending) else backend
+        if backend is not None and not backend.thread_safe:
+            max_workers = 1
 
-        return
+        # check existence, with geodatabases checked through the backend
+        def _exists(item):
+            pth, kind = item
+            if kind == 'dir' or backend is None:
+                return pth.exists()
+            return backend.exists(pth)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            exists = list(executor.map(_exists, pending))
+            self._existing.update(pth for (pth, _), ex in zip(pending, exists) if ex)
+            # geodatabases can only be created when a backend is available
+            missing = [(pth, kind) for (pth, kind), ex in zip(pending, exists)
+                       if not ex and (kind == 'dir' or backend is not None)]
+
+            # group missing resources by depth so parents are created before children
+            levels = {}
+            for pth, kind in missing:
+                levels.setdefault(len(pth.parts), []).append((pth, kind))
+
+            created = []
+            for depth in sorted(levels):
+                level = levels[depth]
+                created += executor.map(lambda item: self._create_resource(item[0], item[1], backend), level)
+
+        self._existing.update(pth for pth, _ in missing)
+
+        return created
+
+
+@lru_cache(maxsize=4096)
+def _key_path(key):
+    """Split a dotted key path once, later lookups of the same path reuse the tuple"""
+    return tuple(key.split("."))
 
 
 class DotDict(dict):
+    """
+    Dictionary with attribute access and dotted key paths, such as ``d.model.years``
+    or ``d["model.years.base"]``.
+
+    Nested dictionaries, including those inside lists, are converted to ``DotDict``
+    once when they are added, so attribute access returns them without wrapping.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for k, v in dict.items(self):
+            wrapped = self._wrap(v)
+            if wrapped is not v:
+                dict.__setitem__(self, k, wrapped)
+
+    @classmethod
+    def _wrap(cls, value):
+        if isinstance(value, dict):
+            return value if type(value) is cls else cls(value)
+        if isinstance(value, list):
+            return [cls._wrap(v) for v in value]
+        return value
+
     def __getattr__(self, k):
         try:
-            v = self[k]
+            return dict.__getitem__(self, k)
         except KeyError:
-            return super().__getattr__(k)
-        if isinstance(v, dict):
-            return DotDict(v)
-        return v
+            raise AttributeError(k) from None
 
     def __getitem__(self, k):
-        if isinstance(k, str) and "." in k:
-            k = k.split(".")
-        if isinstance(k, (list, tuple)):
-            return reduce(lambda d, kk: d[kk], k, self)
-        return super().__getitem__(k)
+        if isinstance(k, str):
+            if "." not in k:
+                return dict.__getitem__(self, k)
+            k = _key_path(k)
+        elif not isinstance(k, (list, tuple)):
+            return dict.__getitem__(self, k)
+        node = self
+        for kk in k:
+            node = node[kk]
+        return node
+
+    def __setitem__(self, k, v):
+        dict.__setitem__(self, k, self._wrap(v))
+
+    def setdefault(self, k, default=None):
+        if k not in self:
+            self[k] = default
+        return dict.__getitem__(self, k)
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
 
     def get(self, k, default=None):
         if isinstance(k, str) and "." in k:
@@ -329,21 +591,160 @@ class DotDict(dict):
                 return self[k]
             except KeyError:
                 return default
-        return super().get(k, default=default)
+        return dict.get(self, k, default)
+
+    def freeze(self) -> FrozenDotDict:
+        """Read only, hashable copy, with lists converted to tuples"""
+        return FrozenDotDict(self)
+
+
+def _restore_frozen(cls, items):
+    """Unpickle a FrozenDotDict, whose values were already converted before pickling"""
+    obj = cls.__new__(cls)
+    dict.update(obj, items)
+    obj._hash = None
+    return obj
+
+
+class FrozenDotDict(DotDict):
+    """
+    Read only, hashable ``DotDict``. Nested dictionaries are frozen and lists converted
+    to tuples, so it can be used as a cache key and sent to worker processes, which
+    unpickle it without converting it again.
+    """
+
+    __slots__ = ("_hash",)
+
+    def __init__(self, *args, **kwargs):
+        self._hash = None
+        dict.__init__(self, *args, **kwargs)
+        for k, v in dict.items(self):
+            wrapped = self._wrap(v)
+            if wrapped is not v:
+                dict.__setitem__(self, k, wrapped)
+
+    @classmethod
+    def _wrap(cls, value):
+        if isinstance(value, dict):
+            return value if type(value) is cls else cls(value)
+        if isinstance(value, (list, tuple)):
+            return tuple(cls._wrap(v) for v in value)
+        if isinstance(value, set):
+            return frozenset(value)
+        return value
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read only")
+
+    __setitem__ = __delitem__ = setdefault = update = pop = popitem = clear = __ior__ = _read_only
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(dict.items(self)))
+        return self._hash
+
+    def __reduce__(self):
+        return _restore_frozen, (type(self), dict(self))
+
+    def freeze(self) -> FrozenDotDict:
+        return self
+
+
+def _to_dot_dict(value, flat, prefix=""):
+    """Recursively convert nested dictionaries to DotDicts, recording every dotted key path in flat"""
+    if isinstance(value, dict):
+        # children are converted first, so the DotDict constructor's conversion pass is skipped
+        node = DotDict.__new__(DotDict)
+        for k, v in value.items():
+            key = f"{prefix}{k}"
+            dict.__setitem__(node, k, _to_dot_dict(v, flat, f"{key}."))
+            flat[key] = dict.__getitem__(node, k)
+        return node
+    if isinstance(value, list):
+        return [_to_dot_dict(v, {}, "") for v in value]
+    return value
 
 
 class Configuration(object):
-    def __init__(self, config_file):
+    """
+    Settings read from a YAML configuration file.
+
+    The file is parsed once, using the LibYAML C loader when available, and only
+    re-parsed when its modification time changes. The modification time is checked
+    at most once every ``check_interval`` seconds. Nested settings are converted to
+    ``DotDict`` objects once per parse, and every dotted key path is precomputed, so
+    ``config.get('a.b.c')`` is a single dictionary lookup.
+
+    Since parsed settings are shared between accesses, treat them as read only.
+    """
+
+    def __init__(self, config_file, check_interval=1.0):
         self.config_file = config_file
+        self.check_interval = check_interval
+        self._mtime = None
+        self._checked = None
+        self._settings = None
+        self._dot_settings = None
+        self._frozen_settings = None
+        self._flat = None
+
+    def _refresh(self):
+        """Re-parse the configuration file if it changed since it was last read"""
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return
+        self._checked = now
+
+        mtime = os.stat(self.config_file).st_mtime_ns
+        if mtime != self._mtime:
+            self._parse(mtime)
+
+    # only the parse is timed, the check above runs on every lookup
+    @timed(name="Configuration.parse")
+    def _parse(self, mtime):
+        loader = getattr(yaml, "CFullLoader", yaml.FullLoader)
+        with open(self.config_file) as f:
+            settings = yaml.load(f, Loader=loader)
+
+        flat = {}
+        self._dot_settings = _to_dot_dict(settings if settings is not None else {}, flat)
+        self._frozen_settings = None
+        self._settings = settings
+        self._flat = flat
+        self._mtime = mtime
 
     @property
     def settings(self):
-        with open(self.config_file) as f:
-            return yaml.load(f, Loader=yaml.FullLoader)
+        self._refresh()
+        return self._settings
 
     @property
     def dot_settings(self):
-        return DotDict(self.settings)
+        self._refresh()
+        return self._dot_settings
+
+    @property
+    def frozen_settings(self):
+        """Read only, hashable copy of the settings, made once per parse, to share with worker processes"""
+        self._refresh()
+        if self._frozen_settings is None:
+            self._frozen_settings = self._dot_settings.freeze()
+        return self._frozen_settings
+
+    @property
+    def flat_settings(self):
+        """All settings keyed on their full dotted key path, such as 'model.years.base'"""
+        self._refresh()
+        return self._flat
+
+    def get(self, key, default=None):
+        """Look up a setting by its dotted key path, returning the default if not found"""
+        self._refresh()
+        return self._flat.get(key, default)
+
+    def __getitem__(self, key):
+        self._refresh()
+        return self._flat[key]
 
 
 def os_cache(project: object):
@@ -357,60 +758,367 @@ def random_prefix(len):
     )
 
 
-def check_overwrite_path(output, overwrite=True):
-    """Non-arcpy version of check_overwrite_output"""
-    output = Path(output)
-    if output.exists():
-        if overwrite:
-            if output.is_file():
-                print(f"--- --- deleting existing file {output.name}")
-                output.unlink()
-            if output.is_dir():
-                print(f"--- --- deleting existing folder {output.name}")
-                shutil.rmtree(output)
+class OverwriteResult(NamedTuple):
+    """What ``check_overwrite_path`` did with an output"""
+    path: Path
+    action: str  # 'missing', 'exists', 'deleted', 'trashed' or 'would delete'
+    bytes: Optional[int] = None
+    seconds: float = 0.0
+
+
+def _tree_size(pth: Path) -> int:
+    """total size of a file, or of every file under a directory, without following links"""
+    if not pth.is_dir() or pth.is_symlink():
+        return pth.lstat().st_size
+    total = 0
+    stack = [str(pth)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+def _delete(pth: Path) -> int:
+    """delete a file or directory tree, counting the bytes reclaimed in the same pass over the tree"""
+    if not pth.is_dir() or pth.is_symlink():
+        size = pth.lstat().st_size
+        pth.unlink()
+        return size
+    total = 0
+    with os.scandir(pth) as it:
+        entries = list(it)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            total += _delete(Path(entry.path))
         else:
-            print(f"Output file/folder {output} already exists")
+            total += entry.stat(follow_symlinks=False).st_size
+            os.unlink(entry.path)
+    pth.rmdir()
+    return total
+
 
+_TRASH_QUEUE = queue.Queue()
+_TRASH_LOCK = threading.Lock()
+_TRASH_THREAD = None
+_TRASH_SEEN = set()
 
-def shp_to_df(shp_path, use_cols=None):
-    """Read a shapefile into a Pandas dataframe dropping geometry"""
-    import shapefile
 
-    if isinstance(shp_path, PurePath):
-        shp_path = str(shp_path)
+def _trash_worker():
+    while True:
+        pth = _TRASH_QUEUE.get()
+        try:
+            start = time.perf_counter()
+            size = _delete(pth)
+            logger.info("reclaimed %s bytes from %s", size, pth.name, extra={
+                "path": str(pth), "bytes": size, "seconds": time.perf_counter() - start, "action": "purged"})
+            # remove the trash directory once it is empty
+            try:
+                pth.parent.rmdir()
+            except OSError:
+                pass
+        # already deleted, by another process cleaning up the same trash
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("could not delete %s: %s", pth, e, extra={"path": str(pth), "action": "failed"})
+        finally:
+            _TRASH_QUEUE.task_done()
+
+
+def _move_to_trash(output: Path) -> Path:
+    """rename an output into the trash directory next to it and queue it for deletion in the background"""
+    global _TRASH_THREAD
+    trash_dir = Path(output.parent, TRASH_DIR_NAME)
+    trash_dir.mkdir(exist_ok=True)
+    trash_pth = Path(trash_dir, f"{output.name}.{random_prefix(8)}")
+    os.replace(output, trash_pth)
+
+    with _TRASH_LOCK:
+        if _TRASH_THREAD is None or not _TRASH_THREAD.is_alive():
+            _TRASH_THREAD = threading.Thread(target=_trash_worker, name="rp-trash", daemon=True)
+            _TRASH_THREAD.start()
+        # pick up anything left in the trash by a process that exited before it was deleted
+        pending = [trash_pth]
+        if trash_dir not in _TRASH_SEEN:
+            _TRASH_SEEN.add(trash_dir)
+            pending = [pth for pth in trash_dir.iterdir() if pth != trash_pth] + pending
+        for pth in pending:
+            _TRASH_QUEUE.put(pth)
+
+    return trash_pth
+
+
+def wait_for_trash():
+    """block until everything moved to the trash by ``check_overwrite_path`` has been deleted"""
+    _TRASH_QUEUE.join()
+
+
+def check_overwrite_path(output, overwrite=True, background=False, dry_run=False):
+    """
+    Non-arcpy version of check_overwrite_output
+
+    Removes an existing output so it can be written again. With ``background=True``, the
+    output is renamed into a trash directory next to it, which is near instant, and deleted
+    by a background thread, so large geodatabases and tile caches do not hold up the
+    pipeline. Use ``wait_for_trash`` to wait for the deletions, for instance before exiting.
+    With ``dry_run=True`` nothing is removed, and the bytes that would be reclaimed are
+    reported. Outcomes are logged with the ``path``, ``action``, ``bytes`` and ``seconds``
+    as extra fields.
+
+    Returns:
+        OverwriteResult with what was done with the output.
+    """
+    output = Path(output)
+    start = time.perf_counter()
+    if not output.exists():
+        return OverwriteResult(output, "missing")
+
+    if not overwrite:
+        logger.warning("Output file/folder %s already exists", output, extra={"path": str(output), "action": "exists"})
+        return OverwriteResult(output, "exists")
+
+    kind = "folder" if output.is_dir() else "file"
+    if dry_run:
+        size = _tree_size(output)
+        result = OverwriteResult(output, "would delete", size, time.perf_counter() - start)
+        logger.info("would delete existing %s %s, reclaiming %s bytes", kind, output.name, size,
+                    extra={"path": str(output), "action": result.action, "bytes": size})
+        return result
+
+    if background:
+        try:
+            trash_pth = _move_to_trash(output)
+            result = OverwriteResult(output, "trashed", None, time.perf_counter() - start)
+            logger.info("moved existing %s %s to the trash", kind, output.name,
+                        extra={"path": str(output), "trash": str(trash_pth), "action": result.action,
+                               "seconds": result.seconds})
+            return result
+        # files held open, on windows for instance, cannot be renamed, so fall back to deleting
+        except OSError as e:
+            logger.warning("could not move %s to the trash, deleting it instead: %s", output.name, e,
+                           extra={"path": str(output), "action": "failed"})
+
+    size = _delete(output)
+    result = OverwriteResult(output, "deleted", size, time.perf_counter() - start)
+    logger.info("deleted existing %s %s, reclaiming %s bytes", kind, output.name, size,
+                extra={"path": str(output), "action": result.action, "bytes": size, "seconds": result.seconds})
+    return result
+
+
+def check_overwrite_paths(outputs, overwrite=True, background=False, dry_run=False, max_workers=4):
+    """
+    Batch version of ``check_overwrite_path``, checking many outputs concurrently.
+
+    Returns:
+        List of OverwriteResult in the order of the outputs.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda out: check_overwrite_path(out, overwrite=overwrite, background=background, dry_run=dry_run),
+            outputs))
+    reclaimed = sum(res.bytes or 0 for res in results)
+    logger.info("checked %s outputs, reclaiming %s bytes", len(results), reclaimed,
+                extra={"outputs": len(results), "bytes": reclaimed,
+                       "actions": {act: sum(res.action == act for res in results) for act in
+                                   dict.fromkeys(res.action for res in results)}})
+    return results
+
+
+@timed
+def shp_to_df(shp_path, use_cols=None, chunksize=None):
+    """
+    Read a shapefile into a Pandas dataframe dropping geometry
+
+    Only the columns in ``use_cols`` are decoded from the attribute table. If a
+    ``chunksize`` is given, an iterator of dataframes with at most that many rows
+    is returned instead, so very large tables can be processed in bounded memory.
+    """
+    from .dbf import iter_dbf, read_dbf
+
     if isinstance(use_cols, str):
         use_cols = [use_cols]
+    if chunksize is not None:
+        return iter_dbf(shp_path, columns=use_cols, chunksize=chunksize)
+    return read_dbf(shp_path, columns=use_cols)
 
-    # read file, parse out the records
-    sf = shapefile.Reader(shp_path)
-    fields = [x[0] for x in sf.fields if x != "geometry"][1:]
-    records = [list(i) for i in sf.records()]
 
-    # make pd.DataFrame
-    shape_df = pd.DataFrame(columns=fields, data=records)
-    if use_cols:
-        return shape_df[use_cols]
-    else:
-        return shape_df
+def shapefile_parts(shp_path):
+    """List the files making up a shapefile, with the .shp itself last"""
+    shp_path = Path(shp_path)
+    parts = [Path(shp_path.parent, f"{shp_path.stem}{ext}") for ext in SHAPEFILE_SIDECARS]
+    parts.append(Path(shp_path.parent, f"{shp_path.name}.xml"))
+    return [p for p in parts if p.exists()] + [shp_path]
+
+
+def _batched(iterable, size):
+    """Yield lists of up to size items from an iterable"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if len(batch):
+        yield batch
+
 
+@timed
+def copy_shapefiles(in_file, out_folder, crs=None, batch_size=10_000):
+    """
+    Consistent method for copying shapefile data
 
-def copy_shapefiles(in_file, out_folder):
-    """Consistent method for copying shapefile data"""
+    When no transformation is needed, the component files (.shp, .shx, .dbf, .prj,
+    .cpg and any index sidecars) are copied as raw bytes, with the .shp written last
+    so the copy only appears once complete. If a ``crs`` is given the features are
+    reprojected and written in batches of ``batch_size`` records.
+    """
+    in_file = Path(in_file)
     name = in_file.name
+    out_file = Path(out_folder, name)
+    if out_file.exists():
+        prefix = in_file.parent.name
+        out_file = Path(out_folder, f"{prefix}_{name}")
+        print(f"...{in_file.name} already exists, makeing new copy with {prefix}")
+
+    # fast path, duplicate the component files without decoding any geometry
+    if crs is None:
+        for part in shapefile_parts(in_file):
+            shutil.copyfile(part, Path(out_file.parent, f"{out_file.stem}{part.name[len(in_file.stem):]}"))
+        return out_file
+
+    # otherwise reproject and write the features in batches
+    from fiona.transform import transform_geom
+
     with fiona.open(in_file, "r") as src:
         meta = src.meta
-        out_file = Path(out_folder, name)
-        if out_file.exists():
-            prefix = in_file.parent.name
-            out_file = Path(out_folder, f"{prefix}_{name}")
-            print(f"...{in_file.name} already exists, makeing new copy with {prefix}")
+        meta.pop("crs_wkt", None)
+        meta["crs"] = crs
         with fiona.open(out_file, "w", **meta) as dst:
-            for feature in src:
-                dst.write(feature)
+            for batch in _batched(src, batch_size):
+                geoms = transform_geom(src.crs, crs, [feat["geometry"] for feat in batch])
+                if hasattr(fiona, "Feature"):
+                    batch = [fiona.Feature(geometry=geom, id=feat.id, properties=feat.properties)
+                             for feat, geom in zip(batch, geoms)]
+                else:
+                    batch = [dict(feat, geometry=geom) for feat, geom in zip(batch, geoms)]
+                dst.writerecords(batch)
+
+    return out_file
+
+
+@timed
+def copy_shapefile_dir(in_folder, out_folder, crs=None, max_workers=4, recursive=False):
+    """
+    Copy every shapefile in a folder concurrently using ``copy_shapefiles``.
+
+    Returns:
+        List of the copied shapefile paths.
+    """
+    in_folder, out_folder = Path(in_folder), Path(out_folder)
+    if not out_folder.exists():
+        out_folder.mkdir(parents=True)
+    shp_lst = sorted(in_folder.glob("**/*.shp" if recursive else "*.shp"))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(bind(lambda shp: copy_shapefiles(shp, out_folder, crs=crs)), shp_lst))
+
+
+@timed
+def atomic_copy(in_file, out_file, algorithm="sha256"):
+    """
+    Copy a file to a temporary file next to the target and rename it into place, so
+    readers never see a partially written file, hashing the content as it is copied.
+
+    Returns:
+        Tuple of the number of bytes copied and the content hash of the copy.
+    """
+    out_file = Path(out_file)
+    tmp_file = Path(out_file.parent, f".{out_file.name}.{random_prefix(7)}.part")
+    hsh = hashlib.new(algorithm)
+    size = 0
+    try:
+        with open(in_file, "rb") as src, open(tmp_file, "wb") as dst:
+            for block in iter(lambda: src.read(_COPY_BLOCK_SIZE), b""):
+                hsh.update(block)
+                dst.write(block)
+                size += len(block)
+        shutil.copystat(in_file, tmp_file)
+        os.replace(tmp_file, out_file)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+    return size, hsh.hexdigest()
+
+
+class FetchResult(NamedTuple):
+    """Outcome of fetching a single file into the registry cache"""
+    source: Path
+    target: Path
+    status: str  # one of 'copied', 'skipped' or 'failed'
+    bytes: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+class FetchReport(object):
+    """Summary of a bulk fetch with per-file results and overall throughput"""
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    def _with_status(self, status):
+        return [r for r in self.results if r.status == status]
+
+    @property
+    def copied(self):
+        return self._with_status("copied")
+
+    @property
+    def skipped(self):
+        return self._with_status("skipped")
+
+    @property
+    def failed(self):
+        return self._with_status("failed")
+
+    @property
+    def bytes_copied(self):
+        return sum(r.bytes for r in self.copied)
+
+    @property
+    def throughput(self):
+        """Bytes per second copied over the wall clock time of the fetch"""
+        return self.bytes_copied / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (f"FetchReport(copied={len(self.copied)}, skipped={len(self.skipped)}, failed={len(self.failed)}, "
+                f"{self.bytes_copied / 2 ** 20:.1f} MiB in {self.elapsed:.2f}s, "
+                f"{self.throughput / 2 ** 20:.1f} MiB/s)")
 
 
 class Registry(object):
-    def __init__(self, registry_file, data_dir=None):
+    """
+    Registry of external data files copied into a local cache directory.
+
+    Lookups are served from a persistent index (see ``RegistryIndex``) stored
+    under ``os_cache``, which only re-reads the registry CSV and re-lists cache
+    directories when they change on disk.
+
+    The store of a registry row is either a directory or a base URL, and an optional
+    ``checksum`` column holds the expected hash of the file, as ``sha256:<hex digest>``
+    or another ``hashlib`` algorithm. Files behind URLs are downloaded over pooled
+    connections, resumed when interrupted and verified against their checksum.
+
+    With ``max_bytes`` set, the cache directory is kept under that size by evicting the
+    least recently used files after every fetch into it (see ``CacheManager``). Tags
+    pinned with ``reg.cache.pin`` are never evicted.
+    """
+
+    def __init__(self, registry_file, data_dir=None, index_file=None, max_bytes=None):
         if data_dir is None:
             self.data_dir = os_cache("rp_cache")
             if not self.data_dir.exists():
@@ -419,14 +1127,58 @@ class Registry(object):
             self.data_dir = data_dir
         if isinstance(data_dir, str):
             self.data_dir = Path(data_dir)
-        if isinstance(registry_file, str):
-            self.path = Path(registry_file)
-            if not self.path.exists():
-                raise Exception("registry path must be to a file on your system")
+        self.path = Path(registry_file)
+        if not self.path.exists():
+            raise Exception("registry path must be to a file on your system")
+
+        # one index database per registry file and cache directory combination
+        if index_file is None:
+            index_key = hashlib.sha1(f"{self.abspath}|{Path(self.data_dir).absolute()}".encode()).hexdigest()[:16]
+            index_file = Path(os_cache("rp_cache_index"), f"{index_key}.sqlite")
+        self.index_file = Path(index_file)
+        self._index = None
+
+        # registry dataframe cached against the csv file signature
+        self._reg_df = None
+        self._reg_df_sig = None
+
+        self.max_bytes = max_bytes
+        self._cache = None
+
+    @property
+    def index(self):
+        """Persistent index of the registry file and cache directory, opened on first use"""
+        if self._index is None:
+            self._index = RegistryIndex(self.path, self.data_dir, self.index_file)
+        return self._index
 
     @property
+    def cache(self):
+        """Size limit, access tracking and pinning for the cache directory"""
+        if self._cache is None:
+            self._cache = CacheManager(self.index, self.max_bytes)
+        return self._cache
+
+    def _used(self, paths):
+        """Record files in the cache directory as just used, then evict others if over the size limit"""
+        paths = [pth for pth in paths if Path(pth).parent == Path(self.data_dir)]
+        if not paths:
+            return
+        self.cache.touch(paths)
+        evicted = self.cache.enforce(protect=paths)
+        if evicted:
+            logger.info("evicted %d files from %s", len(evicted), self.data_dir,
+                        extra={"evicted": [str(pth) for pth in evicted]})
+
+    @property
+    @timed(name="Registry.reg_df")
     def reg_df(self):
-        return pd.read_csv(self.path)
+        st = self.path.stat()
+        sig = (st.st_size, st.st_mtime_ns)
+        if self._reg_df is None or sig != self._reg_df_sig:
+            self._reg_df = pd.read_csv(self.path)
+            self._reg_df_sig = sig
+        return self._reg_df.copy()
 
     @property
     def abspath(self):
@@ -436,12 +1188,11 @@ class Registry(object):
     @property
     def registry_files(self):
         """List of file names in the registry cache"""
-        return [f for f in self.data_dir.glob("**/*") if f.is_file()]
+        return self.index.cached_files
 
     @property
     def filenames(self):
-        file_data = self.reg_df[["tag", "name", "store"]]
-        return file_data.to_dict(orient="records")
+        return self.index.records
 
     @property
     def local_file_paths(self):
@@ -455,8 +1206,142 @@ class Registry(object):
     @property
     def tags(self):
         """List of tags in registry file"""
-        return self.reg_df.tag.unique().tolist()
+        return self.index.tags
+
+    def lookup(self, tag):
+        """Registry record (tag, name, store and checksum) for a tag, or None if not registered"""
+        return self.index.lookup(tag)
+
+    def is_cached(self, tag, verify=False):
+        """Check if the file for a tag is already in the local cache, optionally verifying it against the source"""
+        return self.index.is_cached(tag, verify=verify)
+
+    def _url_checksums(self):
+        """Checksums of the registry rows stored behind URLs, keyed on the URL of each file"""
+        return {join_url(rec["store"], rec["name"]): rec["checksum"] for rec in self.index.records
+                if rec["checksum"] is not None and is_url(rec["store"])}
+
+    def _resolve_source(self, item, url_checksums=None):
+        """Resolve a registry tag, URL or file path to the source and its registry checksum, if any"""
+        if isinstance(item, str):
+            record = self.index.lookup(item)
+            if record is not None:
+                if record["store"] is None:
+                    raise ValueError(f"registry tag '{item}' does not have a store to fetch from")
+                if is_url(record["store"]):
+                    return join_url(record["store"], record["name"]), record["checksum"]
+                return Path(record["store"], record["name"]), record["checksum"]
+            if is_url(item):
+                url_checksums = url_checksums if url_checksums is not None else self._url_checksums()
+                return item, url_checksums.get(item)
+        return Path(item), None
+
+    def _is_downloaded(self, url, out_file, checksum=None, pool=None):
+        """Check a file downloaded earlier against its checksum, or without one, the size the server reports"""
+        if checksum is not None:
+            return self.index.matches_checksum(out_file, checksum)
+        return remote_size(url, pool) == out_file.stat().st_size
+
+    def _download_one(self, url, out_dir, checksum=None, pool=None):
+        """Download one file into the output directory unless it was already downloaded"""
+        start = time.perf_counter()
+        out_file = Path(out_dir, url_file_name(url))
+        try:
+            if out_file.exists() and self._is_downloaded(url, out_file, checksum, pool):
+                return FetchResult(url, out_file, "skipped", seconds=time.perf_counter() - start)
+            size, digest = download(url, out_file, checksum=checksum, pool=pool)
+            if Path(out_dir) == Path(self.data_dir):
+                # the index only keeps sha256 hashes
+                sha256 = checksum is None or parse_checksum(checksum)[0] == "sha256"
+                self.index.record_file(out_file, digest=digest if sha256 else None)
+            return FetchResult(url, out_file, "copied", bytes=size, seconds=time.perf_counter() - start)
+        except Exception as e:
+            return FetchResult(url, out_file, "failed", seconds=time.perf_counter() - start, error=repr(e))
+
+    @timed(name="Registry.fetch_one")
+    def _fetch_one(self, in_file, out_dir, checksum=None, pool=None):
+        """Copy or download one file into the output directory unless an identical copy is already there"""
+        if is_url(in_file):
+            return self._download_one(in_file, out_dir, checksum, pool)
+        start = time.perf_counter()
+        out_file = Path(out_dir, in_file.name)
+        try:
+            # shapefiles are fetched as all of their component files
+            parts = shapefile_parts(in_file) if in_file.suffix.lower() == ".shp" else [in_file]
+            size = 0
+            for part in parts:
+                out_part = Path(out_dir, part.name)
+                if out_part.exists() and self.index.matches(part, out_part):
+                    continue
+                part_size, digest = atomic_copy(part, out_part)
+                size += part_size
+                if Path(out_dir) == Path(self.data_dir):
+                    self.index.record_file(out_part, digest=digest)
+            status = "copied" if size > 0 else "skipped"
+            return FetchResult(in_file, out_file, status, bytes=size, seconds=time.perf_counter() - start)
+        except Exception as e:
+            return FetchResult(in_file, out_file, "failed", seconds=time.perf_counter() - start, error=repr(e))
+
+    @timed
+    def fetch(self, items, out_dir=None, max_workers=4, verbose=True):
+        """
+        Copy many registry files into the local cache concurrently.
+
+        Files already present in the output directory with the same size and content
+        hash as the source are skipped, and every copy is written to a temporary file
+        and renamed into place, so interrupted runs never leave partial files behind.
 
+        Files behind URLs are downloaded over connections reused between files, with
+        one connection per host for each worker. An interrupted download is kept as a
+        ``.part`` file and resumed by the next fetch. Downloads with a checksum in the
+        registry are verified against it, and skipped when the file already matches.
+
+        Args:
+            items: Iterable of registry tags, URLs or source file paths.
+            out_dir: Optional directory to copy into. Defaults to the registry cache directory.
+            max_workers: Maximum number of files copied at the same time.
+            verbose: Print a summary of the fetch with throughput when finished.
+
+        Returns:
+            FetchReport with the result for every item.
+
+        .. code-block:: python
+
+            from {{cookiecutter.support_library}}.utilities import Registry
+
+            reg = Registry('C:/data/registry.csv')
+
+            report = reg.fetch(['parcels', 'zoning', 'C:/data/extra/taz.csv',
+                                'https://example.com/data/blocks.zip'], max_workers=8)
+        """
+        out_dir = self.data_dir if out_dir is None else Path(out_dir)
+        if not out_dir.exists():
+            out_dir.mkdir(parents=True)
+
+        # resolve everything up front and drop duplicate requests for the same file
+        url_checksums = self._url_checksums()
+        sources = dict(self._resolve_source(item, url_checksums) for item in items)
+
+        start = time.perf_counter()
+        # each fetch has its own connections, as they belong to its worker threads, which are gone once it finishes
+        pool = ConnectionPool()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(
+                    bind(lambda src: self._fetch_one(src, out_dir, sources[src], pool)), sources))
+        finally:
+            pool.close()
+        self._used(res.target for res in results if res.status != "failed")
+        report = FetchReport(results, time.perf_counter() - start)
+
+        if verbose:
+            print(f"...{report}")
+            for res in report.failed:
+                print(f"--- --- failed to fetch {res.source}: {res.error}")
+
+        return report
+
+    @timed
     def copy_file(self, in_file, out_dir=None):
         """Copies data from on location to another"""
         # TODO: validation input and outputs are valid and exist
@@ -465,18 +1350,43 @@ class Registry(object):
         if out_dir is None:
             out_dir = self.data_dir
         # handle shapefile copies (multiple files)
-        if os.path.splitext(in_file) == ".shp":
-            copy_shapefiles(in_file, out_dir)
+        if in_file.suffix.lower() == ".shp":
+            out_file = Path(out_dir, in_file.name)
+            if not (out_file.exists() and all(
+                    self.index.matches(part, Path(out_dir, part.name)) for part in shapefile_parts(in_file))):
+                out_file = copy_shapefiles(in_file, out_dir)
+                if Path(out_dir) == Path(self.data_dir):
+                    for part in shapefile_parts(out_file):
+                        self.index.record_file(part)
         else:
             name = in_file.name
             out_file = Path(out_dir, name)
-            if out_file.exists():
+            # an identical copy already there is reused rather than duplicated
+            if out_file.exists() and not self.index.matches(in_file, out_file):
                 prefix = random_prefix(7)
                 out_file = Path(out_dir, f"{prefix}_{name}")
-            shutil.copyfile(src=in_file, dst=out_file)
+            if not out_file.exists():
+                _, digest = atomic_copy(in_file, out_file)
+                if Path(out_dir) == Path(self.data_dir):
+                    self.index.record_file(out_file, digest=digest)
+        self._used([out_file])
         return out_file
 
-    def get_external_files(self, source, file_name, out_folder=None):
+    def get_external_files(self, source, file_name, out_folder=None, max_workers=4):
+        """
+        Copy one file, or a list of files, from a source directory or base URL into the local cache.
+        A list of file names is fetched concurrently and returns a FetchReport.
+        """
+        if is_url(source):
+            if isinstance(file_name, (list, tuple)):
+                return self.fetch([join_url(source, f) for f in file_name], out_dir=out_folder,
+                                  max_workers=max_workers)
+            result = self.fetch([join_url(source, file_name)], out_dir=out_folder, verbose=False).results[0]
+            if result.status == "failed":
+                raise IOError(f"failed to download {result.source}: {result.error}")
+            return result.target
+        if isinstance(file_name, (list, tuple)):
+            return self.fetch([Path(source, f) for f in file_name], out_dir=out_folder, max_workers=max_workers)
         file_path = Path(source, file_name)
         return self.copy_file(in_file=file_path, out_dir=out_folder)
 
@@ -0,0 +1,242 @@
+"""
+Provisioning of the project data workspaces (INTERIM, RAW, PRODUCTION and REF).
+
+Each workspace is a directory optionally holding a file geodatabase and a mobile
+geodatabase. Geodatabases are created through a backend, ``ArcpyBackend`` when
+arcpy is available, or ``FolderBackend``, a stand-in that needs nothing beyond
+the standard library, so provisioning can be exercised without ArcGIS Pro.
+
+Provisioning records a manifest in the data directory, so re-running it only
+creates what is missing and upgrades geodatabases the manifest records as created
+by a different version of the backend. Workspaces are provisioned concurrently,
+except with backends that are not thread safe, such as arcpy.
+"""
+import importlib.util
+import json
+import os
+import shutil
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+# data workspace subdirectories in every project
+WORKSPACE_NAMES = ('INTERIM', 'RAW', 'PRODUCTION', 'REF')
+
+# manifest recording what was provisioned, stored in the data directory
+MANIFEST_NAME = '.workspaces.json'
+
+
+class WorkspaceBackend(object):
+    """Interface for creating geodatabases, implemented by ``ArcpyBackend`` and ``FolderBackend``."""
+
+    name = 'base'
+
+    # whether geodatabases can be created from several threads at once
+    thread_safe = True
+
+    @property
+    def version(self) -> str:
+        """Version string recorded in the manifest to detect geodatabases needing an upgrade."""
+        raise NotImplementedError
+
+    def exists(self, pth: Path) -> bool:
+        raise NotImplementedError
+
+    def create_file_gdb(self, pth: Path):
+        raise NotImplementedError
+
+    def create_mobile_gdb(self, pth: Path):
+        raise NotImplementedError
+
+    def upgrade(self, pth: Path):
+        """Bring an existing geodatabase up to the current version without losing its contents."""
+        raise NotImplementedError
+
+
+class ArcpyBackend(WorkspaceBackend):
+    """Create geodatabases with arcpy, versioned by the installed ArcGIS Pro release."""
+
+    name = 'arcpy'
+
+    # arcpy geoprocessing tools are not safe to call from more than one thread
+    thread_safe = False
+
+    def __init__(self):
+        import arcpy
+        self._arcpy = arcpy
+
+    @property
+    def version(self) -> str:
+        return self._arcpy.GetInstallInfo()['Version']
+
+    def exists(self, pth: Path) -> bool:
+        return self._arcpy.Exists(str(pth))
+
+    def create_file_gdb(self, pth: Path):
+        self._arcpy.management.CreateFileGDB(str(pth.parent), pth.name)
+
+    def create_mobile_gdb(self, pth: Path):
+        self._arcpy.management.CreateMobileGDB(str(pth.parent), pth.name)
+
+    def upgrade(self, pth: Path):
+        self._arcpy.management.UpgradeGDB(str(pth), 'NO_PREREQUISITE_CHECK', 'UPGRADE')
+
+
+class FolderBackend(WorkspaceBackend):
+    """
+    Stand-in backend creating a plain folder for each file geodatabase and an empty
+    SQLite database for each mobile geodatabase. Useful for testing provisioning and
+    for environments without arcpy.
+    """
+
+    name = 'folder'
+
+    def __init__(self, version: str = '1'):
+        self._version = version
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def exists(self, pth: Path) -> bool:
+        return pth.exists()
+
+    def create_file_gdb(self, pth: Path):
+        pth.mkdir(parents=True)
+
+    def create_mobile_gdb(self, pth: Path):
+        sqlite3.connect(str(pth)).close()
+
+    def upgrade(self, pth: Path):
+        pass
+
+
+def default_backend() -> Optional[WorkspaceBackend]:
+    """ArcpyBackend if arcpy is available, otherwise None, meaning only directories are created."""
+    if importlib.util.find_spec('arcpy') is not None:
+        return ArcpyBackend()
+    return None
+
+
+def _remove(pth: Path):
+    if pth.is_dir():
+        shutil.rmtree(pth)
+    elif pth.exists():
+        pth.unlink()
+
+
+def _provision_one(backend: Optional[WorkspaceBackend], dir_pth: Path, data_name: str, mobile_geodatabases: bool,
+                   rebuild: bool, previous: dict) -> dict:
+    """Provision one workspace, returning its manifest entry."""
+    # ensure the data subdirectory exists
+    if not dir_pth.exists():
+        dir_pth.mkdir(parents=True)
+
+    entry = {'directory': str(dir_pth), 'geodatabases': {}}
+    if backend is None:
+        return entry
+
+    gdb_lst = [(dir_pth / f'{data_name}.gdb', backend.create_file_gdb)]
+    if mobile_geodatabases:
+        gdb_lst.append((dir_pth / f'{data_name}.geodatabase', backend.create_mobile_gdb))
+
+    for gdb_pth, create in gdb_lst:
+        prev = previous.get(gdb_pth.name, {})
+
+        # rebuilding from scratch, so remove whatever is there
+        if rebuild and gdb_pth.exists():
+            _remove(gdb_pth)
+
+        # only upgrade when there is a recorded version to compare, a geodatabase missing
+        # from the manifest is of unknown version and left as it is
+        if not backend.exists(gdb_pth):
+            create(gdb_pth)
+            action = 'created'
+        elif prev.get('version') is not None and prev['version'] != backend.version:
+            backend.upgrade(gdb_pth)
+            action = 'upgraded'
+        else:
+            action = 'unchanged'
+
+        entry['geodatabases'][gdb_pth.name] = {
+            'path': str(gdb_pth),
+            # an existing geodatabase not in the manifest keeps an unknown version
+            'version': prev.get('version') if action == 'unchanged' else backend.version,
+            'action': action,
+            'updated': prev.get('updated') if action == 'unchanged' else datetime.now().isoformat(timespec='seconds'),
+        }
+
+    return entry
+
+
+def read_manifest(data_pth: Union[str, Path]) -> dict:
+    """Read the workspace manifest from a data directory, or an empty dictionary if there is none."""
+    manifest_pth = Path(data_pth, MANIFEST_NAME)
+    if not manifest_pth.exists():
+        return {}
+    with open(manifest_pth) as f:
+        return json.load(f)
+
+
+def provision_workspaces(data_pth: Union[str, Path], mobile_geodatabases: bool = False,
+                         backend: Optional[WorkspaceBackend] = None, rebuild: bool = False,
+                         workspace_names: Iterable[str] = WORKSPACE_NAMES, max_workers: int = 4) -> dict:
+    """
+    Create the data workspaces concurrently, only creating what is missing.
+
+    Args:
+        data_pth: Data directory to create the workspaces in.
+        mobile_geodatabases: Also create a mobile geodatabase in each workspace.
+        backend: Backend used to create geodatabases. Defaults to ``ArcpyBackend`` if
+            arcpy is available. If there is no backend, only directories are created.
+        rebuild: Remove and recreate every geodatabase, discarding its contents.
+        workspace_names: Names of the workspace subdirectories to create.
+        max_workers: Maximum number of workspaces provisioned at the same time. Backends that
+            are not thread safe, such as ``ArcpyBackend``, always provision one at a time.
+
+    Returns:
+        The manifest written to the data directory, recording for each geodatabase
+        whether it was created, upgraded or left unchanged.
+
+    .. code-block:: python
+
+        from {{cookiecutter.support_library}}.utilities.workspaces import FolderBackend, provision_workspaces
+
+        manifest = provision_workspaces('C:/projects/data', backend=FolderBackend())
+    """
+    data_pth = Path(data_pth)
+    if not data_pth.exists():
+        data_pth.mkdir(parents=True)
+
+    if backend is None:
+        backend = default_backend()
+
+    previous = read_manifest(data_pth).get('workspaces', {})
+
+    if backend is not None and not backend.thread_safe:
+        max_workers = 1
+
+    def _provision(data_name):
+        prev = previous.get(data_name, {}).get('geodatabases', {})
+        return data_name, _provision_one(backend, data_pth / data_name, data_name, mobile_geodatabases, rebuild,
+                                         prev)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        workspaces = dict(executor.map(_provision, workspace_names))
+
+    manifest = {
+        'backend': None if backend is None else backend.name,
+        'version': None if backend is None else backend.version,
+        'workspaces': workspaces,
+    }
+
+    # write the manifest to a temporary file and swap it in so it is never left half written
+    manifest_pth = data_pth / MANIFEST_NAME
+    tmp_pth = manifest_pth.with_name(f'{MANIFEST_NAME}.tmp')
+    with open(tmp_pth, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_pth, manifest_pth)
+
+    return manifest
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# run against the source tree, whether or not the support library is installed
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the managers are imported from the app directory, as the app does
+sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
+
+from managers.batch import arg_grid, run_batch  # noqa: E402
+
+pytest.importorskip('pyarrow')
+
+
+def _weighted_total(scale, offset, weights, parcels):
+    """defined at module level so the worker processes can import it"""
+    return float((weights * scale).sum() + parcels['value'].sum() + offset), parcels['label'].tolist()
+
+
+def test_run_batch_shared_inputs():
+    weights = np.arange(10, dtype=np.float64)
+    parcels = pd.DataFrame({'value': np.arange(5, dtype=np.int64), 'label': list('abcde')})
+    grid = arg_grid(scale=[1, 2], offset=[0, 100])
+
+    report = run_batch(_weighted_total, grid, shared={'weights': weights, 'parcels': parcels},
+                       max_workers=2, verbose=False)
+
+    assert not report.failed
+    assert [res.args for res in report.results] == grid
+    assert report.values == [(45.0 * args['scale'] + 10 + args['offset'], list('abcde')) for args in grid]
+
+
+def test_run_batch_pickles_frames_arrow_cannot_convert():
+    # mixed types in an object column cannot be converted to arrow
+    parcels = pd.DataFrame({'value': [1, 2], 'label': ['a', 1]})
+    report = run_batch(_weighted_total, [{'scale': 1, 'offset': 0}], shared={'weights': np.ones(2), 'parcels': parcels},
+                       max_workers=1, verbose=False)
+
+    assert not report.failed
+    assert report.values == [(5.0, ['a', 1])]
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from {{cookiecutter.support_library}}.utilities.dbf import iter_dbf, read_dbf
+
+shapefile = pytest.importorskip('shapefile')
+
+
+@pytest.fixture
+def dbf_path(tmp_path):
+    path = tmp_path / 'table.dbf'
+    with shapefile.Writer(dbf=str(path)) as writer:
+        writer.field('ID', 'N', 10, 0)
+        writer.field('COUNT', 'N', 10, 0)
+        writer.field('SHARE', 'N', 10, 2)
+        for i in range(4):
+            # only the last record leaves the count blank
+            writer.record(i, None if i == 3 else i * 10, i / 4)
+    return path
+
+
+def test_integer_fields_are_nullable(dbf_path):
+    df = read_dbf(dbf_path)
+    assert df['ID'].dtype == 'Int64'
+    assert df['COUNT'].dtype == 'Int64'
+    assert df['SHARE'].dtype == 'float64'
+    assert df['COUNT'].isna().tolist() == [False, False, False, True]
+
+
+def test_chunks_share_dtypes(dbf_path):
+    chunks = list(iter_dbf(dbf_path, chunksize=2))
+    assert len(chunks) == 2
+    assert all(chunk['COUNT'].dtype == 'Int64' for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks), read_dbf(dbf_path))
@@ -0,0 +1,170 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from {{cookiecutter.support_library}}.utilities.downloads import (PART_SUFFIX, VALIDATOR_SUFFIX, ConnectionPool,
+                                                                  download)
+from {{cookiecutter.support_library}}.utilities.utils import Registry
+
+CONTENT = bytes(range(256)) * 64
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves ``server.files`` with byte ranges, If-Range and ETags, and ``/moved`` redirecting to ``/data.bin``."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.path == '/moved':
+            self.send_response(302)
+            self.send_header('Location', '/data.bin')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        content = self.server.files.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+
+        rng = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if rng is not None and (if_range is None or if_range == etag):
+            start = int(rng.split('=')[1].rstrip('-'))
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(content)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = content[start:]
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(content) - 1}/{len(content)}')
+        else:
+            body = content
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.files = {'/data.bin': CONTENT}
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server, path='/data.bin'):
+    return f'http://127.0.0.1:{server.server_address[1]}{path}'
+
+
+def test_download(server, tmp_path):
+    out_file = tmp_path / 'data.bin'
+    size, digest = download(_url(server), out_file)
+    assert size == len(CONTENT)
+    assert digest == hashlib.sha256(CONTENT).hexdigest()
+    assert out_file.read_bytes() == CONTENT
+    assert not (tmp_path / f'data.bin{PART_SUFFIX}').exists()
+
+
+def test_download_resumes_partial(server, tmp_path):
+    out_file = tmp_path / 'data.bin'
+    part_file = tmp_path / f'data.bin{PART_SUFFIX}'
+    part_file.write_bytes(CONTENT[:1000])
+    size, digest = download(_url(server), out_file, checksum=f'sha256:{hashlib.sha256(CONTENT).hexdigest()}')
+    assert size == len(CONTENT) - 1000
+    assert server.requests[-1][1]['Range'] == 'bytes=1000-'
+    assert out_file.read_bytes() == CONTENT
+
+
+def test_download_restarts_when_file_changed(server, tmp_path):
+    out_file = tmp_path / 'data.bin'
+    part_file = tmp_path / f'data.bin{PART_SUFFIX}'
+    part_file.write_bytes(b'x' * 1000)
+    (tmp_path / f'data.bin{PART_SUFFIX}{VALIDATOR_SUFFIX}').write_text('"stale"')
+    size, _ = download(_url(server), out_file)
+    assert size == len(CONTENT)
+    assert out_file.read_bytes() == CONTENT
+
+
+def test_download_416_complete(server, tmp_path):
+    out_file = tmp_path / 'data.bin'
+    (tmp_path / f'data.bin{PART_SUFFIX}').write_bytes(CONTENT)
+    size, digest = download(_url(server), out_file)
+    assert size == 0
+    assert digest == hashlib.sha256(CONTENT).hexdigest()
+    assert out_file.read_bytes() == CONTENT
+
+
+def test_download_416_longer_than_file(server, tmp_path):
+    out_file = tmp_path / 'data.bin'
+    (tmp_path / f'data.bin{PART_SUFFIX}').write_bytes(CONTENT + b'left over from an older version')
+    size, _ = download(_url(server), out_file)
+    assert size == len(CONTENT)
+    assert out_file.read_bytes() == CONTENT
+
+
+def test_download_checksum_mismatch(server, tmp_path):
+    out_file = tmp_path / 'data.bin'
+    with pytest.raises(ValueError, match='checksum mismatch'):
+        download(_url(server), out_file, checksum='sha256:' + '0' * 64)
+    assert not out_file.exists()
+    assert not (tmp_path / f'data.bin{PART_SUFFIX}').exists()
+
+
+def test_download_follows_redirect(server, tmp_path):
+    out_file = tmp_path / 'data.bin'
+    pool = ConnectionPool()
+    download(_url(server, '/moved'), out_file, pool=pool)
+    assert out_file.read_bytes() == CONTENT
+    assert [path for path, _ in server.requests] == ['/moved', '/data.bin']
+    pool.close()
+
+
+def test_request_records_redirected_url(server):
+    pool = ConnectionPool()
+    resp = pool.request('GET', _url(server, '/moved'))
+    resp.read()
+    assert resp.url == _url(server)
+    pool.close()
+
+
+def test_download_missing(server, tmp_path):
+    with pytest.raises(IOError, match='404'):
+        download(_url(server, '/missing.bin'), tmp_path / 'missing.bin')
+
+
+def test_concurrent_registry_fetches(server, tmp_path):
+    server.files.update({f'/{i}.bin': CONTENT[i:] for i in range(8)})
+    registry_file = tmp_path / 'registry.csv'
+    registry_file.write_text('tag,name,store\n')
+    reg = Registry(registry_file, data_dir=tmp_path / 'cache', index_file=tmp_path / 'index.sqlite')
+
+    # each fetch closes only its own connections, so one finishing does not break the other
+    reports = {}
+    threads = [threading.Thread(target=lambda n=n: reports.__setitem__(n, reg.fetch(
+        [_url(server, f'/{i}.bin') for i in range(n, 8, 2)], out_dir=tmp_path / f'out{n}', verbose=False)))
+        for n in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for n, report in reports.items():
+        assert not report.failed
+        for i in range(n, 8, 2):
+            assert (tmp_path / f'out{n}' / f'{i}.bin').read_bytes() == CONTENT[i:]
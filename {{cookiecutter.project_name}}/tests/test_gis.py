@@ -0,0 +1,110 @@
+import pytest
+
+from {{cookiecutter.support_library}}.utilities.utils import add_directory_to_gis, add_group, clear_gis_sessions, get_gis
+
+
+class _Group(object):
+
+    def __init__(self, title):
+        self.title = title
+
+
+class _GroupManager(object):
+
+    def __init__(self, titles):
+        self.groups = [_Group(title) for title in titles]
+        self.queries = []
+
+    def search(self, query=None):
+        self.queries.append(query)
+        title = query.partition(':')[2].strip('"').lower()
+        return [grp for grp in self.groups if title in grp.title.lower()]
+
+    def create(self, title):
+        grp = _Group(title)
+        self.groups.append(grp)
+        return grp
+
+
+class _Content(object):
+
+    def __init__(self):
+        self.folders = []
+
+    def create_folder(self, name):
+        self.folders.append(name)
+        return {'title': name}
+
+
+class _Portal(object):
+    """Stand-in for ``arcgis.gis.GIS``, recording every sign in."""
+
+    sign_ins = []
+
+    def __init__(self, url=None, username=None, password=None):
+        self.url, self.username, self.password = url, username, password
+        self.groups = _GroupManager(['Project Data', 'Project Data Archive'])
+        self.content = _Content()
+        _Portal.sign_ins.append((url, username))
+
+
+@pytest.fixture(autouse=True)
+def _sessions(monkeypatch):
+    for var in ('ESRI_GIS_URL', 'ESRI_GIS_USERNAME', 'ESRI_GIS_PASSWORD'):
+        monkeypatch.delenv(var, raising=False)
+    clear_gis_sessions()
+    _Portal.sign_ins = []
+    yield
+    clear_gis_sessions()
+
+
+def test_get_gis_reuses_session():
+    gis = get_gis('https://portal.example.com', 'analyst', 'secret', gis_factory=_Portal)
+    assert get_gis('https://portal.example.com', 'analyst', 'secret', gis_factory=_Portal) is gis
+    assert _Portal.sign_ins == [('https://portal.example.com', 'analyst')]
+
+
+def test_get_gis_signs_in_again_with_other_password():
+    gis = get_gis('https://portal.example.com', 'analyst', 'secret', gis_factory=_Portal)
+    other = get_gis('https://portal.example.com', 'analyst', 'wrong', gis_factory=_Portal)
+    assert other is not gis
+    assert other.password == 'wrong'
+    assert len(_Portal.sign_ins) == 2
+
+
+def test_get_gis_refresh():
+    gis = get_gis('https://portal.example.com', 'analyst', 'secret', gis_factory=_Portal)
+    assert get_gis('https://portal.example.com', 'analyst', 'secret', refresh=True, gis_factory=_Portal) is not gis
+
+
+def test_get_gis_from_environment(monkeypatch):
+    monkeypatch.setenv('ESRI_GIS_USERNAME', 'analyst')
+    monkeypatch.setenv('ESRI_GIS_PASSWORD', 'secret')
+    gis = get_gis(gis_factory=_Portal)
+    assert (gis.url, gis.username) == (None, 'analyst')
+
+
+def test_get_gis_without_credentials():
+    assert get_gis(gis_factory=_Portal) is None
+
+
+def test_add_group_filters_on_server_and_memoizes():
+    gis = get_gis('https://portal.example.com', 'analyst', 'secret', gis_factory=_Portal)
+    grp = add_group(gis, 'Project Data')
+    assert grp.title == 'Project Data'
+    assert add_group(gis, 'project data') is grp
+    assert gis.groups.queries == ['title:"Project Data"']
+
+
+def test_add_group_creates_missing():
+    gis = get_gis('https://portal.example.com', 'analyst', 'secret', gis_factory=_Portal)
+    grp = add_group(gis, 'New Project')
+    assert grp in gis.groups.groups
+    assert add_group(gis, 'New Project') is grp
+
+
+def test_add_directory_memoizes():
+    gis = get_gis('https://portal.example.com', 'analyst', 'secret', gis_factory=_Portal)
+    assert add_directory_to_gis('project', gis)
+    assert add_directory_to_gis('Project', gis)
+    assert gis.content.folders == ['project']
@@ -0,0 +1,57 @@
+import importlib
+
+import pandas as pd
+import pytest
+
+from {{cookiecutter.support_library}}.utilities.memoize import memoize
+
+# the utilities package exports the memoize function under the module's name
+memoize_module = importlib.import_module('{{cookiecutter.support_library}}.utilities.memoize')
+
+
+@pytest.mark.parametrize('value', [
+    pd.Timestamp('2020-01-01'),
+    pd.Timedelta('1D'),
+    pd.Interval(0, 1),
+    pd.NA,
+    pd.DataFrame({'ids': [[1, 2], [3]], 'attrs': [{'a': 1}, {'b': 2}]}),
+])
+def test_memoize_pandas_arguments(tmp_path, value):
+    calls = []
+
+    @memoize(cache_dir=tmp_path)
+    def identity(arg):
+        calls.append(arg)
+        return 1
+
+    assert identity(value) == 1
+    assert identity(value) == 1
+    assert len(calls) == 1
+
+
+def test_memoize_frame_by_content(tmp_path):
+    @memoize(cache_dir=tmp_path)
+    def total(df):
+        return int(df['a'].sum())
+
+    assert total(pd.DataFrame({'a': [1, 2]})) == 3
+    assert total.cache_key(pd.DataFrame({'a': [1, 2]})) != total.cache_key(pd.DataFrame({'a': [1, 3]}))
+
+
+def test_memoize_budget_only_evicts_own_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(memoize_module, 'EVICT_INTERVAL', 0.0)
+
+    @memoize(cache_dir=tmp_path)
+    def unbounded(x):
+        return x
+
+    @memoize(cache_dir=tmp_path, max_entries=1)
+    def bounded(x):
+        return x
+
+    for x in range(3):
+        unbounded(x)
+        bounded(x)
+
+    assert len(list(unbounded.cache_dir.glob('*.pkl'))) == 3
+    assert len(list(bounded.cache_dir.glob('*.pkl'))) == 1
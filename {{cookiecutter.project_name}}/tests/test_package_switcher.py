@@ -0,0 +1,84 @@
+import importlib.util
+import subprocess
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('git')
+
+_SPEC = importlib.util.spec_from_file_location(
+    'package_switcher', Path(__file__).parent.parent / 'scripts' / 'package_switcher.py')
+package_switcher = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(package_switcher)
+
+BASE = 'dev'
+PROJECT_BRANCH = 'DEV_INIT-test-project'
+
+
+def _git(*args, cwd):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(work, message):
+    Path(work, 'README.md').write_text(message)
+    _git('add', '-A', cwd=work)
+    _git('-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', message, cwd=work)
+    _git('push', '-q', 'origin', BASE, cwd=work)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """Directory of bare repositories standing in for GitHub, holding one package, ``pkg``."""
+    remote_dir = tmp_path / 'remote'
+    _git('init', '-q', '--bare', str(remote_dir / 'pkg'), cwd=tmp_path)
+    work = tmp_path / 'work'
+    _git('clone', '-q', str(remote_dir / 'pkg'), str(work), cwd=tmp_path)
+    _git('checkout', '-q', '-b', BASE, cwd=work)
+    _commit(work, 'initial')
+    return remote_dir, work
+
+
+def _sync(remote_dir, packages_dir, package='pkg'):
+    return package_switcher.sync_package(package, packages_dir=packages_dir, remote_url=str(remote_dir),
+                                         base_branch=BASE, project_branch=PROJECT_BRANCH)
+
+
+def test_sync_clones_and_pushes(remote, tmp_path):
+    remote_dir, work = remote
+    res = _sync(remote_dir, tmp_path / 'packages')
+    assert res.status == 'ok', res.error
+    assert res.actions == ['cloned', f'created {PROJECT_BRANCH}', 'pushed']
+    assert PROJECT_BRANCH in _git('branch', '--list', cwd=remote_dir / 'pkg')
+
+
+def test_sync_up_to_date(remote, tmp_path):
+    remote_dir, work = remote
+    _sync(remote_dir, tmp_path / 'packages')
+    res = _sync(remote_dir, tmp_path / 'packages')
+    assert res.status == 'ok', res.error
+    assert res.actions == [f'checked out {BASE}', 'up to date']
+
+
+def test_sync_pulls_remote_changes(remote, tmp_path):
+    remote_dir, work = remote
+    _sync(remote_dir, tmp_path / 'packages')
+    _commit(work, 'changed')
+    res = _sync(remote_dir, tmp_path / 'packages')
+    assert res.status == 'ok', res.error
+    assert 'pulled' in res.actions
+    assert _git('log', '-1', '--format=%s', BASE, cwd=tmp_path / 'packages' / 'pkg') == 'changed'
+
+
+def test_sync_missing_repo(remote, tmp_path):
+    remote_dir, _ = remote
+    res = _sync(remote_dir, tmp_path / 'packages', package='missing')
+    assert res.status == 'failed'
+    assert res.error
+
+
+def test_sync_packages_concurrently(remote, tmp_path):
+    remote_dir, _ = remote
+    results = package_switcher.sync_packages(['pkg', 'missing'], packages_dir=tmp_path / 'packages',
+                                             remote_url=str(remote_dir), base_branch=BASE,
+                                             project_branch=PROJECT_BRANCH)
+    assert [(res.package, res.status) for res in results] == [('pkg', 'ok'), ('missing', 'failed')]
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from {{cookiecutter.support_library}}.utilities.tables import read_table
+
+
+@pytest.fixture
+def csv_pth(tmp_path):
+    pth = tmp_path / 'parcels.csv'
+    pd.DataFrame({'PARCEL_ID': [1, 2, 3, 4], 'LND_VAL': [10.0, 20.0, 30.0, 40.0]}).to_csv(pth, index=False)
+    return pth
+
+
+def test_read_table_nrows(csv_pth):
+    df = read_table(csv_pth, nrows=2)
+    assert df['PARCEL_ID'].tolist() == [1, 2]
+
+
+def test_read_table_c_parser_options(csv_pth):
+    df = read_table(csv_pth, usecols=lambda col: col == 'LND_VAL', skiprows=[1], low_memory=False)
+    assert list(df.columns) == ['LND_VAL']
+    assert df['LND_VAL'].tolist() == [20.0, 30.0, 40.0]
+
+
+def test_read_table_cache_keeps_index(csv_pth, tmp_path):
+    first = read_table(csv_pth, index_col='PARCEL_ID', cache=True, cache_dir=tmp_path / 'cache')
+    cached = read_table(csv_pth, index_col='PARCEL_ID', cache=True, cache_dir=tmp_path / 'cache')
+    pd.testing.assert_frame_equal(first, cached)
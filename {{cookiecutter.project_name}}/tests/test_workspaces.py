@@ -0,0 +1,75 @@
+import json
+
+from {{cookiecutter.support_library}}.utilities.workspaces import MANIFEST_NAME, FolderBackend, provision_workspaces
+
+
+class _RecordingBackend(FolderBackend):
+    """FolderBackend recording the geodatabases it upgrades."""
+
+    def __init__(self, version='1'):
+        super().__init__(version)
+        self.upgraded = []
+
+    def upgrade(self, pth):
+        self.upgraded.append(pth.name)
+
+
+def _actions(manifest):
+    return {name: gdb['action'] for ws in manifest['workspaces'].values() for name, gdb in ws['geodatabases'].items()}
+
+
+def test_provision_creates(tmp_path):
+    manifest = provision_workspaces(tmp_path, mobile_geodatabases=True, backend=FolderBackend())
+    assert set(_actions(manifest).values()) == {'created'}
+    assert (tmp_path / 'INTERIM' / 'INTERIM.gdb').is_dir()
+    assert (tmp_path / 'REF' / 'REF.geodatabase').is_file()
+    assert json.loads((tmp_path / MANIFEST_NAME).read_text()) == manifest
+
+
+def test_provision_unchanged(tmp_path):
+    provision_workspaces(tmp_path, backend=FolderBackend())
+    marker = tmp_path / 'RAW' / 'RAW.gdb' / 'keep.txt'
+    marker.write_text('data')
+
+    backend = _RecordingBackend()
+    manifest = provision_workspaces(tmp_path, backend=backend)
+    assert set(_actions(manifest).values()) == {'unchanged'}
+    assert backend.upgraded == []
+    assert marker.read_text() == 'data'
+
+
+def test_provision_upgrades_recorded_version(tmp_path):
+    provision_workspaces(tmp_path, backend=FolderBackend('1'))
+
+    backend = _RecordingBackend('2')
+    manifest = provision_workspaces(tmp_path, backend=backend)
+    assert set(_actions(manifest).values()) == {'upgraded'}
+    assert sorted(backend.upgraded) == ['INTERIM.gdb', 'PRODUCTION.gdb', 'RAW.gdb', 'REF.gdb']
+    assert {gdb['version'] for ws in manifest['workspaces'].values() for gdb in ws['geodatabases'].values()} == {'2'}
+
+
+def test_provision_without_manifest_does_not_upgrade(tmp_path):
+    provision_workspaces(tmp_path, backend=FolderBackend('1'))
+    (tmp_path / MANIFEST_NAME).unlink()
+
+    backend = _RecordingBackend('2')
+    manifest = provision_workspaces(tmp_path, backend=backend)
+    assert set(_actions(manifest).values()) == {'unchanged'}
+    assert backend.upgraded == []
+
+
+def test_provision_serial_for_thread_unsafe_backend(tmp_path, monkeypatch):
+    import {{cookiecutter.support_library}}.utilities.workspaces as workspaces
+
+    workers = []
+
+    class _Executor(workspaces.ThreadPoolExecutor):
+        def __init__(self, max_workers=None):
+            workers.append(max_workers)
+            super().__init__(max_workers=max_workers)
+
+    monkeypatch.setattr(workspaces, 'ThreadPoolExecutor', _Executor)
+    backend = FolderBackend()
+    backend.thread_safe = False
+    provision_workspaces(tmp_path, backend=backend, max_workers=4)
+    assert workers == [1]